@@ -26,5 +26,92 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ADMIN_EMAILS: list = [
+        email.strip().lower()
+        for email in os.getenv("ADMIN_EMAILS", "").split(",")
+        if email.strip()
+    ]
+    
+    # Rate limiting (token buckets; costs per route in app/utils/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_RATE: float = float(os.getenv("RATE_LIMIT_RATE", "5"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "100"))
+    RATE_LIMIT_IP_MULTIPLIER: float = float(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "4"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+    
+    # Load shedding (app/utils/load_shedding.py): per-worker concurrency and queueing limits
+    LOAD_SHEDDING_ENABLED: bool = os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true"
+    LOAD_SHED_MAX_CONCURRENCY: int = int(os.getenv("LOAD_SHED_MAX_CONCURRENCY", "64"))
+    LOAD_SHED_MAX_QUEUE_MS: float = float(os.getenv("LOAD_SHED_MAX_QUEUE_MS", "2000"))
+    
+    # Entity cache (app/utils/cache.py); use redis to share it across workers
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/1")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+    
+    # Change feed: seconds a gap in seq may stay open (an uncommitted change)
+    # before readers skip past it
+    CHANGE_FEED_SETTLE_SECONDS: float = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "30"))
+    
+    # Coalesce concurrent identical reads in each worker (app/utils/single_flight.py)
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    
+    # Near-duplicate listings: estimated Jaccard similarity of listing text
+    DUPLICATE_THRESHOLD: float = float(os.getenv("DUPLICATE_THRESHOLD", "0.7"))
+    
+    # Request profiling (app/utils/profiler.py); off unless explicitly enabled
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+    PROFILING_SLOW_MS: float = float(os.getenv("PROFILING_SLOW_MS", "1000"))
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_BUFFER_SIZE: int = int(os.getenv("PROFILING_BUFFER_SIZE", "100"))
+    
+    # Traffic capture for benchmarks/replay.py (app/utils/traffic_capture.py); off unless enabled
+    TRAFFIC_CAPTURE_ENABLED: bool = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+    TRAFFIC_CAPTURE_PATH: str = os.getenv("TRAFFIC_CAPTURE_PATH", "traffic.jsonl")
+    TRAFFIC_CAPTURE_SAMPLE_RATE: float = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0"))
+    TRAFFIC_CAPTURE_MAX_MB: float = float(os.getenv("TRAFFIC_CAPTURE_MAX_MB", "512"))
+    
+    # Background task queue (app/utils/task_queue.py); workers run in every app process
+    TASK_WORKERS_ENABLED: bool = os.getenv("TASK_WORKERS_ENABLED", "true").lower() == "true"
+    TASK_WORKERS: int = int(os.getenv("TASK_WORKERS", "2"))
+    TASK_POLL_INTERVAL_SECONDS: float = float(os.getenv("TASK_POLL_INTERVAL_SECONDS", "1"))
+    TASK_LEASE_SECONDS: int = int(os.getenv("TASK_LEASE_SECONDS", "300"))
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+    TASK_BACKOFF_BASE_SECONDS: float = float(os.getenv("TASK_BACKOFF_BASE_SECONDS", "2"))
+    TASK_BACKOFF_MAX_SECONDS: float = float(os.getenv("TASK_BACKOFF_MAX_SECONDS", "600"))
+    TASK_RETENTION_HOURS: float = float(os.getenv("TASK_RETENTION_HOURS", "24"))
+    
+    # Reverse geocoding (app/utils/geocoder.py): canonical city/country from coordinates
+    GEOCODER_ENABLED: bool = os.getenv("GEOCODER_ENABLED", "true").lower() == "true"
+    GEOCODER_GAZETTEER: str = os.getenv(
+        "GEOCODER_GAZETTEER",
+        os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+    )
+    GEOCODER_MAX_DISTANCE_KM: float = float(os.getenv("GEOCODER_MAX_DISTANCE_KM", "50"))
+    
+    # Account deletion: rows purged per background task, and the pause between tasks
+    ACCOUNT_PURGE_BATCH_SIZE: int = int(os.getenv("ACCOUNT_PURGE_BATCH_SIZE", "500"))
+    ACCOUNT_PURGE_PAUSE_SECONDS: float = float(os.getenv("ACCOUNT_PURGE_PAUSE_SECONDS", "1"))
+    
+    # Message archival: read messages older than the horizon move to messages_archive
+    MESSAGE_ARCHIVE_ENABLED: bool = os.getenv("MESSAGE_ARCHIVE_ENABLED", "true").lower() == "true"
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "180"))
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", "1000"))
+    MESSAGE_ARCHIVE_MAX_BATCHES: int = int(os.getenv("MESSAGE_ARCHIVE_MAX_BATCHES", "50"))
+    MESSAGE_ARCHIVE_PAUSE_SECONDS: float = float(os.getenv("MESSAGE_ARCHIVE_PAUSE_SECONDS", "0.5"))
+    MESSAGE_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", "900"))
+    
+    # Background jobs
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    RENTAL_EXPIRY_INTERVAL_SECONDS: int = int(os.getenv("RENTAL_EXPIRY_INTERVAL_SECONDS", "300"))
+    VIEW_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "10"))
+    MAP_GRID_REBUILD_INTERVAL_SECONDS: int = int(os.getenv("MAP_GRID_REBUILD_INTERVAL_SECONDS", "86400"))
+    MARKET_STATS_REBUILD_INTERVAL_SECONDS: int = int(os.getenv("MARKET_STATS_REBUILD_INTERVAL_SECONDS", "86400"))
+    SIMILARITY_REFRESH_INTERVAL_SECONDS: int = int(os.getenv("SIMILARITY_REFRESH_INTERVAL_SECONDS", "60"))
 
 settings = Settings()
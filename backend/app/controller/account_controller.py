@@ -0,0 +1,141 @@
+from sqlalchemy.orm import Session
+from app.models import User
+from app.models.property import Property
+from app.models.review import Review
+from app.models.booking import Booking
+from app.models.message import Message
+from app.models.archived_message import ArchivedMessage
+from app.models.message_tombstone import MessageTombstone
+from app.models.saved_search import SavedSearch, Notification
+from app.controller.change_feed_controller import ChangeFeedController
+from app.controller.property_controller import PropertyController
+from app.controller.similarity_controller import SimilarityController
+from app.utils.auth import AuthUtils
+from app.utils.cache import entity_cache
+from app.utils.search_index import saved_search_index
+from app.utils.task_queue import task_queue
+from datetime import datetime
+import secrets
+
+class AccountController:
+    @staticmethod
+    def delete_account(db: Session, user_id: int) -> bool:
+        """
+        Close an account: it is deactivated and its identity scrubbed at once,
+        which voids its tokens on every worker (authentication doesn't go
+        through the cache), and its listings, reviews, bookings and messages
+        are purged by a background task one bounded batch at a time. The users row stays
+        as an anonymous placeholder so nothing that referenced it breaks.
+        """
+        db_user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+        if not db_user:
+            return False
+
+        db_user.email = f"deleted-{user_id}@deleted.invalid"
+        db_user.username = f"deleted-{user_id}"
+        db_user.full_name = None
+        db_user.hashed_password = AuthUtils.get_password_hash(secrets.token_urlsafe(32))
+        db_user.is_active = False
+        entity_cache.invalidate_on_commit(db, User, [user_id])
+        task_queue.enqueue(
+            db, "purge_account", {"user_id": user_id},
+            idempotency_key=f"account:{user_id}:purge:0"
+        )
+        db.commit()
+        return True
+
+    @staticmethod
+    def purge_batch(db: Session, user_id: int, batch_size: int) -> bool:
+        """
+        Remove up to batch_size rows of a closed account's data (caller
+        commits); False once nothing is left. Each kind of row is drained
+        before the next, listings first so their reviews and bookings go with
+        them in the same statements.
+        """
+        owned = db.query(
+            Property.id, Property.latitude, Property.longitude, Property.price,
+            Property.city, Property.property_type, Property.bedrooms
+        ).filter(Property.owner_id == user_id).order_by(Property.id).limit(batch_size).all()
+        if owned:
+            PropertyController.delete_properties(db, owned)
+            # Ahead of the commit, but a listing being purged is fine to stop
+            # recommending even if this batch is retried
+            for prop in owned:
+                SimilarityController.on_property_deleted(prop.id)
+            return True
+
+        reviews = db.query(Review.id, Review.property_id).filter(
+            Review.user_id == user_id
+        ).limit(batch_size).all()
+        if reviews:
+            db.query(Review).filter(
+                Review.id.in_([review.id for review in reviews])
+            ).delete(synchronize_session=False)
+            for review in reviews:
+                task_queue.enqueue(
+                    db, "refresh_review_stats", {"property_id": review.property_id},
+                    idempotency_key=f"review:{review.id}:deleted"
+                )
+            return True
+
+        booking_ids = [row.id for row in db.query(Booking.id).filter(
+            Booking.user_id == user_id
+        ).limit(batch_size)]
+        if booking_ids:
+            db.query(Booking).filter(Booking.id.in_(booking_ids)).delete(synchronize_session=False)
+            return True
+
+        rented_ids = [row.id for row in db.query(Property.id).filter(
+            Property.rented_to_user_id == user_id
+        ).limit(batch_size)]
+        if rented_ids:
+            # Bulk UPDATEs skip the ORM version check, so bump version by hand
+            db.query(Property).filter(Property.id.in_(rented_ids)).update({
+                Property.rented_to_user_id: None,
+                Property.updated_at: datetime.utcnow(),
+                Property.version: Property.version + 1
+            }, synchronize_session=False)
+            ChangeFeedController.record(db, rented_ids)
+            entity_cache.invalidate_on_commit(db, Property, rented_ids)
+            return True
+
+        # Both sides of each conversation go; the tombstones tell the other
+        # participant's clients to drop their copies
+        for model in (Message, ArchivedMessage):
+            for column in (model.sender_id, model.receiver_id):
+                messages = db.query(model.id, model.sender_id, model.receiver_id).filter(
+                    column == user_id
+                ).limit(batch_size).all()
+                if messages:
+                    now = datetime.utcnow()
+                    db.execute(MessageTombstone.__table__.insert(), [
+                        {
+                            "message_id": message.id, "sender_id": message.sender_id,
+                            "receiver_id": message.receiver_id, "deleted_at": now
+                        }
+                        for message in messages
+                    ])
+                    db.query(model).filter(
+                        model.id.in_([message.id for message in messages])
+                    ).delete(synchronize_session=False)
+                    return True
+
+        notification_ids = [row.id for row in db.query(Notification.id).filter(
+            Notification.user_id == user_id
+        ).limit(batch_size)]
+        if notification_ids:
+            db.query(Notification).filter(
+                Notification.id.in_(notification_ids)
+            ).delete(synchronize_session=False)
+            return True
+
+        search_ids = [row.id for row in db.query(SavedSearch.id).filter(SavedSearch.user_id == user_id)]
+        if search_ids:
+            db.query(SavedSearch).filter(SavedSearch.id.in_(search_ids)).delete(synchronize_session=False)
+            # Other workers' indexes drop them on their next rebuild; until
+            # then match_property skips searches that no longer exist
+            for search_id in search_ids:
+                saved_search_index.remove(search_id)
+            return True
+
+        return False
@@ -3,14 +3,36 @@ from typing import Optional
 from app.models import User
 from app.schemas import UserCreate, UserUpdate
 from app.utils.auth import AuthUtils
+from app.utils.cache import entity_cache
 
 class AuthController:
     """Controller for handling authentication business logic"""
     
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> Optional[User]:
-        """Get user by email"""
-        return db.query(User).filter(User.email == email).first()
+        """Get user by email, through the entity cache"""
+        alias = f"users:email:{email.lower()}"
+        user_id = entity_cache.lookup(alias)
+        if user_id is not None:
+            user = AuthController.get_user_by_id(db, user_id)
+            # The alias isn't versioned; trust it only if it still matches
+            if user is not None and user.email.lower() == email.lower():
+                return user
+            entity_cache.forget(alias)
+        
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            entity_cache.remember(alias, user.id)
+        return user
+    
+    @staticmethod
+    def get_active_user_by_email(db: Session, email: str) -> Optional[User]:
+        """
+        Get an active user by email, bypassing the entity cache. Used to
+        authenticate, so a closed account's tokens and password stop working
+        on every worker at once rather than when their caches expire.
+        """
+        return db.query(User).filter(User.email == email, User.is_active == True).first()
     
     @staticmethod
     def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -19,8 +41,11 @@ class AuthController:
     
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-        """Get user by ID"""
-        return db.query(User).filter(User.id == user_id).first()
+        """Get user by ID, through the entity cache"""
+        return entity_cache.fetch(
+            db, User, user_id,
+            lambda: db.query(User).filter(User.id == user_id).first()
+        )
     
     @staticmethod
     def create_user(db: Session, user: UserCreate) -> User:
@@ -40,7 +65,7 @@ class AuthController:
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         """Authenticate a user with email and password"""
-        user = AuthController.get_user_by_email(db, email)
+        user = AuthController.get_active_user_by_email(db, email)
         if not user:
             return None
         if not AuthUtils.verify_password(password, user.hashed_password):
@@ -62,18 +87,8 @@ class AuthController:
         
         for key, value in update_data.items():
             setattr(db_user, key, value)
+        entity_cache.invalidate_on_commit(db, User, [user_id])
         
         db.commit()
         db.refresh(db_user)
         return db_user
-    
-    @staticmethod
-    def delete_user(db: Session, user_id: int) -> bool:
-        """Delete a user"""
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            return False
-        
-        db.delete(db_user)
-        db.commit()
-        return True
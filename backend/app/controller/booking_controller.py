@@ -0,0 +1,106 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, exists
+from app.models.booking import Booking
+from app.models.property import Property
+from app.schemas.booking import BookingCreate
+from app.utils.exceptions import BookingConflictException
+from typing import List, Optional
+from datetime import date
+
+class BookingController:
+    @staticmethod
+    def overlapping(start_date: date, end_date: date):
+        """Filter clause for bookings intersecting the half-open range [start_date, end_date)"""
+        return and_(Booking.start_date < end_date, Booking.end_date > start_date)
+
+    @staticmethod
+    def legacy_rental_free(start_date: date, end_date: date):
+        """Filter clause for properties whose is_rented window does not cover the range"""
+        return or_(
+            Property.is_rented == False,
+            Property.is_rented.is_(None),
+            and_(Property.rental_end_date.isnot(None), Property.rental_end_date < start_date),
+            and_(Property.rental_start_date.isnot(None), Property.rental_start_date >= end_date)
+        )
+
+    @staticmethod
+    def available_filter(start_date: date, end_date: date):
+        """Filter clause for properties with no booking or rental in the range"""
+        booked = exists().where(
+            Booking.property_id == Property.id,
+            BookingController.overlapping(start_date, end_date)
+        )
+        return and_(~booked, BookingController.legacy_rental_free(start_date, end_date))
+
+    @staticmethod
+    def create_booking(
+        db: Session,
+        property_id: int,
+        user_id: int,
+        booking_data: BookingCreate
+    ) -> Optional[Booking]:
+        """Create a booking, rejecting any overlap with existing bookings"""
+        # Lock the property row so concurrent bookings for it are serialized
+        # between the overlap check and the insert.
+        db_property = db.query(Property).filter(
+            Property.id == property_id
+        ).with_for_update().first()
+
+        if not db_property:
+            return None
+
+        start_date, end_date = booking_data.start_date, booking_data.end_date
+        conflict = db.query(Booking.id).filter(
+            Booking.property_id == property_id,
+            BookingController.overlapping(start_date, end_date)
+        ).first()
+        rented = db_property.is_rented and not (
+            (db_property.rental_end_date and db_property.rental_end_date < start_date) or
+            (db_property.rental_start_date and db_property.rental_start_date >= end_date)
+        )
+        if conflict or rented:
+            db.rollback()
+            raise BookingConflictException()
+
+        db_booking = Booking(
+            property_id=property_id,
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        db.add(db_booking)
+        db.commit()
+        db.refresh(db_booking)
+        return db_booking
+
+    @staticmethod
+    def get_property_bookings(
+        db: Session,
+        property_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[Booking]:
+        """Get bookings for a property, optionally limited to a date window"""
+        query = db.query(Booking).filter(Booking.property_id == property_id)
+
+        if start_date:
+            query = query.filter(Booking.end_date > start_date)
+        if end_date:
+            query = query.filter(Booking.start_date < end_date)
+
+        return query.order_by(Booking.start_date.asc()).all()
+
+    @staticmethod
+    def delete_booking(db: Session, booking_id: int, user_id: int) -> bool:
+        """Cancel a booking (by the guest or the property owner)"""
+        db_booking = db.query(Booking).join(Property).filter(
+            Booking.id == booking_id,
+            or_(Booking.user_id == user_id, Property.owner_id == user_id)
+        ).first()
+
+        if not db_booking:
+            return False
+
+        db.delete(db_booking)
+        db.commit()
+        return True
@@ -0,0 +1,69 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from app.models.property_change import PropertyChange
+from app.config import settings
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+class ChangeFeedController:
+    @staticmethod
+    def record(db: Session, property_ids: Iterable[int], op: str = UPSERT) -> None:
+        """Append feed entries for changed properties (caller commits)"""
+        rows = [{"property_id": property_id, "op": op} for property_id in property_ids]
+        if rows:
+            db.execute(PropertyChange.__table__.insert(), rows)
+
+    @staticmethod
+    def get_changes(db: Session, since: int, limit: int = 500) -> Tuple[Dict[int, str], int, bool]:
+        """
+        Read up to limit feed entries after since, collapsed to the latest op
+        per property. Returns ({property_id: op}, next cursor, has_more).
+
+        seq is handed out when a row is inserted but only visible once its
+        transaction commits, so a missing seq may be a change still in
+        flight. The page stops before the first gap until the entry after it
+        is CHANGE_FEED_SETTLE_SECONDS old; older gaps are taken to be rolled
+        back or compacted away.
+        """
+        entries = db.query(
+            PropertyChange.seq, PropertyChange.property_id, PropertyChange.op, PropertyChange.changed_at
+        ).filter(
+            PropertyChange.seq > since
+        ).order_by(PropertyChange.seq.asc()).limit(limit + 1).all()
+
+        has_more = len(entries) > limit
+        settled_before = datetime.utcnow() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+        previous = since
+        for index, entry in enumerate(entries[:limit]):
+            if entry.seq != previous + 1 and entry.changed_at is not None and entry.changed_at > settled_before:
+                # Clients poll again later rather than spin on has_more
+                entries, has_more = entries[:index], False
+                break
+            previous = entry.seq
+        entries = entries[:limit]
+
+        latest = {}
+        for entry in entries:
+            latest[entry.property_id] = entry.op
+        cursor = entries[-1].seq if entries else since
+        return latest, cursor, has_more
+
+    @staticmethod
+    def compact(db: Session) -> int:
+        """
+        Drop entries superseded by a later entry for the same property. Any
+        client cursor before the dropped entry also precedes its replacement,
+        so no client misses a change.
+        """
+        # Wrapped in a derived table because MySQL won't read the table being deleted from
+        latest = select(func.max(PropertyChange.seq).label("seq")).group_by(
+            PropertyChange.property_id
+        ).subquery()
+        deleted = db.query(PropertyChange).filter(
+            PropertyChange.seq.notin_(select(latest.c.seq))
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, tuple_
+from app.models.property import Property
+from app.models.property_grid_cell import PropertyGridCell
+from app.utils.map_grid import LEVELS, MAX_LEVEL, cells_at_all_levels, cell_for, cell_ranges, cell_count
+from app.utils.sql import lock_rollup, upsert_increment
+from app.utils.task_queue import task_queue
+from typing import Iterable, List, Tuple
+
+# (latitude, longitude, price) of a property as it enters or leaves a cell
+Point = Tuple[float, float, float]
+
+ROLLUP = "map_grid"
+
+class ClusterController:
+    @staticmethod
+    def apply_changes(
+        db: Session,
+        added: Iterable[Point] = (),
+        removed: Iterable[Point] = ()
+    ) -> None:
+        """Fold properties entering/leaving the map into every grid level (caller commits)"""
+        # Waits out a rebuild in progress, which may also have superseded
+        # the task calling this
+        lock_rollup(db, ROLLUP)
+        added_rows = [
+            {
+                "level": level, "cell_x": x, "cell_y": y, "count": 1,
+                "sum_latitude": lat, "sum_longitude": lng,
+                "min_price": price, "max_price": price
+            }
+            for lat, lng, price in added
+            for level, x, y in cells_at_all_levels(lat, lng)
+        ]
+        removed_rows = [
+            {
+                "level": level, "cell_x": x, "cell_y": y, "count": -1,
+                "sum_latitude": -lat, "sum_longitude": -lng
+            }
+            for lat, lng, _ in removed
+            for level, x, y in cells_at_all_levels(lat, lng)
+        ]
+        table = PropertyGridCell.__table__
+        keys = ["level", "cell_x", "cell_y"]
+
+        upsert_increment(
+            db, table, added_rows, keys,
+            increment_columns=["count", "sum_latitude", "sum_longitude"],
+            min_columns=["min_price"], max_columns=["max_price"]
+        )
+        if removed_rows:
+            upsert_increment(
+                db, table, removed_rows, keys,
+                increment_columns=["count", "sum_latitude", "sum_longitude"]
+            )
+            emptied = {(r["level"], r["cell_x"], r["cell_y"]) for r in removed_rows}
+            db.query(PropertyGridCell).filter(
+                tuple_(PropertyGridCell.level, PropertyGridCell.cell_x, PropertyGridCell.cell_y).in_(emptied),
+                PropertyGridCell.count <= 0
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def get_clusters(
+        db: Session,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zoom: int,
+        max_clusters: int = 256
+    ) -> Tuple[int, List[PropertyGridCell]]:
+        """
+        Get the grid cells covering a bounding box at a level suited to the map
+        zoom, coarsened until at most max_clusters cells can be in view.
+        """
+        # Two levels below the map zoom puts roughly 4x4 clusters on each tile
+        level = max(0, min(MAX_LEVEL, zoom + 2))
+        ranges = cell_ranges(min_lat, min_lng, max_lat, max_lng, level)
+        while level > 0 and cell_count(ranges) > max_clusters:
+            level -= 1
+            ranges = cell_ranges(min_lat, min_lng, max_lat, max_lng, level)
+
+        cells = db.query(PropertyGridCell).filter(
+            PropertyGridCell.level == level,
+            or_(*[
+                and_(
+                    PropertyGridCell.cell_x.between(x0, x1),
+                    PropertyGridCell.cell_y.between(y0, y1)
+                )
+                for x0, x1, y0, y1 in ranges
+            ]),
+            PropertyGridCell.count > 0
+        ).all()
+        return level, cells
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 5000) -> int:
+        """
+        Recompute every level from the properties table, tightening price
+        bounds. Holds the rollup lock throughout: grid tasks already reflected
+        in the snapshot are superseded, and later ones wait (or retry) and
+        apply on top. One level is aggregated per pass over the properties,
+        so memory holds a single level's cells.
+        """
+        lock_rollup(db, ROLLUP)
+        task_queue.supersede(db, "update_map_grid")
+
+        # Replace in one transaction so readers keep the old grid until commit
+        db.query(PropertyGridCell).delete(synchronize_session=False)
+        total = 0
+        for level in LEVELS:
+            shift = MAX_LEVEL - level
+            cells = {}
+            rows = db.query(Property.latitude, Property.longitude, Property.price).yield_per(10000)
+            for lat, lng, price in rows:
+                x, y = cell_for(lat, lng, MAX_LEVEL)
+                key = (x >> shift, y >> shift)
+                cell = cells.get(key)
+                if cell is None:
+                    cells[key] = [1, lat, lng, price, price]
+                else:
+                    cell[0] += 1
+                    cell[1] += lat
+                    cell[2] += lng
+                    if price < cell[3]:
+                        cell[3] = price
+                    if price > cell[4]:
+                        cell[4] = price
+
+            values = [
+                {
+                    "level": level, "cell_x": x, "cell_y": y, "count": count,
+                    "sum_latitude": sum_lat, "sum_longitude": sum_lng,
+                    "min_price": min_price, "max_price": max_price
+                }
+                for (x, y), (count, sum_lat, sum_lng, min_price, max_price) in cells.items()
+            ]
+            for start in range(0, len(values), batch_size):
+                db.execute(PropertyGridCell.__table__.insert(), values[start:start + batch_size])
+            total += len(values)
+        db.commit()
+        return total
@@ -0,0 +1,207 @@
+from sqlalchemy.orm import Session
+from app.models.property import Property
+from app.models.property_signature import PropertySignature, PropertyLshBucket
+from app.utils.minhash import BANDS, band_hashes, band_keys, from_bytes, geo_cell, listing_signature, probe_keys, similarity, to_bytes
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+
+# Fields whose change means the signature must be recomputed
+SIGNATURE_FIELDS = ("title", "description", "address", "latitude", "longitude")
+
+# Buckets this full come from boilerplate text shared by many listings; the
+# scan skips them rather than comparing every pair (real duplicates still
+# collide in other bands)
+MAX_BUCKET_SIZE = 200
+
+class DuplicateController:
+    @staticmethod
+    def signature_of(prop) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """MinHash signature and geo cell of a listing"""
+        return listing_signature(prop.title, prop.description, prop.address), geo_cell(prop.latitude, prop.longitude)
+
+    @staticmethod
+    def best_match(
+        db: Session,
+        property_id: Optional[int],
+        sig: np.ndarray,
+        cell: Tuple[int, int],
+        threshold: float
+    ) -> Optional[int]:
+        """
+        The earlier listing a signature most resembles at or above threshold.
+        property_id is None for a listing not inserted yet (everything is earlier).
+        """
+        matches = [
+            (other_id, score)
+            for other_id, score in DuplicateController._candidates(db, property_id, sig, cell)
+            if (property_id is None or other_id < property_id) and score >= threshold
+        ]
+        if not matches:
+            return None
+        # Highest similarity, then the oldest listing as the likely original
+        return min(matches, key=lambda match: (-match[1], match[0]))[0]
+
+    @staticmethod
+    def store(db: Session, property_id: int, sig: np.ndarray, cell: Tuple[int, int]) -> None:
+        """Write a listing's signature and LSH buckets, replacing old ones (caller commits)"""
+        db.merge(PropertySignature(
+            property_id=property_id, signature=to_bytes(sig), cell_x=cell[0], cell_y=cell[1]
+        ))
+        db.query(PropertyLshBucket).filter(
+            PropertyLshBucket.property_id == property_id
+        ).delete(synchronize_session=False)
+        db.execute(PropertyLshBucket.__table__.insert(), [
+            {"bucket": key, "property_id": property_id} for key in set(band_keys(sig, cell))
+        ])
+
+    @staticmethod
+    def find_duplicates(db: Session, property_id: int, threshold: float) -> List[Tuple[int, float]]:
+        """Indexed listings resembling property_id at or above threshold, best first"""
+        row = db.query(PropertySignature).filter(PropertySignature.property_id == property_id).first()
+        if row is None:
+            return []
+        sig = from_bytes(row.signature)
+        matches = [
+            (other_id, score)
+            for other_id, score in DuplicateController._candidates(db, property_id, sig, (row.cell_x, row.cell_y))
+            if score >= threshold
+        ]
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    @staticmethod
+    def remove_properties(db: Session, property_ids: List[int]) -> None:
+        """Drop listings from the index (caller commits)"""
+        db.query(PropertyLshBucket).filter(
+            PropertyLshBucket.property_id.in_(property_ids)
+        ).delete(synchronize_session=False)
+        db.query(PropertySignature).filter(
+            PropertySignature.property_id.in_(property_ids)
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def reindex(db: Session, batch_size: int = 1000) -> int:
+        """(Re)compute signatures for every listing, one committed batch at a time"""
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = db.query(
+                Property.id, Property.title, Property.description, Property.address,
+                Property.latitude, Property.longitude
+            ).filter(Property.id > last_id).order_by(Property.id).limit(batch_size).all()
+            if not rows:
+                return indexed
+
+            ids = [row.id for row in rows]
+            signatures, buckets = [], []
+            for row in rows:
+                sig, cell = DuplicateController.signature_of(row)
+                signatures.append({
+                    "property_id": row.id, "signature": to_bytes(sig), "cell_x": cell[0], "cell_y": cell[1]
+                })
+                buckets.extend({"bucket": key, "property_id": row.id} for key in set(band_keys(sig, cell)))
+
+            db.query(PropertyLshBucket).filter(
+                PropertyLshBucket.property_id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.query(PropertySignature).filter(
+                PropertySignature.property_id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.execute(PropertySignature.__table__.insert(), signatures)
+            db.execute(PropertyLshBucket.__table__.insert(), buckets)
+            db.commit()
+
+            indexed += len(rows)
+            last_id = ids[-1]
+
+    @staticmethod
+    def scan(db: Session, threshold: float) -> List[Tuple[int, int, float]]:
+        """
+        Every (original_id, duplicate_id, similarity) pair in the catalogue at
+        or above threshold, found by matching bands rather than comparing all
+        pairs of listings. Like the insert-time probe, listings in
+        neighbouring cells are paired too.
+        """
+        pairs = DuplicateController._band_pairs(db)
+
+        signatures: Dict[int, np.ndarray] = {}
+        needed = sorted({property_id for pair in pairs for property_id in pair})
+        for start in range(0, len(needed), 1000):
+            chunk = needed[start:start + 1000]
+            for property_id, raw in db.query(PropertySignature.property_id, PropertySignature.signature).filter(
+                PropertySignature.property_id.in_(chunk)
+            ):
+                signatures[property_id] = from_bytes(raw)
+
+        results = []
+        for first, second in sorted(pairs):
+            if first in signatures and second in signatures:
+                score = similarity(signatures[first], signatures[second])
+                if score >= threshold:
+                    results.append((first, second, score))
+        return results
+
+    @staticmethod
+    def _candidates(db: Session, property_id: Optional[int], sig: np.ndarray, cell: Tuple[int, int]) -> List[Tuple[int, float]]:
+        """Listings sharing an LSH bucket with sig, scored by estimated Jaccard similarity"""
+        query = db.query(PropertyLshBucket.property_id).filter(
+            PropertyLshBucket.bucket.in_(probe_keys(sig, cell))
+        )
+        if property_id is not None:
+            query = query.filter(PropertyLshBucket.property_id != property_id)
+        candidate_ids = {row.property_id for row in query.distinct()}
+        if not candidate_ids:
+            return []
+
+        rows = db.query(PropertySignature.property_id, PropertySignature.signature).filter(
+            PropertySignature.property_id.in_(candidate_ids)
+        ).all()
+        return [(other_id, similarity(sig, from_bytes(raw))) for other_id, raw in rows]
+
+    @staticmethod
+    def _band_pairs(db: Session) -> Set[Tuple[int, int]]:
+        """
+        (lower id, higher id) of listings sharing a band, in the same or an
+        adjacent cell. The stored buckets are keyed by a listing's own cell,
+        which would miss the adjacent ones, so the bands are hashed afresh
+        without it: one pass over the signatures, about 270 bytes a listing.
+        """
+        ids: List[int] = []
+        cells: List[Tuple[int, int]] = []
+        hashes: List[np.ndarray] = []
+        for property_id, raw, cell_x, cell_y in db.query(
+            PropertySignature.property_id, PropertySignature.signature,
+            PropertySignature.cell_x, PropertySignature.cell_y
+        ).yield_per(10000):
+            ids.append(property_id)
+            cells.append((cell_x, cell_y))
+            hashes.append(band_hashes(from_bytes(raw)))
+
+        pairs: Set[Tuple[int, int]] = set()
+        if len(ids) < 2:
+            return pairs
+        table = np.vstack(hashes)
+        for band in range(BANDS):
+            order = np.argsort(table[:, band], kind="stable")
+            column = table[order, band]
+            starts = np.flatnonzero(np.concatenate(([True], column[1:] != column[:-1])))
+            ends = np.append(starts[1:], len(column))
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                by_cell = defaultdict(list)
+                for row in order[start:end]:
+                    by_cell[cells[row]].append(ids[row])
+                for (cx, cy), here in by_cell.items():
+                    near = [
+                        other_id
+                        for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                        for other_id in by_cell.get((cx + dx, cy + dy), ())
+                    ]
+                    if len(near) > MAX_BUCKET_SIZE:
+                        continue
+                    for first in here:
+                        for second in near:
+                            if first < second:
+                                pairs.add((first, second))
+        return pairs
@@ -0,0 +1,125 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.property import Property
+from app.models.property_price_history import PropertyPriceHistory
+from app.models.market_price_bucket import MarketPriceBucket, UNKNOWN_BEDROOMS
+from app.utils.price_sketch import bucket_of, quantiles
+from app.utils.sql import lock_rollup, upsert_increment
+from app.utils.task_queue import task_queue
+from typing import Iterable, List, Optional, Tuple
+
+# (city_key, property_type, bedrooms, price) of a listing entering or leaving the market
+Listing = Tuple[str, str, int, float]
+
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+ROLLUP = "market_stats"
+
+class MarketController:
+    @staticmethod
+    def listing_of(prop) -> Listing:
+        """A property's market segment and price, as stored in the rollups"""
+        property_type = getattr(prop.property_type, "value", prop.property_type)
+        bedrooms = prop.bedrooms if prop.bedrooms is not None else UNKNOWN_BEDROOMS
+        return (prop.city.strip().lower(), property_type, bedrooms, prop.price)
+
+    @staticmethod
+    def apply_changes(
+        db: Session,
+        added: Iterable[Listing] = (),
+        removed: Iterable[Listing] = ()
+    ) -> None:
+        """Fold listings entering/leaving the market into their segment sketches (caller commits)"""
+        # Waits out a rebuild in progress (see ClusterController.apply_changes)
+        lock_rollup(db, ROLLUP)
+        rows = [
+            {
+                "city_key": city_key, "property_type": property_type, "bedrooms": bedrooms,
+                "bucket": bucket_of(price), "count": sign, "sum_price": sign * price
+            }
+            for listings, sign in ((added, 1), (removed, -1))
+            for city_key, property_type, bedrooms, price in listings
+        ]
+        upsert_increment(
+            db, MarketPriceBucket.__table__, rows,
+            ["city_key", "property_type", "bedrooms", "bucket"],
+            increment_columns=["count", "sum_price"]
+        )
+        if any(row["count"] < 0 for row in rows):
+            db.query(MarketPriceBucket).filter(MarketPriceBucket.count <= 0).filter(
+                MarketPriceBucket.city_key.in_({row["city_key"] for row in rows})
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def get_stats(
+        db: Session,
+        city: str,
+        property_type: Optional[str] = None,
+        bedrooms: Optional[int] = None
+    ) -> dict:
+        """Count, mean and percentiles of asking rent in a segment, merged from its bucket rows"""
+        query = db.query(
+            MarketPriceBucket.bucket,
+            func.sum(MarketPriceBucket.count).label("count"),
+            func.sum(MarketPriceBucket.sum_price).label("sum_price")
+        ).filter(MarketPriceBucket.city_key == city.strip().lower())
+        if property_type is not None:
+            query = query.filter(MarketPriceBucket.property_type == property_type)
+        if bedrooms is not None:
+            query = query.filter(MarketPriceBucket.bedrooms == bedrooms)
+        rows = query.group_by(MarketPriceBucket.bucket).order_by(MarketPriceBucket.bucket).all()
+
+        count = sum(int(row.count) for row in rows)
+        total = sum(float(row.sum_price) for row in rows)
+        estimates = quantiles(((row.bucket, int(row.count)) for row in rows), PERCENTILES)
+        return {
+            "count": count,
+            "average_price": total / count if count else None,
+            **{f"p{int(q * 100)}": value for q, value in zip(PERCENTILES, estimates)},
+        }
+
+    @staticmethod
+    def record_price(db: Session, property_id: int, price: float, previous_price: Optional[float] = None) -> None:
+        """Append a listing's new price to its history (caller commits)"""
+        db.add(PropertyPriceHistory(property_id=property_id, price=price, previous_price=previous_price))
+
+    @staticmethod
+    def get_price_history(db: Session, property_id: int, limit: int = 100) -> List[PropertyPriceHistory]:
+        """A listing's price changes, oldest first"""
+        return db.query(PropertyPriceHistory).filter(
+            PropertyPriceHistory.property_id == property_id
+        ).order_by(PropertyPriceHistory.id).limit(limit).all()
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 5000) -> int:
+        """
+        Recompute every segment sketch from the properties table, correcting
+        any drift. Serialized with update_market_stats tasks as the map grid
+        rebuild is with its tasks.
+        """
+        lock_rollup(db, ROLLUP)
+        task_queue.supersede(db, "update_market_stats")
+        buckets = {}
+        rows = db.query(
+            Property.city, Property.property_type, Property.bedrooms, Property.price
+        ).yield_per(10000)
+        for row in rows:
+            city_key, property_type, bedrooms, price = MarketController.listing_of(row)
+            key = (city_key, property_type, bedrooms, bucket_of(price))
+            bucket = buckets.setdefault(key, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += price
+
+        # Replace in one transaction so readers keep the old rollups until commit
+        db.query(MarketPriceBucket).delete(synchronize_session=False)
+        values = [
+            {
+                "city_key": city_key, "property_type": property_type, "bedrooms": bedrooms,
+                "bucket": bucket, "count": count, "sum_price": sum_price
+            }
+            for (city_key, property_type, bedrooms, bucket), (count, sum_price) in buckets.items()
+        ]
+        for start in range(0, len(values), batch_size):
+            db.execute(MarketPriceBucket.__table__.insert(), values[start:start + batch_size])
+        db.commit()
+        return len(values)
@@ -1,10 +1,14 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, func
 from app.models.message import Message
+from app.models.message_tombstone import MessageTombstone
+from app.models.archived_message import ArchivedMessage
 from app.models.user import User
 from app.models.property import Property
 from app.schemas.message import MessageCreate
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import time
 
 class MessageController:
     @staticmethod
@@ -29,24 +33,128 @@ class MessageController:
         other_user_id: int,
         property_id: Optional[int] = None
     ) -> List[Message]:
-        """Get all messages in a conversation between two users"""
-        query = db.query(Message).filter(
-            or_(
-                and_(
-                    Message.sender_id == user_id,
-                    Message.receiver_id == other_user_id
-                ),
-                and_(
-                    Message.sender_id == other_user_id,
-                    Message.receiver_id == user_id
+        """Get all messages in a conversation between two users, archived ones included"""
+        messages = []
+        for model in (ArchivedMessage, Message):
+            query = db.query(model).filter(
+                or_(
+                    and_(
+                        model.sender_id == user_id,
+                        model.receiver_id == other_user_id
+                    ),
+                    and_(
+                        model.sender_id == other_user_id,
+                        model.receiver_id == user_id
+                    )
                 )
             )
+            
+            if property_id:
+                query = query.filter(model.property_id == property_id)
+            
+            messages.extend(query.all())
+        
+        messages.sort(key=lambda message: (message.created_at, message.id))
+        return messages
+
+    @staticmethod
+    def get_conversation_page(
+        db: Session,
+        user_id: int,
+        other_user_id: int,
+        since_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+        property_id: Optional[int] = None
+    ) -> Tuple[List[Message], bool]:
+        """
+        Get one page of a conversation in id order, plus whether more exist.
+        With since_id: the oldest messages newer than it. With before_id: the
+        newest messages older than it. With neither: the latest messages.
+        """
+        newer = since_id is not None
+        pages = MessageController._pair_pages(
+            db, Message, user_id, other_user_id, since_id, before_id, limit, property_id
         )
         
-        if property_id:
-            query = query.filter(Message.property_id == property_id)
+        # Archived ids are all at or below archived_through, so the archive
+        # only has to be read when the page reaches back that far
+        archived_through = MessageController.archived_through(db)
+        if archived_through is not None:
+            if newer:
+                reaches_archive = since_id < archived_through
+            else:
+                reaches_archive = sum(1 for message in pages if message.id > archived_through) <= limit
+            if reaches_archive:
+                pages.extend(MessageController._pair_pages(
+                    db, ArchivedMessage, user_id, other_user_id, since_id, before_id, limit, property_id
+                ))
         
-        return query.order_by(Message.created_at.asc()).all()
+        pages.sort(key=lambda message: message.id, reverse=not newer)
+        has_more = len(pages) > limit
+        page = pages[:limit]
+        page.sort(key=lambda message: message.id)
+        return page, has_more
+
+    @staticmethod
+    def _pair_pages(
+        db: Session,
+        model,
+        user_id: int,
+        other_user_id: int,
+        since_id: Optional[int],
+        before_id: Optional[int],
+        limit: int,
+        property_id: Optional[int]
+    ) -> list:
+        """
+        Up to limit + 1 messages of each direction of a conversation from one
+        table. Each direction is a range scan on (sender_id, receiver_id, id);
+        fetching both and merging avoids an OR across pairs.
+        """
+        pages = []
+        for sender_id, receiver_id in ((user_id, other_user_id), (other_user_id, user_id)):
+            query = db.query(model).filter(
+                model.sender_id == sender_id,
+                model.receiver_id == receiver_id
+            )
+            if property_id:
+                query = query.filter(model.property_id == property_id)
+            if since_id is not None:
+                query = query.filter(model.id > since_id).order_by(model.id.asc())
+            else:
+                if before_id is not None:
+                    query = query.filter(model.id < before_id)
+                query = query.order_by(model.id.desc())
+            pages.extend(query.limit(limit + 1).all())
+        return pages
+
+    @staticmethod
+    def archived_through(db: Session) -> Optional[int]:
+        """Highest archived message id, or None while nothing is archived"""
+        return db.query(func.max(ArchivedMessage.id)).scalar()
+
+    @staticmethod
+    def get_tombstones(
+        db: Session,
+        user_id: int,
+        other_user_id: int,
+        since_id: int = 0
+    ) -> List[MessageTombstone]:
+        """Get deletions in a conversation recorded after the tombstone cursor"""
+        return db.query(MessageTombstone).filter(
+            or_(
+                and_(
+                    MessageTombstone.sender_id == user_id,
+                    MessageTombstone.receiver_id == other_user_id
+                ),
+                and_(
+                    MessageTombstone.sender_id == other_user_id,
+                    MessageTombstone.receiver_id == user_id
+                )
+            ),
+            MessageTombstone.id > since_id
+        ).order_by(MessageTombstone.id.asc()).all()
 
     @staticmethod
     def get_conversations(db: Session, user_id: int) -> List[dict]:
@@ -54,25 +162,29 @@ class MessageController:
         # Get all unique users the current user has conversed with
         conversations = []
         
-        # Subquery to get unique conversation partners
-        sent_to = db.query(Message.receiver_id).filter(Message.sender_id == user_id).distinct()
-        received_from = db.query(Message.sender_id).filter(Message.receiver_id == user_id).distinct()
-        
-        # Combine both lists
+        # Unique conversation partners, including conversations that now
+        # only exist in the archive
         all_user_ids = set()
-        for user in sent_to:
-            all_user_ids.add(user[0])
-        for user in received_from:
-            all_user_ids.add(user[0])
+        for model in (Message, ArchivedMessage):
+            sent_to = db.query(model.receiver_id).filter(model.sender_id == user_id).distinct()
+            received_from = db.query(model.sender_id).filter(model.receiver_id == user_id).distinct()
+            for user in sent_to:
+                all_user_ids.add(user[0])
+            for user in received_from:
+                all_user_ids.add(user[0])
         
         for other_user_id in all_user_ids:
-            # Get last message in conversation
-            last_message = db.query(Message).filter(
-                or_(
-                    and_(Message.sender_id == user_id, Message.receiver_id == other_user_id),
-                    and_(Message.sender_id == other_user_id, Message.receiver_id == user_id)
-                )
-            ).order_by(Message.created_at.desc()).first()
+            # Get last message in conversation, from the archive only if
+            # nothing recent is left
+            for model in (Message, ArchivedMessage):
+                last_message = db.query(model).filter(
+                    or_(
+                        and_(model.sender_id == user_id, model.receiver_id == other_user_id),
+                        and_(model.sender_id == other_user_id, model.receiver_id == user_id)
+                    )
+                ).order_by(model.created_at.desc()).first()
+                if last_message:
+                    break
             
             if last_message:
                 # Get unread count
@@ -108,17 +220,18 @@ class MessageController:
         return conversations
 
     @staticmethod
-    def mark_as_read(db: Session, user_id: int, other_user_id: int) -> int:
-        """Mark all messages from other_user as read"""
-        messages = db.query(Message).filter(
+    def mark_as_read(db: Session, user_id: int, other_user_id: int, message_ids: Optional[List[int]] = None) -> int:
+        """Mark messages from other_user as read, in one UPDATE; only message_ids if given"""
+        query = db.query(Message).filter(
             Message.sender_id == other_user_id,
             Message.receiver_id == user_id,
             Message.is_read == False
-        ).all()
-        
-        count = len(messages)
-        for message in messages:
-            message.is_read = True
+        )
+        if message_ids is not None:
+            if not message_ids:
+                return 0
+            query = query.filter(Message.id.in_(message_ids))
+        count = query.update({Message.is_read: True}, synchronize_session=False)
         
         db.commit()
         return count
@@ -131,16 +244,85 @@ class MessageController:
             Message.is_read == False
         ).scalar() or 0
 
+    @staticmethod
+    def get_unread_counts_by_property(db: Session, user_id: int, property_ids: List[int]) -> dict:
+        """Get unread message counts received by a user, per property, in one grouped query"""
+        if not property_ids:
+            return {}
+        
+        rows = db.query(Message.property_id, func.count(Message.id)).filter(
+            Message.receiver_id == user_id,
+            Message.is_read == False,
+            Message.property_id.in_(property_ids)
+        ).group_by(Message.property_id).all()
+        
+        return {property_id: count for property_id, count in rows}
+
     @staticmethod
     def delete_message(db: Session, message_id: int, user_id: int) -> bool:
-        """Delete a message (only if user is sender)"""
-        message = db.query(Message).filter(
-            Message.id == message_id,
-            Message.sender_id == user_id
-        ).first()
+        """Delete a message (only if user is sender), wherever it is stored"""
+        # Locking reads wait out an archive batch moving this message, then
+        # see where it ended up
+        message = None
+        for model in (Message, ArchivedMessage):
+            message = db.query(model.id, model.sender_id, model.receiver_id).filter(
+                model.id == message_id,
+                model.sender_id == user_id
+            ).with_for_update().first()
+            if message:
+                break
         
         if message:
-            db.delete(message)
+            db.add(MessageTombstone(
+                message_id=message.id,
+                sender_id=message.sender_id,
+                receiver_id=message.receiver_id
+            ))
+            # By id from both tables, so no copy survives a move in progress
+            for model in (Message, ArchivedMessage):
+                db.query(model).filter(model.id == message_id).delete(synchronize_session=False)
             db.commit()
             return True
         return False
+
+    @staticmethod
+    def archive_messages(
+        db: Session,
+        older_than_days: int,
+        batch_size: int = 1000,
+        max_batches: int = 50,
+        pause_seconds: float = 0.5
+    ) -> int:
+        """
+        Move read messages older than the horizon into messages_archive, one
+        committed batch at a time with a pause in between so replication and
+        foreground writes keep up. Unread messages stay until they are read,
+        which keeps every unread count a query on the hot table alone.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        columns = ["id", "sender_id", "receiver_id", "property_id", "content", "is_read", "created_at"]
+        archived = 0
+        for batch in range(max_batches):
+            if batch:
+                time.sleep(pause_seconds)
+            # A primary key range scan from the oldest message: everything
+            # it passes over that isn't archived here is an unread straggler
+            ids = [row.id for row in db.query(Message.id).filter(
+                Message.is_read == True,
+                Message.created_at < cutoff
+            ).order_by(Message.id).limit(batch_size)]
+            if not ids:
+                break
+            
+            now = datetime.utcnow()
+            # Locked so a message deleted mid-move can't reappear in the archive
+            rows = db.query(*[getattr(Message, column) for column in columns]).filter(
+                Message.id.in_(ids)
+            ).with_for_update().all()
+            db.execute(ArchivedMessage.__table__.insert(), [
+                dict(zip(columns, row), archived_at=now) for row in rows
+            ])
+            db.query(Message).filter(Message.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            archived += len(rows)
+        return archived
@@ -1,17 +1,72 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, and_, inspect
 from app.models.property import Property
 from app.models.review import Review
-from app.schemas.property import PropertyCreate, PropertyUpdate
-from typing import List, Optional
+from app.models.booking import Booking
+from app.models.message import Message
+from app.models.archived_message import ArchivedMessage
+from app.models.property_price_history import PropertyPriceHistory
+from app.controller.auth_controller import AuthController
+from app.controller.booking_controller import BookingController
+from app.controller.view_controller import ViewController
+from app.controller.similarity_controller import SimilarityController
+from app.controller.change_feed_controller import ChangeFeedController, DELETE
+from app.controller.duplicate_controller import DuplicateController, SIGNATURE_FIELDS
+from app.controller.market_controller import MarketController
+from app.controller.saved_search_controller import SavedSearchController
+from app.models.property_view import PropertyViewStats, PropertyViewBucket
+from app.schemas.property import PropertyCreate, PropertyUpdate, PropertySort, RentalStatusUpdate
+from app.utils.cache import entity_cache
+from app.utils.task_queue import task_queue
+from app.utils.geocoder import geocoder
+from app.config import settings
+from app.utils.exceptions import LocationRequiredException, PreconditionFailedException, VersionConflictException
+from typing import List, Optional, Tuple
+from datetime import date, datetime
 import json
 
+# Fields whose change means the listing's city/country must be resolved again
+LOCATION_FIELDS = ("city", "country", "latitude", "longitude")
+
+# ORDER BY clauses per sort option; every one ends in id so pages are stable
+SORT_ORDERS = {
+    PropertySort.PRICE_ASC: (Property.price.asc(), Property.id.asc()),
+    PropertySort.PRICE_DESC: (Property.price.desc(), Property.id.desc()),
+    PropertySort.NEWEST: (Property.created_at.desc(), Property.id.desc()),
+    PropertySort.RATING: (Property.average_rating.desc(), Property.id.desc()),
+}
+
 class PropertyController:
+    @staticmethod
+    def locate(
+        latitude: float,
+        longitude: float,
+        city: Optional[str] = None,
+        country: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Canonical city/country for a listing's coordinates, so city filters
+        match regardless of how the owner spelled them. Falls back to the
+        given names where no gazetteer city is within range.
+        """
+        if settings.GEOCODER_ENABLED:
+            place = geocoder.resolve(latitude, longitude, settings.GEOCODER_MAX_DISTANCE_KM)
+            if place is not None:
+                return place
+        if not city or not country:
+            raise LocationRequiredException()
+        return city, country
+    
     @staticmethod
     def create_property(db: Session, property_data: PropertyCreate, owner_id: int) -> Property:
         """Create a new property"""
         # Convert images list to JSON string
         images_json = json.dumps(property_data.images) if property_data.images else json.dumps([])
+        city, country = PropertyController.locate(
+            property_data.latitude, property_data.longitude, property_data.city, property_data.country
+        )
         
         db_property = Property(
             title=property_data.title,
@@ -19,8 +74,8 @@ class PropertyController:
             property_type=property_data.property_type,
             price=property_data.price,
             address=property_data.address,
-            city=property_data.city,
-            country=property_data.country,
+            city=city,
+            country=country,
             latitude=property_data.latitude,
             longitude=property_data.longitude,
             bedrooms=property_data.bedrooms,
@@ -30,9 +85,33 @@ class PropertyController:
             owner_id=owner_id
         )
         
+        # Matched before the INSERT so the flag doesn't cost an UPDATE (and a version)
+        sig, cell = DuplicateController.signature_of(db_property)
+        db_property.possible_duplicate_of = DuplicateController.best_match(
+            db, None, sig, cell, settings.DUPLICATE_THRESHOLD
+        )
+        
         db.add(db_property)
+        db.flush()
+        DuplicateController.store(db, db_property.id, sig, cell)
+        task_queue.enqueue(
+            db, "update_map_grid",
+            {"added": [(db_property.latitude, db_property.longitude, db_property.price)]},
+            idempotency_key=f"grid:{db_property.id}:created"
+        )
+        task_queue.enqueue(
+            db, "update_market_stats", {"added": [MarketController.listing_of(db_property)]},
+            idempotency_key=f"market:{db_property.id}:created"
+        )
+        MarketController.record_price(db, db_property.id, db_property.price)
+        task_queue.enqueue(
+            db, "match_saved_searches", {"property_id": db_property.id},
+            idempotency_key=f"searches:{db_property.id}:created"
+        )
+        ChangeFeedController.record(db, [db_property.id])
         db.commit()
         db.refresh(db_property)
+        SimilarityController.on_property_saved(db_property)
         return db_property
     
     @staticmethod
@@ -44,10 +123,13 @@ class PropertyController:
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
         city: Optional[str] = None,
-        country: Optional[str] = None
+        country: Optional[str] = None,
+        available_from: Optional[date] = None,
+        available_to: Optional[date] = None,
+        sort: Optional[PropertySort] = None
     ) -> List[Property]:
         """Get all properties with optional filters"""
-        query = db.query(Property).options(joinedload(Property.owner))
+        query = db.query(Property.id)
         
         if property_type:
             query = query.filter(Property.property_type == property_type)
@@ -56,33 +138,92 @@ class PropertyController:
         if max_price:
             query = query.filter(Property.price <= max_price)
         if city:
-            query = query.filter(Property.city.ilike(f"%{city}%"))
+            # Equality (case-insensitive under the MySQL collation) so the
+            # (city, <sort key>, id) indexes can serve the page
+            query = query.filter(Property.city == city)
         if country:
             query = query.filter(Property.country.ilike(f"%{country}%"))
+        if available_from and available_to:
+            query = query.filter(BookingController.available_filter(available_from, available_to))
+        
+        if sort == PropertySort.TRENDING:
+            recent = ViewController.trending_scores(db)
+            score = func.coalesce(recent.c.views, 0)
+            query = query.outerjoin(recent, recent.c.property_id == Property.id)
+            query = query.add_columns(score.label("score"))
+            order_by = (score.desc(), Property.id.desc())
+        else:
+            order_by = SORT_ORDERS.get(sort, (Property.id.asc(),))
         
-        return query.offset(skip).limit(limit).all()
+        # Deferred join: pick the page of ids from the index first, then load
+        # full rows (and owners) for just those ids.
+        page = query.order_by(*order_by).offset(skip).limit(limit).subquery()
+        if sort == PropertySort.TRENDING:
+            order_by = (page.c.score.desc(), Property.id.desc())
+        return db.query(Property).options(
+            joinedload(Property.owner)
+        ).join(page, Property.id == page.c.id).order_by(*order_by).all()
     
     @staticmethod
     def get_property_by_id(db: Session, property_id: int) -> Optional[Property]:
-        """Get property by ID"""
+        """Get property by ID, through the entity cache"""
+        db_property = entity_cache.fetch(
+            db, Property, property_id,
+            lambda: db.query(Property).filter(Property.id == property_id).first()
+        )
+        if db_property is not None and 'owner' in inspect(db_property).unloaded:
+            # Resolve the owner through the cache too instead of lazy-loading it
+            owner = AuthController.get_user_by_id(db, db_property.owner_id)
+            set_committed_value(db_property, 'owner', owner)
+        return db_property
+    
+    @staticmethod
+    def get_properties_by_ids(db: Session, property_ids: List[int]) -> List[Property]:
+        """Get several properties (with owners, without reviews) in one query"""
+        if not property_ids:
+            return []
         return db.query(Property).options(
-            joinedload(Property.owner),
-            joinedload(Property.reviews)
-        ).filter(Property.id == property_id).first()
+            joinedload(Property.owner)
+        ).filter(Property.id.in_(property_ids)).all()
+    
+    @staticmethod
+    def get_property_for_update(db: Session, property_id: int) -> Optional[Property]:
+        """Get property by ID straight from the database, so version checks see the current row"""
+        return db.query(Property).filter(Property.id == property_id).first()
+    
+    @staticmethod
+    def property_exists(db: Session, property_id: int) -> bool:
+        """Check whether a property exists without loading it"""
+        return db.query(Property.id).filter(Property.id == property_id).first() is not None
+    
+    @staticmethod
+    def get_properties_by_owner(
+        db: Session,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Property]:
+        """Get a page of properties by owner, newest first"""
+        return db.query(Property).filter(
+            Property.owner_id == owner_id
+        ).order_by(Property.id.desc()).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_properties_by_owner(db: Session, owner_id: int) -> List[Property]:
-        """Get all properties by owner"""
-        return db.query(Property).filter(Property.owner_id == owner_id).all()
+    def count_properties_by_owner(db: Session, owner_id: int) -> int:
+        """Count properties by owner"""
+        return db.query(func.count(Property.id)).filter(
+            Property.owner_id == owner_id
+        ).scalar() or 0
     
     @staticmethod
     def update_property(
         db: Session,
         property_id: int,
         property_data: PropertyUpdate,
-        owner_id: int
+        owner_id: int,
+        expected_version: Optional[int] = None
     ) -> Optional[Property]:
-        """Update property"""
+        """Update property, failing if it changed since expected_version was read"""
         db_property = db.query(Property).filter(
             Property.id == property_id,
             Property.owner_id == owner_id
@@ -90,6 +231,8 @@ class PropertyController:
         
         if not db_property:
             return None
+        if expected_version is not None and db_property.version != expected_version:
+            PropertyController._precondition_failed(db_property.id)
         
         update_data = property_data.dict(exclude_unset=True)
         
@@ -97,13 +240,85 @@ class PropertyController:
         if 'images' in update_data and update_data['images'] is not None:
             update_data['images'] = json.dumps(update_data['images'])
         
+        old_point = (db_property.latitude, db_property.longitude, db_property.price)
+        old_listing = MarketController.listing_of(db_property)
+        old_searchable = SavedSearchController.listing_of(db_property)
+        old_text = tuple(getattr(db_property, field) for field in SIGNATURE_FIELDS)
+        
         for field, value in update_data.items():
             setattr(db_property, field, value)
         
-        db.commit()
+        if any(field in update_data for field in LOCATION_FIELDS):
+            db_property.city, db_property.country = PropertyController.locate(
+                db_property.latitude, db_property.longitude, db_property.city, db_property.country
+            )
+        
+        if tuple(getattr(db_property, field) for field in SIGNATURE_FIELDS) != old_text:
+            sig, cell = DuplicateController.signature_of(db_property)
+            db_property.possible_duplicate_of = DuplicateController.best_match(
+                db, property_id, sig, cell, settings.DUPLICATE_THRESHOLD
+            )
+            DuplicateController.store(db, property_id, sig, cell)
+        
+        new_point = (db_property.latitude, db_property.longitude, db_property.price)
+        if new_point != old_point:
+            # Keyed by the version being replaced, which only one write can win
+            task_queue.enqueue(
+                db, "update_map_grid", {"added": [new_point], "removed": [old_point]},
+                idempotency_key=f"grid:{property_id}:v{db_property.version}"
+            )
+        new_listing = MarketController.listing_of(db_property)
+        if new_listing != old_listing:
+            task_queue.enqueue(
+                db, "update_market_stats", {"added": [new_listing], "removed": [old_listing]},
+                idempotency_key=f"market:{property_id}:v{db_property.version}"
+            )
+        if db_property.price != old_point[2]:
+            MarketController.record_price(db, property_id, db_property.price, old_point[2])
+        if SavedSearchController.listing_of(db_property) != old_searchable:
+            task_queue.enqueue(
+                db, "match_saved_searches", {"property_id": property_id},
+                idempotency_key=f"searches:{property_id}:v{db_property.version}"
+            )
+        ChangeFeedController.record(db, [property_id])
+        entity_cache.invalidate_on_commit(db, Property, [property_id])
+        
+        PropertyController._commit_versioned(db, db_property.id)
+        db.refresh(db_property)
+        SimilarityController.on_property_saved(db_property)
+        return db_property
+    
+    @staticmethod
+    def update_rental_status(
+        db: Session,
+        db_property: Property,
+        rental_status: RentalStatusUpdate,
+        expected_version: Optional[int] = None
+    ) -> Property:
+        """
+        Update a property's rental status, failing if it changed since
+        expected_version was read. db_property must come from
+        get_property_for_update, never the entity cache.
+        """
+        if expected_version is not None and db_property.version != expected_version:
+            PropertyController._precondition_failed(db_property.id)
+        db_property.is_rented = rental_status.is_rented
+        db_property.rental_start_date = rental_status.rental_start_date
+        db_property.rental_end_date = rental_status.rental_end_date
+        db_property.rented_to_user_id = rental_status.rented_to_user_id
+        ChangeFeedController.record(db, [db_property.id])
+        entity_cache.invalidate_on_commit(db, Property, [db_property.id])
+        
+        PropertyController._commit_versioned(db, db_property.id)
         db.refresh(db_property)
         return db_property
     
+    @staticmethod
+    def _precondition_failed(property_id: int) -> None:
+        """Raise 412, dropping the cached row so the client's re-read gets the current ETag"""
+        entity_cache.invalidate([entity_cache.key(Property, property_id)])
+        raise PreconditionFailedException()
+    
     @staticmethod
     def delete_property(db: Session, property_id: int, owner_id: int) -> bool:
         """Delete property"""
@@ -115,10 +330,61 @@ class PropertyController:
         if not db_property:
             return False
         
-        db.delete(db_property)
+        PropertyController.delete_properties(db, [db_property])
         db.commit()
+        SimilarityController.on_property_deleted(property_id)
         return True
     
+    @staticmethod
+    def delete_properties(db: Session, properties: List[Property]) -> None:
+        """
+        Delete listings and what hangs off them with one statement per table
+        (caller commits). properties may be rows of just the columns the map
+        grid and market rollups need. Messages about a listing are kept and
+        detached from it.
+        """
+        property_ids = [prop.id for prop in properties]
+        for model in (Review, Booking, PropertyViewStats, PropertyViewBucket, PropertyPriceHistory):
+            db.query(model).filter(
+                model.property_id.in_(property_ids)
+            ).delete(synchronize_session=False)
+        for model in (Message, ArchivedMessage):
+            db.query(model).filter(
+                model.property_id.in_(property_ids)
+            ).update({model.property_id: None}, synchronize_session=False)
+        DuplicateController.remove_properties(db, property_ids)
+        
+        # A listing is deleted once, so its id keys the batch it went out in
+        task_queue.enqueue(
+            db, "update_map_grid",
+            {"removed": [(prop.latitude, prop.longitude, prop.price) for prop in properties]},
+            idempotency_key=f"grid:{property_ids[0]}:deleted"
+        )
+        task_queue.enqueue(
+            db, "update_market_stats",
+            {"removed": [MarketController.listing_of(prop) for prop in properties]},
+            idempotency_key=f"market:{property_ids[0]}:deleted"
+        )
+        ChangeFeedController.record(db, property_ids, DELETE)
+        entity_cache.invalidate_on_commit(db, Property, property_ids)
+        db.query(Property).filter(Property.id.in_(property_ids)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def refresh_review_stats(db: Session, property_id: int) -> None:
+        """Recompute the denormalized rating columns (caller commits)"""
+        stats = db.query(
+            func.avg(Review.rating).label('average_rating'),
+            func.count(Review.id).label('review_count')
+        ).filter(Review.property_id == property_id).first()
+        
+        # Leaves version alone: a guest's review must not fail the owner's If-Match edits
+        db.query(Property).filter(Property.id == property_id).update({
+            Property.average_rating: float(stats.average_rating) if stats.average_rating else None,
+            Property.review_count: stats.review_count
+        }, synchronize_session=False)
+        ChangeFeedController.record(db, [property_id])
+        entity_cache.invalidate_on_commit(db, Property, [property_id])
+    
     @staticmethod
     def get_property_stats(db: Session, property_id: int) -> dict:
         """Get property statistics (average rating, review count)"""
@@ -131,3 +397,44 @@ class PropertyController:
             'average_rating': float(stats.average_rating) if stats.average_rating else None,
             'review_count': stats.review_count
         }
+    
+    @staticmethod
+    def expire_ended_rentals(db: Session, today: date) -> List[int]:
+        """Mark every rental that ended before today as available, in one UPDATE"""
+        ended = and_(
+            Property.is_rented == True,
+            Property.rental_end_date < today
+        )
+        property_ids = [
+            row.id for row in db.query(Property.id).filter(ended).with_for_update().all()
+        ]
+        if not property_ids:
+            db.rollback()
+            return []
+        
+        # Bulk UPDATEs skip the ORM version check, so bump version (and
+        # updated_at, the change cursor) by hand to fail stale If-Match writes
+        db.query(Property).filter(Property.id.in_(property_ids), ended).update(
+            {
+                Property.is_rented: False,
+                Property.updated_at: datetime.utcnow(),
+                Property.version: Property.version + 1
+            },
+            synchronize_session=False
+        )
+        ChangeFeedController.record(db, property_ids)
+        entity_cache.invalidate_on_commit(db, Property, property_ids)
+        db.commit()
+        return property_ids
+    
+    @staticmethod
+    def _commit_versioned(db: Session, property_id: int) -> None:
+        """Commit an ORM update of a Property, mapping a lost compare-and-swap to 409"""
+        try:
+            db.commit()
+        except StaleDataError:
+            # UPDATE ... WHERE version = <read> matched no row: someone else won.
+            # The read may have come from a stale cache entry, so drop it.
+            db.rollback()
+            entity_cache.invalidate([entity_cache.key(Property, property_id)])
+            raise VersionConflictException()
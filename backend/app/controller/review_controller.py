@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.exc import IntegrityError
 from app.models.review import Review
 from app.schemas.review import ReviewCreate
+from app.utils.task_queue import task_queue
 from typing import List, Optional
 
 class ReviewController:
@@ -10,8 +12,8 @@ class ReviewController:
         review_data: ReviewCreate,
         property_id: int,
         user_id: int
-    ) -> Review:
-        """Create a new review"""
+    ) -> Optional[Review]:
+        """Create a new review; None if the user has already reviewed the property"""
         db_review = Review(
             property_id=property_id,
             user_id=user_id,
@@ -20,6 +22,16 @@ class ReviewController:
         )
         
         db.add(db_review)
+        try:
+            db.flush()
+        except IntegrityError:
+            # Lost a race with a concurrent review by the same user
+            db.rollback()
+            return None
+        task_queue.enqueue(
+            db, "refresh_review_stats", {"property_id": property_id},
+            idempotency_key=f"review:{db_review.id}:created"
+        )
         db.commit()
         db.refresh(db_review)
         return db_review
@@ -55,6 +67,10 @@ class ReviewController:
             return False
         
         db.delete(db_review)
+        task_queue.enqueue(
+            db, "refresh_review_stats", {"property_id": db_review.property_id},
+            idempotency_key=f"review:{review_id}:deleted"
+        )
         db.commit()
         return True
     
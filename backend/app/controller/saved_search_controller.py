@@ -0,0 +1,177 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.property import Property
+from app.models.saved_search import SavedSearch, Notification
+from app.schemas.saved_search import SavedSearchCreate
+from app.utils.search_index import Listing, SavedSearchIndex, Search, saved_search_index
+from app.utils.sql import insert_ignore
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import threading
+
+MAX_SEARCHES_PER_USER = 20
+
+_build_lock = threading.Lock()
+_synced_at: Optional[datetime] = None
+
+def _to_search(row) -> Search:
+    return (
+        row.id, row.user_id, row.property_type, row.min_price, row.max_price,
+        row.city.strip().lower() if row.city else None,
+        row.country.strip().lower() if row.country else None,
+        row.latitude, row.longitude, row.radius_km
+    )
+
+class SavedSearchController:
+    @staticmethod
+    def listing_of(prop) -> Listing:
+        """The fields of a listing that saved searches filter on"""
+        return (
+            getattr(prop.property_type, "value", prop.property_type), prop.price,
+            prop.city.strip().lower(), prop.country.strip().lower(), prop.latitude, prop.longitude
+        )
+
+    @staticmethod
+    def create_search(db: Session, user_id: int, search_data: SavedSearchCreate) -> Optional[SavedSearch]:
+        """Save a search; None if the user already has MAX_SEARCHES_PER_USER"""
+        count = db.query(func.count(SavedSearch.id)).filter(SavedSearch.user_id == user_id).scalar()
+        if count >= MAX_SEARCHES_PER_USER:
+            return None
+
+        db_search = SavedSearch(
+            user_id=user_id,
+            name=search_data.name,
+            property_type=search_data.property_type.value if search_data.property_type else None,
+            min_price=search_data.min_price,
+            max_price=search_data.max_price,
+            city=search_data.city,
+            country=search_data.country,
+            latitude=search_data.latitude,
+            longitude=search_data.longitude,
+            radius_km=search_data.radius_km
+        )
+        db.add(db_search)
+        db.commit()
+        db.refresh(db_search)
+        if saved_search_index.built:
+            saved_search_index.add(_to_search(db_search))
+        return db_search
+
+    @staticmethod
+    def get_user_searches(db: Session, user_id: int) -> List[SavedSearch]:
+        """Get a user's saved searches"""
+        return db.query(SavedSearch).filter(SavedSearch.user_id == user_id).order_by(SavedSearch.id).all()
+
+    @staticmethod
+    def delete_search(db: Session, search_id: int, user_id: int) -> bool:
+        """Delete a saved search (only by its owner); its past notifications stay"""
+        deleted = db.query(SavedSearch).filter(
+            SavedSearch.id == search_id,
+            SavedSearch.user_id == user_id
+        ).delete(synchronize_session=False)
+        db.commit()
+        saved_search_index.remove(search_id)
+        return bool(deleted)
+
+    @staticmethod
+    def rebuild(db: Session, index: SavedSearchIndex = saved_search_index) -> int:
+        """Reload this worker's predicate index from the saved_searches table"""
+        global _synced_at
+        with _build_lock:
+            started_at = datetime.utcnow()
+            index.build(_to_search(row) for row in db.query(SavedSearch).yield_per(10000))
+            _synced_at = started_at
+        return len(index)
+
+    @staticmethod
+    def refresh(db: Session, index: SavedSearchIndex = saved_search_index) -> int:
+        """Add searches saved through other workers since the last sync"""
+        global _synced_at
+        if not index.built or _synced_at is None:
+            return SavedSearchController.rebuild(db, index)
+
+        started_at = datetime.utcnow()
+        # Overlap the window slightly so rows committed during the last sync aren't missed
+        rows = db.query(SavedSearch).filter(SavedSearch.created_at >= _synced_at - timedelta(seconds=5)).all()
+        for row in rows:
+            index.add(_to_search(row))
+        _synced_at = started_at
+        return len(rows)
+
+    @staticmethod
+    def match_property(db: Session, property_id: int, index: SavedSearchIndex = saved_search_index) -> int:
+        """Notify the owners of every saved search a listing matches (caller commits)"""
+        prop = db.query(
+            Property.id, Property.owner_id, Property.property_type, Property.price,
+            Property.city, Property.country, Property.latitude, Property.longitude, Property.is_rented
+        ).filter(Property.id == property_id).first()
+        if prop is None or prop.is_rented:
+            return 0
+
+        SavedSearchController.refresh(db, index)
+        matches = [
+            search for search in index.match(SavedSearchController.listing_of(prop))
+            if search[1] != prop.owner_id
+        ]
+        if not matches:
+            return 0
+
+        # Searches deleted through another worker linger in this index until
+        # its next rebuild, so only notify for ones that still exist
+        live = {
+            row.id for row in db.query(SavedSearch.id).filter(
+                SavedSearch.id.in_([search[0] for search in matches])
+            )
+        }
+        now = datetime.utcnow()
+        insert_ignore(db, Notification.__table__, [
+            {
+                "user_id": search[1], "saved_search_id": search[0], "property_id": property_id,
+                "is_read": False, "created_at": now
+            }
+            for search in matches if search[0] in live
+        ], ["saved_search_id", "property_id"])
+        return len(live)
+
+    @staticmethod
+    def get_notifications(
+        db: Session,
+        user_id: int,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+        unread_only: bool = False
+    ) -> List[Tuple[Notification, Optional[str], Optional[str], Optional[float]]]:
+        """A page of a user's notifications, newest first, with search name and listing title/price"""
+        query = db.query(
+            Notification, SavedSearch.name, Property.title, Property.price
+        ).outerjoin(
+            SavedSearch, SavedSearch.id == Notification.saved_search_id
+        ).outerjoin(
+            Property, Property.id == Notification.property_id
+        ).filter(Notification.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(Notification.id < before_id)
+        if unread_only:
+            query = query.filter(Notification.is_read == False)
+        return query.order_by(Notification.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def count_unread(db: Session, user_id: int) -> int:
+        """Count a user's unread notifications"""
+        return db.query(func.count(Notification.id)).filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False
+        ).scalar() or 0
+
+    @staticmethod
+    def mark_read(db: Session, user_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        """Mark some (or all) of a user's notifications read"""
+        query = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False
+        )
+        if notification_ids is not None:
+            query = query.filter(Notification.id.in_(notification_ids))
+        updated = query.update({Notification.is_read: True}, synchronize_session=False)
+        db.commit()
+        return updated
@@ -0,0 +1,90 @@
+from sqlalchemy.orm import Session, joinedload
+from app.models.property import Property
+from app.utils.similarity import SimilarityIndex, similarity_index, to_record
+from app.utils.exceptions import SimilarityIndexUnavailableException
+from datetime import datetime, timedelta
+from typing import List, Optional
+import threading
+
+_build_lock = threading.Lock()
+_synced_at: Optional[datetime] = None
+
+def _record_columns():
+    return (
+        Property.id, Property.price, Property.bedrooms, Property.bathrooms, Property.area,
+        Property.property_type, Property.latitude, Property.longitude
+    )
+
+def _to_records(rows):
+    return [
+        (row.id, row.price, row.bedrooms, row.bathrooms, row.area,
+         row.property_type.value, row.latitude, row.longitude)
+        for row in rows
+    ]
+
+class SimilarityController:
+    @staticmethod
+    def rebuild(db: Session, index: SimilarityIndex = similarity_index) -> int:
+        """Reload the whole similarity index from the properties table"""
+        global _synced_at
+        with _build_lock:
+            started_at = datetime.utcnow()
+            index.build(_to_records(db.query(*_record_columns()).yield_per(10000)))
+            _synced_at = started_at
+        return len(index)
+
+    @staticmethod
+    def refresh(db: Session, index: SimilarityIndex = similarity_index) -> int:
+        """Apply properties changed by other workers since the last sync"""
+        global _synced_at
+        if not index.built or _synced_at is None:
+            return 0
+        
+        started_at = datetime.utcnow()
+        # Overlap the window slightly so rows committed during the last sync aren't missed
+        rows = db.query(*_record_columns()).filter(
+            Property.updated_at >= _synced_at - timedelta(seconds=5)
+        ).all()
+        for record in _to_records(rows):
+            index.upsert(record)
+        _synced_at = started_at
+        return len(rows)
+
+    @staticmethod
+    def on_property_saved(db_property: Property, index: SimilarityIndex = similarity_index) -> None:
+        """Keep this worker's index current after a create or update"""
+        if index.built:
+            index.upsert(to_record(db_property))
+
+    @staticmethod
+    def on_property_deleted(property_id: int, index: SimilarityIndex = similarity_index) -> None:
+        """Drop a deleted property from this worker's index"""
+        if index.built:
+            index.remove(property_id)
+
+    @staticmethod
+    def get_similar_properties(
+        db: Session,
+        property_id: int,
+        limit: int = 10,
+        index: SimilarityIndex = similarity_index
+    ) -> List[Property]:
+        """
+        Get the properties most similar to property_id, most similar first.
+        The index is built at startup and by the refresh job, never here: a
+        full table scan would stall every other request on the worker.
+        """
+        if not index.built:
+            raise SimilarityIndexUnavailableException()
+        
+        # Ask for a few extra in case some were deleted by another worker
+        neighbours = index.query(property_id, limit + 5)
+        if not neighbours:
+            return []
+        
+        ids = [neighbour_id for neighbour_id, _ in neighbours]
+        properties = db.query(Property).options(
+            joinedload(Property.owner)
+        ).filter(Property.id.in_(ids)).all()
+        by_id = {prop.id: prop for prop in properties}
+        return [by_id[i] for i in ids if i in by_id][:limit]
@@ -0,0 +1,100 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.property import Property
+from app.models.property_view import PropertyViewStats, PropertyViewBucket
+from app.utils.sql import upsert_increment
+from app.utils.view_counter import ViewCounter
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List
+
+class ViewController:
+    @staticmethod
+    def flush_views(db: Session, counter: ViewCounter) -> int:
+        """Write buffered views to totals and hourly/daily buckets in one transaction"""
+        pending = counter.drain()
+        if not pending:
+            return 0
+
+        totals: Counter = Counter()
+        hourly: Counter = Counter()
+        daily: Counter = Counter()
+        for (property_id, hour), count in pending.items():
+            totals[property_id] += count
+            hourly[(property_id, hour)] += count
+            daily[(property_id, hour.replace(hour=0))] += count
+
+        # Views of properties deleted since they were buffered would fail the FK
+        existing = {
+            row.id for row in db.query(Property.id).filter(Property.id.in_(list(totals)))
+        }
+        now = datetime.utcnow()
+
+        try:
+            upsert_increment(
+                db, PropertyViewStats.__table__,
+                [
+                    {"property_id": pid, "view_count": count, "last_viewed_at": now}
+                    for pid, count in totals.items() if pid in existing
+                ],
+                key_columns=["property_id"],
+                increment_columns=["view_count"],
+                replace_columns=["last_viewed_at"]
+            )
+            upsert_increment(
+                db, PropertyViewBucket.__table__,
+                [
+                    {"property_id": pid, "granularity": "hour", "bucket_start": start, "views": count}
+                    for (pid, start), count in hourly.items() if pid in existing
+                ] + [
+                    {"property_id": pid, "granularity": "day", "bucket_start": start, "views": count}
+                    for (pid, start), count in daily.items() if pid in existing
+                ],
+                key_columns=["property_id", "granularity", "bucket_start"],
+                increment_columns=["views"]
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            counter.restore(pending)
+            raise
+
+        return sum(totals.values())
+
+    @staticmethod
+    def get_view_counts(db: Session, property_ids: List[int]) -> dict:
+        """Get total view counts for several properties in one query"""
+        if not property_ids:
+            return {}
+
+        rows = db.query(PropertyViewStats.property_id, PropertyViewStats.view_count).filter(
+            PropertyViewStats.property_id.in_(property_ids)
+        ).all()
+        return {property_id: count for property_id, count in rows}
+
+    @staticmethod
+    def trending_scores(db: Session, hours: int = 24):
+        """Subquery of (property_id, views) summed over recent hourly buckets"""
+        since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        return db.query(
+            PropertyViewBucket.property_id.label("property_id"),
+            func.sum(PropertyViewBucket.views).label("views")
+        ).filter(
+            PropertyViewBucket.granularity == "hour",
+            PropertyViewBucket.bucket_start >= since
+        ).group_by(PropertyViewBucket.property_id).subquery()
+
+    @staticmethod
+    def prune_buckets(db: Session, hourly_days: int = 7, daily_days: int = 90) -> int:
+        """Delete hourly and daily buckets past their retention"""
+        now = datetime.utcnow()
+        deleted = db.query(PropertyViewBucket).filter(
+            PropertyViewBucket.granularity == "hour",
+            PropertyViewBucket.bucket_start < now - timedelta(days=hourly_days)
+        ).delete(synchronize_session=False)
+        deleted += db.query(PropertyViewBucket).filter(
+            PropertyViewBucket.granularity == "day",
+            PropertyViewBucket.bucket_start < now - timedelta(days=daily_days)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,71 @@
+"""
+Near-duplicate listing maintenance.
+
+    python -m app.duplicates reindex            # signatures for every listing
+    python -m app.duplicates scan [--threshold 0.7] [--flag]
+
+scan prints (original, duplicate, similarity) for every pair found; --flag
+also points each duplicate's possible_duplicate_of at its best original.
+"""
+import argparse
+import sys
+from datetime import datetime
+from app.config import settings
+from app.database import SessionLocal
+from app.controller.change_feed_controller import ChangeFeedController
+from app.controller.duplicate_controller import DuplicateController
+from app.models.property import Property
+from app.utils.cache import entity_cache
+
+def flag(db, pairs) -> int:
+    """Set possible_duplicate_of on each duplicate to its most similar original"""
+    best = {}
+    for original_id, duplicate_id, score in pairs:
+        current = best.get(duplicate_id)
+        if current is None or (-score, original_id) < (-current[1], current[0]):
+            best[duplicate_id] = (original_id, score)
+
+    changed = []
+    for duplicate_id, (original_id, _) in best.items():
+        updated = db.query(Property).filter(
+            Property.id == duplicate_id,
+            (Property.possible_duplicate_of.is_(None)) | (Property.possible_duplicate_of != original_id)
+        ).update({
+            Property.possible_duplicate_of: original_id,
+            # Bulk UPDATEs skip the ORM version check, so bump version by hand
+            Property.updated_at: datetime.utcnow(),
+            Property.version: Property.version + 1
+        }, synchronize_session=False)
+        if updated:
+            changed.append(duplicate_id)
+    ChangeFeedController.record(db, changed)
+    entity_cache.invalidate_on_commit(db, Property, changed)
+    db.commit()
+    return len(changed)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.duplicates", description="Near-duplicate listings")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reindex", help="compute signatures for every listing")
+    scan_parser = commands.add_parser("scan", help="list near-duplicate pairs across the catalogue")
+    scan_parser.add_argument("--threshold", type=float, default=settings.DUPLICATE_THRESHOLD)
+    scan_parser.add_argument("--flag", action="store_true", help="record matches on the duplicates")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "reindex":
+            print(f"Indexed {DuplicateController.reindex(db)} listings")
+        elif args.command == "scan":
+            pairs = DuplicateController.scan(db, args.threshold)
+            for original_id, duplicate_id, score in pairs:
+                print(f"{original_id}\t{duplicate_id}\t{score:.3f}")
+            print(f"{len(pairs)} pairs at similarity >= {args.threshold}", file=sys.stderr)
+            if args.flag:
+                print(f"Flagged {flag(db, pairs)} listings", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Offline reverse geocoding against the bundled gazetteer.
+
+    python -m app.geocode build [--csv path]    # compile the CSV into the mapped file
+    python -m app.geocode lookup 48.8566 2.3522
+    python -m app.geocode regeocode [--dry-run] [--batch-size 1000]
+
+regeocode gives every existing listing the canonical city/country of its
+coordinates (where a gazetteer city is in range), one committed batch at a
+time, then rebuilds the market rollups that are keyed by city.
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from app.config import settings
+from app.database import SessionLocal
+from app.controller.change_feed_controller import ChangeFeedController
+from app.controller.market_controller import MarketController
+from app.models.property import Property
+from app.utils.cache import entity_cache
+from app.utils.geocoder import ReverseGeocoder, compile_gazetteer, geocoder
+
+def regeocode(db, resolver: ReverseGeocoder, batch_size: int, dry_run: bool = False) -> int:
+    """Rewrite city/country where they differ from the canonical names; returns rows changed"""
+    changed = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            Property.id, Property.city, Property.country, Property.latitude, Property.longitude
+        ).filter(Property.id > last_id).order_by(Property.id).limit(batch_size).all()
+        if not rows:
+            return changed
+        last_id = rows[-1].id
+
+        # One UPDATE per distinct place rather than one per row
+        moves = defaultdict(list)
+        for row in rows:
+            place = resolver.resolve(row.latitude, row.longitude, settings.GEOCODER_MAX_DISTANCE_KM)
+            if place is not None and place != (row.city, row.country):
+                moves[place].append(row.id)
+                if dry_run:
+                    print(f"{row.id}\t{row.city}, {row.country}\t->\t{place[0]}, {place[1]}")
+        if dry_run:
+            changed += sum(len(ids) for ids in moves.values())
+            continue
+
+        batch_ids = []
+        for (city, country), ids in moves.items():
+            # Bulk UPDATEs skip the ORM version check, so bump version by hand
+            db.query(Property).filter(Property.id.in_(ids)).update({
+                Property.city: city,
+                Property.country: country,
+                Property.updated_at: datetime.utcnow(),
+                Property.version: Property.version + 1
+            }, synchronize_session=False)
+            batch_ids.extend(ids)
+        if batch_ids:
+            ChangeFeedController.record(db, batch_ids)
+            entity_cache.invalidate_on_commit(db, Property, batch_ids)
+        db.commit()
+        changed += len(batch_ids)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.geocode", description="Offline reverse geocoding")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="compile the gazetteer CSV for memory-mapping")
+    build_parser.add_argument("--csv", default=settings.GEOCODER_GAZETTEER,
+                              help="city,country,latitude,longitude CSV (default: the bundled one)")
+    lookup_parser = commands.add_parser("lookup", help="nearest gazetteer city to a point")
+    lookup_parser.add_argument("latitude", type=float)
+    lookup_parser.add_argument("longitude", type=float)
+    regeocode_parser = commands.add_parser("regeocode", help="canonicalize city/country of existing listings")
+    regeocode_parser.add_argument("--batch-size", type=int, default=1000)
+    regeocode_parser.add_argument("--dry-run", action="store_true", help="print the changes without writing")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        resolver = ReverseGeocoder(args.csv)
+        started = time.perf_counter()
+        count = compile_gazetteer(resolver.csv_path, resolver.packed_path)
+        print(f"Compiled {count} places into {resolver.packed_path} in {time.perf_counter() - started:.2f}s")
+        return 0
+
+    if args.command == "lookup":
+        place = geocoder.nearest(args.latitude, args.longitude)
+        if place is None:
+            print("The gazetteer is empty", file=sys.stderr)
+            return 1
+        city, country, distance = place
+        in_range = "" if distance <= settings.GEOCODER_MAX_DISTANCE_KM else " (out of range)"
+        print(f"{city}, {country}\t{distance:.1f} km{in_range}")
+        return 0
+
+    db = SessionLocal()
+    try:
+        changed = regeocode(db, geocoder, args.batch_size, args.dry_run)
+        if args.dry_run:
+            print(f"{changed} listings would change", file=sys.stderr)
+        else:
+            print(f"Updated {changed} listings", file=sys.stderr)
+            if changed:
+                MarketController.rebuild(db)
+                print("Rebuilt market stats", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Periodic jobs run by the in-process scheduler"""
+from datetime import date
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.controller.property_controller import PropertyController
+from app.controller.view_controller import ViewController
+from app.controller.similarity_controller import SimilarityController
+from app.controller.cluster_controller import ClusterController
+from app.controller.market_controller import MarketController
+from app.controller.saved_search_controller import SavedSearchController
+from app.utils.search_index import saved_search_index
+from app.controller.change_feed_controller import ChangeFeedController
+from app.controller.message_controller import MessageController
+from app.utils.scheduler import scheduler
+from app.utils.view_counter import view_counter
+from app.utils.similarity import similarity_index
+from app.utils.task_queue import task_queue
+
+@scheduler.job("expire_rentals", interval=settings.RENTAL_EXPIRY_INTERVAL_SECONDS)
+def expire_rentals(db: Session) -> int:
+    """Release properties whose rental_end_date has passed"""
+    return len(PropertyController.expire_ended_rentals(db, date.today()))
+
+# Every worker flushes its own in-memory view buffer, so no lease
+@scheduler.job("flush_views", interval=settings.VIEW_FLUSH_INTERVAL_SECONDS, singleton=False)
+def flush_views(db: Session) -> int:
+    """Write this worker's buffered property views to the database"""
+    return ViewController.flush_views(db, view_counter)
+
+@scheduler.job("prune_view_buckets", interval=3600)
+def prune_view_buckets(db: Session) -> int:
+    """Drop view buckets past their retention"""
+    return ViewController.prune_buckets(db)
+
+@scheduler.job("refresh_similarity", interval=settings.SIMILARITY_REFRESH_INTERVAL_SECONDS, singleton=False)
+def refresh_similarity(db: Session) -> int:
+    """Pick up properties written by other workers into this worker's index"""
+    if not similarity_index.built:
+        # The startup build failed or hasn't finished; retried each interval
+        return SimilarityController.rebuild(db)
+    return SimilarityController.refresh(db)
+
+@scheduler.job("rebuild_similarity", interval=3600, singleton=False)
+def rebuild_similarity(db: Session) -> int:
+    """Rebuild the index to drop deletions and re-centre normalization"""
+    if not similarity_index.built:
+        return 0
+    return SimilarityController.rebuild(db)
+
+@scheduler.job("rebuild_saved_search_index", interval=3600, singleton=False)
+def rebuild_saved_search_index(db: Session) -> int:
+    """Rebuild the index to drop searches deleted through other workers"""
+    if not saved_search_index.built:
+        return 0
+    return SavedSearchController.rebuild(db)
+
+@scheduler.job("rebuild_map_grid", interval=settings.MAP_GRID_REBUILD_INTERVAL_SECONDS)
+def rebuild_map_grid(db: Session) -> int:
+    """Recompute map cluster cells so price bounds shrink after removals"""
+    return ClusterController.rebuild(db)
+
+@scheduler.job("rebuild_market_stats", interval=settings.MARKET_STATS_REBUILD_INTERVAL_SECONDS)
+def rebuild_market_stats(db: Session) -> int:
+    """Recompute market price sketches in case an incremental update was lost"""
+    return MarketController.rebuild(db)
+
+@scheduler.job("archive_messages", interval=settings.MESSAGE_ARCHIVE_INTERVAL_SECONDS)
+def archive_messages(db: Session) -> int:
+    """Move old read messages out of the hot messages table"""
+    if not settings.MESSAGE_ARCHIVE_ENABLED:
+        return 0
+    return MessageController.archive_messages(
+        db,
+        settings.MESSAGE_ARCHIVE_AFTER_DAYS,
+        settings.MESSAGE_ARCHIVE_BATCH_SIZE,
+        settings.MESSAGE_ARCHIVE_MAX_BATCHES,
+        settings.MESSAGE_ARCHIVE_PAUSE_SECONDS
+    )
+
+@scheduler.job("compact_change_feed", interval=86400)
+def compact_change_feed(db: Session) -> int:
+    """Drop change feed entries superseded by later ones"""
+    return ChangeFeedController.compact(db)
+
+@scheduler.job("prune_tasks", interval=3600)
+def prune_tasks(db: Session) -> int:
+    """Drop finished background tasks past their retention"""
+    return task_queue.prune(db, settings.TASK_RETENTION_HOURS)
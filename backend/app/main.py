@@ -1,10 +1,26 @@
+import atexit
+import logging
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from routers import auth, properties, messages
+from app.database import engine, SessionLocal
+from app.config import settings
+from app.migrations import verify as verify_schema
+from app.utils.scheduler import scheduler
+from app.utils.task_queue import task_queue
+from app.utils.geocoder import geocoder
+from app.utils.view_counter import view_counter
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.profiler import ProfilingMiddleware
+from app.utils.load_shedding import LoadSheddingMiddleware
+from app.utils.traffic_capture import TrafficCaptureMiddleware, traffic_recorder
+from app.controller.view_controller import ViewController
+from app.controller.similarity_controller import SimilarityController
+from routers import auth, properties, messages, searches, admin
+from app import jobs  # noqa: F401  (registers scheduled jobs)
+from app import tasks  # noqa: F401  (registers task handlers)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="RentOnline API",
@@ -12,7 +28,16 @@ app = FastAPI(
     description="A rental marketplace API built with FastAPI following MVC pattern"
 )
 
-# Configure CORS for Flutter app
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+# Outside the rate limiter, so a shed request costs no token lookup
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware)
+
+# Configure CORS for Flutter app. Outside the rate limiter and load shedding,
+# so browsers can read their 429s and 503s, and preflights are answered
+# without spending tokens or slots
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, replace with your Flutter app URL
@@ -21,10 +46,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outside load shedding, so captures include the requests it turned away
+if settings.TRAFFIC_CAPTURE_ENABLED:
+    app.add_middleware(TrafficCaptureMiddleware)
+
+# Added last so it is outermost and times the whole request
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(properties.router)
 app.include_router(messages.router, prefix="/api/messages", tags=["Messages"])
+app.include_router(searches.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+def check_schema():
+    """Refuse to serve against a schema that hasn't been migrated (see app.migrations)"""
+    verify_schema(engine)
+
+@app.on_event("startup")
+def load_geocoder():
+    """Map the gazetteer now rather than on the first listing write"""
+    if settings.GEOCODER_ENABLED:
+        geocoder.load()
+
+@app.on_event("startup")
+def build_similarity_index():
+    """Build this worker's similarity index off the event loop; /similar answers 503 until it is ready"""
+    def build():
+        db = SessionLocal()
+        try:
+            SimilarityController.rebuild(db)
+        except Exception:
+            logger.exception("Building the similarity index failed")
+        finally:
+            db.close()
+    threading.Thread(target=build, name="similarity-build", daemon=True).start()
+
+@app.on_event("startup")
+def start_scheduler():
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+
+@app.on_event("startup")
+async def start_task_workers():
+    if settings.TASK_WORKERS_ENABLED:
+        await task_queue.start(settings.TASK_WORKERS)
+
+@atexit.register
+def flush_views_on_exit():
+    """Persist buffered view counts before the worker goes away"""
+    if not view_counter.pending():
+        return
+    db = SessionLocal()
+    try:
+        ViewController.flush_views(db, view_counter)
+    finally:
+        db.close()
+
+@atexit.register
+def flush_traffic_capture():
+    traffic_recorder.flush()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    scheduler.stop()
+    flush_views_on_exit()
+    flush_traffic_capture()
+
+@app.on_event("shutdown")
+async def stop_task_workers():
+    await task_queue.stop()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,97 @@
+"""
+Versioned schema migrations.
+
+Each module in app.migrations.versions defines VERSION, DESCRIPTION and
+upgrade(conn). Applied versions are recorded in the schema_version table;
+`python -m app.migrations upgrade` applies whatever is pending, in order.
+The API never changes the schema itself, it only checks it is current.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select
+from sqlalchemy.engine import Engine
+from app.migrations import versions
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class SchemaVersionError(RuntimeError):
+    """The database schema is older or newer than this code expects"""
+
+def load_migrations() -> List[ModuleType]:
+    """All migration modules, ordered by version"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name.startswith("m")
+    ]
+    modules.sort(key=lambda module: module.VERSION)
+    seen = set()
+    for module in modules:
+        if module.VERSION in seen:
+            raise SchemaVersionError(f"Duplicate migration version {module.VERSION}")
+        seen.add(module.VERSION)
+    return modules
+
+def head_version() -> int:
+    """Version of the newest migration shipped with this code"""
+    modules = load_migrations()
+    return modules[-1].VERSION if modules else 0
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version, or 0 for a database never migrated"""
+    with engine.connect() as conn:
+        if not engine.dialect.has_table(conn, schema_version.name):
+            return 0
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+def history(engine: Engine) -> list:
+    """Applied migrations as (version, description, applied_at) rows"""
+    with engine.connect() as conn:
+        if not engine.dialect.has_table(conn, schema_version.name):
+            return []
+        return conn.execute(select(schema_version).order_by(schema_version.c.version)).all()
+
+def upgrade(engine: Engine, target: Optional[int] = None, echo=print) -> int:
+    """Apply pending migrations up to target (default: head); returns the new version"""
+    metadata.create_all(bind=engine, tables=[schema_version])
+    version = current_version(engine)
+    for module in load_migrations():
+        if module.VERSION <= version or (target is not None and module.VERSION > target):
+            continue
+        echo(f"Applying {module.VERSION:04d}: {module.DESCRIPTION}")
+        # Operations are idempotent, so a run interrupted between MySQL's
+        # implicitly committed DDL statements is safe to repeat
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=module.VERSION,
+                description=module.DESCRIPTION,
+                applied_at=datetime.utcnow()
+            ))
+        version = module.VERSION
+    return version
+
+def verify(engine: Engine) -> int:
+    """Raise SchemaVersionError unless the database is at head; returns the version"""
+    version, head = current_version(engine), head_version()
+    if version < head:
+        raise SchemaVersionError(
+            f"Database schema is at version {version} but the code expects {head}; "
+            f"run `python -m app.migrations upgrade`"
+        )
+    if version > head:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, newer than this code ({head}); deploy newer code"
+        )
+    return version
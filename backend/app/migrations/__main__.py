@@ -0,0 +1,33 @@
+import argparse
+import sys
+from app.database import engine
+from app.migrations import SchemaVersionError, current_version, head_version, history, upgrade, verify
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Database schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    commands.add_parser("current", help="print the applied and latest versions")
+    commands.add_parser("history", help="list applied migrations")
+    commands.add_parser("verify", help="exit non-zero unless the schema is current")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        version = upgrade(engine, target=args.target)
+        print(f"Schema at version {version}")
+    elif args.command == "current":
+        print(f"current: {current_version(engine)}  head: {head_version()}")
+    elif args.command == "history":
+        for row in history(engine):
+            print(f"{row.version:04d}  {row.applied_at:%Y-%m-%d %H:%M:%S}  {row.description}")
+    elif args.command == "verify":
+        try:
+            print(f"Schema at version {verify(engine)}")
+        except SchemaVersionError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Idempotent schema operations used by migrations.
+
+Every operation checks the live schema first, so a migration that failed
+part-way (MySQL commits each DDL statement implicitly) can simply be rerun.
+On MySQL, indexes are built with ALGORITHM=INPLACE, LOCK=NONE and columns
+added with ALGORITHM=INSTANT where possible, so reads and writes continue
+while the DDL runs.
+"""
+from sqlalchemy import Column, Index, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from sqlalchemy.exc import OperationalError
+
+def _is_mysql(conn: Connection) -> bool:
+    return conn.dialect.name == "mysql"
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+def has_table(conn: Connection, table_name: str) -> bool:
+    return inspect(conn).has_table(table_name)
+
+def has_column(conn: Connection, table_name: str, column_name: str) -> bool:
+    return any(col["name"] == column_name for col in inspect(conn).get_columns(table_name))
+
+def has_index(conn: Connection, table_name: str, index_name: str) -> bool:
+    inspector = inspect(conn)
+    names = {index["name"] for index in inspector.get_indexes(table_name)}
+    names |= {constraint["name"] for constraint in inspector.get_unique_constraints(table_name)}
+    return index_name in names
+
+def create_table(conn: Connection, table: Table) -> bool:
+    """Create a table and its indexes if it doesn't exist yet"""
+    if has_table(conn, table.name):
+        return False
+    table.create(bind=conn)
+    return True
+
+def add_column(conn: Connection, table_name: str, column: Column) -> bool:
+    """Add a column if missing; returns True when it was added"""
+    if has_column(conn, table_name, column.name):
+        return False
+
+    ddl = f"ALTER TABLE {_quote(conn, table_name)} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"
+    if _is_mysql(conn):
+        try:
+            conn.execute(text(ddl + ", ALGORITHM=INSTANT"))
+            return True
+        except OperationalError:
+            # INSTANT needs MySQL 8.0.12+ and a supported column position
+            conn.execute(text(ddl + ", ALGORITHM=INPLACE, LOCK=NONE"))
+            return True
+    conn.execute(text(ddl))
+    return True
+
+def create_index(conn: Connection, index: Index) -> bool:
+    """Build an index (unique or not) if missing; returns True when it was built"""
+    table_name = index.table.name
+    if has_index(conn, table_name, index.name):
+        return False
+
+    if _is_mysql(conn):
+        columns = ", ".join(_quote(conn, col.name) for col in index.columns)
+        kind = "UNIQUE INDEX" if index.unique else "INDEX"
+        conn.execute(text(
+            f"ALTER TABLE {_quote(conn, table_name)} ADD {kind} {_quote(conn, index.name)} ({columns}), "
+            f"ALGORITHM=INPLACE, LOCK=NONE"
+        ))
+    else:
+        conn.execute(CreateIndex(index))
+    return True
+
+def drop_index(conn: Connection, table_name: str, index_name: str) -> bool:
+    """Drop an index if present; returns True when it was dropped"""
+    if not has_index(conn, table_name, index_name):
+        return False
+
+    if _is_mysql(conn):
+        conn.execute(text(
+            f"ALTER TABLE {_quote(conn, table_name)} DROP INDEX {_quote(conn, index_name)}, "
+            f"ALGORITHM=INPLACE, LOCK=NONE"
+        ))
+    else:
+        conn.execute(text(f"DROP INDEX {_quote(conn, index_name)}"))
+    return True
@@ -0,0 +1,188 @@
+"""
+Baseline: the schema as create_all last built it, plus the columns the old
+migrate_city_country.py and migrate_property_sorting.py scripts added.
+
+Tables are a frozen snapshot rather than the live models, so this migration
+keeps producing the same schema as the models move on. On a database that
+create_all already built, every step is a no-op apart from filling in
+whatever columns and indexes are missing.
+"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, Float, ForeignKey, Index, Integer,
+    MetaData, SmallInteger, String, Table, Text, func, select
+)
+from app.migrations import ops
+
+VERSION = 1
+DESCRIPTION = "Baseline schema"
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("username", String(100), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("full_name", String(255)),
+    Column("is_active", Boolean),
+    Column("is_verified", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+properties = Table(
+    "properties", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(200), nullable=False),
+    Column("description", Text),
+    Column("property_type", Enum("APARTMENT", "HOUSE", "VILLA", "STUDIO", "SHOP", name="propertytype"), nullable=False),
+    Column("price", Float, nullable=False),
+    Column("address", String(500), nullable=False),
+    Column("city", String(100), nullable=False, server_default=""),
+    Column("country", String(100), nullable=False, server_default=""),
+    Column("latitude", Float, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("bedrooms", Integer),
+    Column("bathrooms", Integer),
+    Column("area", Float),
+    Column("images", Text),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("is_rented", Boolean),
+    Column("rental_start_date", Date),
+    Column("rental_end_date", Date),
+    Column("rented_to_user_id", Integer, ForeignKey("users.id")),
+    Column("average_rating", Float),
+    Column("review_count", Integer, nullable=False, server_default="0"),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_properties_rented_end", "is_rented", "rental_end_date"),
+    Index("ix_properties_updated", "updated_at"),
+    Index("ix_properties_price", "price", "id"),
+    Index("ix_properties_created", "created_at", "id"),
+    Index("ix_properties_rating", "average_rating", "id"),
+    Index("ix_properties_type_price", "property_type", "price", "id"),
+    Index("ix_properties_type_created", "property_type", "created_at", "id"),
+    Index("ix_properties_type_rating", "property_type", "average_rating", "id"),
+    Index("ix_properties_city_price", "city", "price", "id"),
+    Index("ix_properties_city_created", "city", "created_at", "id"),
+    Index("ix_properties_city_rating", "city", "average_rating", "id"),
+)
+
+reviews = Table(
+    "reviews", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("property_id", Integer, ForeignKey("properties.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("rating", Integer, nullable=False),
+    Column("comment", Text),
+    Column("created_at", DateTime),
+)
+
+messages = Table(
+    "messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sender_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("receiver_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("property_id", Integer, ForeignKey("properties.id")),
+    Column("content", Text, nullable=False),
+    Column("is_read", Boolean),
+    Column("created_at", DateTime),
+    Index("ix_messages_pair_id", "sender_id", "receiver_id", "id"),
+)
+
+message_tombstones = Table(
+    "message_tombstones", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("message_id", Integer, nullable=False),
+    Column("sender_id", Integer, nullable=False),
+    Column("receiver_id", Integer, nullable=False),
+    Column("deleted_at", DateTime),
+    Index("ix_message_tombstones_pair_id", "sender_id", "receiver_id", "id"),
+)
+
+bookings = Table(
+    "bookings", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("property_id", Integer, ForeignKey("properties.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("start_date", Date, nullable=False),
+    Column("end_date", Date, nullable=False),
+    Column("created_at", DateTime),
+    Index("ix_bookings_property_start_end", "property_id", "start_date", "end_date"),
+)
+
+job_leases = Table(
+    "job_leases", metadata,
+    Column("name", String(100), primary_key=True),
+    Column("owner", String(100)),
+    Column("lease_until", DateTime),
+    Column("run_count", Integer),
+    Column("failure_count", Integer),
+    Column("last_started_at", DateTime),
+    Column("last_duration_ms", Float),
+    Column("last_result", Integer),
+    Column("last_error", Text),
+)
+
+property_view_stats = Table(
+    "property_view_stats", metadata,
+    Column("property_id", Integer, ForeignKey("properties.id"), primary_key=True),
+    Column("view_count", Integer, nullable=False),
+    Column("last_viewed_at", DateTime),
+)
+
+property_view_buckets = Table(
+    "property_view_buckets", metadata,
+    Column("property_id", Integer, ForeignKey("properties.id"), primary_key=True),
+    Column("granularity", String(5), primary_key=True),
+    Column("bucket_start", DateTime, primary_key=True),
+    Column("views", Integer, nullable=False),
+    Index("ix_view_buckets_window", "granularity", "bucket_start", "property_id", "views"),
+)
+
+property_grid_cells = Table(
+    "property_grid_cells", metadata,
+    Column("level", SmallInteger, primary_key=True, autoincrement=False),
+    Column("cell_x", Integer, primary_key=True, autoincrement=False),
+    Column("cell_y", Integer, primary_key=True, autoincrement=False),
+    Column("count", Integer, nullable=False),
+    Column("sum_latitude", Float, nullable=False),
+    Column("sum_longitude", Float, nullable=False),
+    Column("min_price", Float),
+    Column("max_price", Float),
+)
+
+property_changes = Table(
+    "property_changes", metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("property_id", Integer, nullable=False),
+    Column("op", String(10), nullable=False),
+    Column("changed_at", DateTime),
+    Index("ix_property_changes_property_seq", "property_id", "seq"),
+)
+
+# Columns added to properties after its first deploy, by the old scripts
+LATE_COLUMNS = ("city", "country", "average_rating", "review_count")
+
+def upgrade(conn) -> None:
+    for table in metadata.sorted_tables:
+        ops.create_table(conn, table)
+
+    added = [ops.add_column(conn, "properties", properties.c[name]) for name in LATE_COLUMNS]
+    if added[LATE_COLUMNS.index("review_count")]:
+        backfill_review_stats(conn)
+
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            ops.create_index(conn, index)
+
+def backfill_review_stats(conn) -> None:
+    """Fill the denormalized rating columns from the reviews table"""
+    def review_stat(aggregate):
+        return select(aggregate).where(reviews.c.property_id == properties.c.id).scalar_subquery()
+
+    conn.execute(properties.update().values(
+        average_rating=review_stat(func.avg(reviews.c.rating)),
+        review_count=review_stat(func.count(reviews.c.id))
+    ))
@@ -0,0 +1,63 @@
+"""
+Indexes for the inbox, review and owner queries, and one review per user
+per property enforced by the database instead of a check-then-insert race.
+"""
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, Table, func, select
+from app.migrations import ops
+from app.migrations.versions.m0001_baseline import backfill_review_stats
+
+VERSION = 2
+DESCRIPTION = "Message, review and owner indexes; unique review per user"
+
+metadata = MetaData()
+
+messages = Table(
+    "messages", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("receiver_id", Integer),
+    Column("is_read", Boolean),
+    Column("property_id", Integer),
+)
+
+reviews = Table(
+    "reviews", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("property_id", Integer),
+    Column("user_id", Integer),
+)
+
+properties = Table(
+    "properties", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("owner_id", Integer),
+)
+
+INDEXES = [
+    # Unread counts and the inbox filter on receiver_id AND is_read
+    Index("ix_messages_receiver_unread", messages.c.receiver_id, messages.c.is_read, messages.c.property_id),
+    # Also serves every "reviews of this property" lookup via its prefix
+    Index("uq_reviews_property_user", reviews.c.property_id, reviews.c.user_id, unique=True),
+    Index("ix_reviews_user", reviews.c.user_id),
+    Index("ix_properties_owner", properties.c.owner_id, properties.c.id),
+]
+
+def upgrade(conn) -> None:
+    if not ops.has_index(conn, "reviews", "uq_reviews_property_user"):
+        drop_duplicate_reviews(conn)
+
+    for index in INDEXES:
+        ops.create_index(conn, index)
+
+def drop_duplicate_reviews(conn) -> None:
+    """Keep each user's first review of a property so the unique index can build"""
+    duplicate = conn.execute(
+        select(reviews.c.property_id).group_by(reviews.c.property_id, reviews.c.user_id).having(func.count() > 1)
+    ).first()
+    if duplicate is None:
+        return
+
+    # MySQL can't delete from a table it also selects from unless the
+    # subquery is materialized as a derived table first
+    keep = select(func.min(reviews.c.id).label("id")).group_by(reviews.c.property_id, reviews.c.user_id).subquery()
+    conn.execute(reviews.delete().where(reviews.c.id.not_in(select(keep.c.id))))
+    backfill_review_stats(conn)
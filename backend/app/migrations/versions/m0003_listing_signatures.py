@@ -0,0 +1,36 @@
+"""
+MinHash signatures and LSH buckets for near-duplicate listing detection,
+and the flag recording a listing's best match. Existing listings are
+indexed afterwards with `python -m app.duplicates reindex`.
+"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, LargeBinary, MetaData, Table
+from app.migrations import ops
+
+VERSION = 3
+DESCRIPTION = "Listing signatures and LSH buckets for duplicate detection"
+
+metadata = MetaData()
+
+# Stand-in so the foreign keys below resolve
+Table("properties", metadata, Column("id", Integer, primary_key=True))
+
+property_signatures = Table(
+    "property_signatures", metadata,
+    Column("property_id", Integer, ForeignKey("properties.id"), primary_key=True, autoincrement=False),
+    Column("signature", LargeBinary(512), nullable=False),
+    Column("cell_x", Integer, nullable=False),
+    Column("cell_y", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+property_lsh_buckets = Table(
+    "property_lsh_buckets", metadata,
+    Column("bucket", BigInteger, primary_key=True, autoincrement=False),
+    Column("property_id", Integer, ForeignKey("properties.id"), primary_key=True, autoincrement=False),
+    Index("ix_lsh_buckets_property", "property_id"),
+)
+
+def upgrade(conn) -> None:
+    ops.create_table(conn, property_signatures)
+    ops.create_table(conn, property_lsh_buckets)
+    ops.add_column(conn, "properties", Column("possible_duplicate_of", Integer, nullable=True))
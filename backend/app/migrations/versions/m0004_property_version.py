@@ -0,0 +1,12 @@
+"""
+Row version for optimistic concurrency on properties. Existing rows start
+at 1; ALGORITHM=INSTANT makes this a metadata-only change on MySQL 8.
+"""
+from sqlalchemy import Column, Integer
+from app.migrations import ops
+
+VERSION = 4
+DESCRIPTION = "Property row version for optimistic concurrency"
+
+def upgrade(conn) -> None:
+    ops.add_column(conn, "properties", Column("version", Integer, nullable=False, server_default="1"))
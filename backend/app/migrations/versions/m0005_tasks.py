@@ -0,0 +1,31 @@
+"""
+Table behind the background task queue (app/utils/task_queue.py).
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+from app.migrations import ops
+
+VERSION = 5
+DESCRIPTION = "Background task queue"
+
+metadata = MetaData()
+
+tasks = Table(
+    "tasks", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("idempotency_key", String(200), nullable=True, unique=True),
+    Column("status", String(10), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("max_attempts", Integer, nullable=False),
+    Column("run_after", DateTime, nullable=False),
+    Column("locked_by", String(100), nullable=True),
+    Column("locked_until", DateTime, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime),
+    Column("finished_at", DateTime, nullable=True),
+    Index("ix_tasks_status_run_after", "status", "run_after"),
+)
+
+def upgrade(conn) -> None:
+    ops.create_table(conn, tasks)
@@ -0,0 +1,71 @@
+"""
+Append-only price history and per-segment price sketches behind the market
+statistics endpoint. Both are seeded from the current listings: each gets
+one history row with its current price (earlier changes were never kept).
+"""
+from collections import defaultdict
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, SmallInteger, String, Table, select
+from app.migrations import ops
+from app.utils.price_sketch import bucket_of
+
+VERSION = 6
+DESCRIPTION = "Price history and market price sketches"
+
+metadata = MetaData()
+
+properties = Table(
+    "properties", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("property_type", String(20)),
+    Column("price", Float),
+    Column("city", String(100)),
+    Column("bedrooms", Integer),
+    Column("created_at", DateTime),
+)
+
+property_price_history = Table(
+    "property_price_history", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("property_id", Integer, nullable=False),
+    Column("price", Float, nullable=False),
+    Column("previous_price", Float, nullable=True),
+    Column("changed_at", DateTime),
+    Index("ix_price_history_property", "property_id", "id"),
+)
+
+market_price_buckets = Table(
+    "market_price_buckets", metadata,
+    Column("city_key", String(100), primary_key=True),
+    Column("property_type", String(20), primary_key=True),
+    Column("bedrooms", SmallInteger, primary_key=True, autoincrement=False),
+    Column("bucket", SmallInteger, primary_key=True, autoincrement=False),
+    Column("count", Integer, nullable=False),
+    Column("sum_price", Float, nullable=False),
+)
+
+def upgrade(conn) -> None:
+    if ops.create_table(conn, property_price_history):
+        conn.execute(property_price_history.insert().from_select(
+            ["property_id", "price", "changed_at"],
+            select(properties.c.id, properties.c.price, properties.c.created_at).order_by(properties.c.id)
+        ))
+    if ops.create_table(conn, market_price_buckets):
+        seed_market_buckets(conn)
+
+def seed_market_buckets(conn, batch_size: int = 5000) -> None:
+    buckets = defaultdict(lambda: [0, 0.0])
+    for row in conn.execute(select(
+        properties.c.city, properties.c.property_type, properties.c.bedrooms, properties.c.price
+    )):
+        # The column holds enum names (APARTMENT); the rollups use values (apartment)
+        bedrooms = row.bedrooms if row.bedrooms is not None else -1
+        bucket = buckets[(row.city.strip().lower(), row.property_type.lower(), bedrooms, bucket_of(row.price))]
+        bucket[0] += 1
+        bucket[1] += row.price
+
+    values = [
+        {"city_key": c, "property_type": t, "bedrooms": b, "bucket": k, "count": n, "sum_price": s}
+        for (c, t, b, k), (n, s) in buckets.items()
+    ]
+    for start in range(0, len(values), batch_size):
+        conn.execute(market_price_buckets.insert(), values[start:start + batch_size])
@@ -0,0 +1,47 @@
+"""
+Saved searches and the per-user notification feed their matches go to.
+"""
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table
+from app.migrations import ops
+
+VERSION = 7
+DESCRIPTION = "Saved searches and notifications"
+
+metadata = MetaData()
+
+# Stand-in so the foreign keys below resolve
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+saved_searches = Table(
+    "saved_searches", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("property_type", String(20), nullable=True),
+    Column("min_price", Float, nullable=True),
+    Column("max_price", Float, nullable=True),
+    Column("city", String(100), nullable=True),
+    Column("country", String(100), nullable=True),
+    Column("latitude", Float, nullable=True),
+    Column("longitude", Float, nullable=True),
+    Column("radius_km", Float, nullable=True),
+    Column("created_at", DateTime),
+    Index("ix_saved_searches_user", "user_id", "id"),
+)
+
+notifications = Table(
+    "notifications", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("saved_search_id", Integer, nullable=False),
+    Column("property_id", Integer, nullable=False),
+    Column("is_read", Boolean, nullable=False),
+    Column("created_at", DateTime),
+    Index("uq_notifications_search_property", "saved_search_id", "property_id", unique=True),
+    Index("ix_notifications_user_id", "user_id", "id"),
+    Index("ix_notifications_user_unread", "user_id", "is_read"),
+)
+
+def upgrade(conn) -> None:
+    ops.create_table(conn, saved_searches)
+    ops.create_table(conn, notifications)
@@ -0,0 +1,29 @@
+"""
+Cold storage for old read messages. A RANGE-partitioned messages table
+would be the alternative, but InnoDB doesn't allow foreign keys on
+partitioned tables and messages has three.
+"""
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, Table, Text
+from app.migrations import ops
+
+VERSION = 8
+DESCRIPTION = "Message archive table"
+
+metadata = MetaData()
+
+messages_archive = Table(
+    "messages_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("sender_id", Integer, nullable=False),
+    Column("receiver_id", Integer, nullable=False),
+    Column("property_id", Integer, nullable=True),
+    Column("content", Text, nullable=False),
+    Column("is_read", Boolean, nullable=False),
+    Column("created_at", DateTime, nullable=True),
+    Column("archived_at", DateTime),
+    Index("ix_messages_archive_pair_id", "sender_id", "receiver_id", "id"),
+    Index("ix_messages_archive_receiver", "receiver_id", "sender_id"),
+)
+
+def upgrade(conn) -> None:
+    ops.create_table(conn, messages_archive)
@@ -0,0 +1,22 @@
+"""
+Listing deletes detach archived messages with one UPDATE ... WHERE
+property_id IN (...). The hot messages table already has an index on
+property_id (InnoDB creates one for its foreign key); the archive has no
+foreign keys, so it needs its own.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table
+from app.migrations import ops
+
+VERSION = 9
+DESCRIPTION = "Archived message index for listing deletes"
+
+metadata = MetaData()
+
+messages_archive = Table(
+    "messages_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("property_id", Integer),
+)
+
+def upgrade(conn) -> None:
+    ops.create_index(conn, Index("ix_messages_archive_property", messages_archive.c.property_id))
@@ -0,0 +1,22 @@
+"""
+Lock rows that serialize full rebuilds of the map grid and market rollups
+with the background tasks that update them incrementally.
+"""
+from sqlalchemy import Column, MetaData, String, Table
+from app.migrations import ops
+
+VERSION = 10
+DESCRIPTION = "Rollup rebuild locks"
+
+ROLLUPS = ("map_grid", "market_stats")
+
+metadata = MetaData()
+
+rollup_locks = Table(
+    "rollup_locks", metadata,
+    Column("name", String(50), primary_key=True),
+)
+
+def upgrade(conn) -> None:
+    if ops.create_table(conn, rollup_locks):
+        conn.execute(rollup_locks.insert(), [{"name": name} for name in ROLLUPS])
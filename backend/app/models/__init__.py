@@ -2,5 +2,23 @@ from .user import User
 from .property import Property
 from .review import Review
 from .message import Message
+from .message_tombstone import MessageTombstone
+from .archived_message import ArchivedMessage
+from .booking import Booking
+from .job_lease import JobLease
+from .property_view import PropertyViewStats, PropertyViewBucket
+from .property_grid_cell import PropertyGridCell
+from .property_change import PropertyChange
+from .property_signature import PropertySignature, PropertyLshBucket
+from .background_task import BackgroundTask
+from .property_price_history import PropertyPriceHistory
+from .market_price_bucket import MarketPriceBucket
+from .saved_search import SavedSearch, Notification
+from .rollup_lock import RollupLock
 
-__all__ = ["User", "Property", "Review", "Message"]
+__all__ = [
+    "User", "Property", "Review", "Message", "MessageTombstone", "ArchivedMessage", "Booking", "JobLease",
+    "PropertyViewStats", "PropertyViewBucket", "PropertyGridCell",
+    "PropertyChange", "PropertySignature", "PropertyLshBucket", "BackgroundTask",
+    "PropertyPriceHistory", "MarketPriceBucket", "SavedSearch", "Notification", "RollupLock"
+]
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Text, DateTime, Boolean, Index
+from datetime import datetime
+from app.database import Base
+
+class ArchivedMessage(Base):
+    __tablename__ = "messages_archive"
+
+    # Read messages past MESSAGE_ARCHIVE_AFTER_DAYS, moved out of `messages`
+    # with their ids so conversation cursors stay valid. No foreign keys:
+    # cold rows shouldn't slow down writes to the tables they point at.
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    sender_id = Column(Integer, nullable=False)
+    receiver_id = Column(Integer, nullable=False)
+    property_id = Column(Integer, nullable=True)
+    content = Column(Text, nullable=False)
+    is_read = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Same conversation paging index as messages
+        Index("ix_messages_archive_pair_id", "sender_id", "receiver_id", "id"),
+        # Conversation partners of a receiver, for the inbox
+        Index("ix_messages_archive_receiver", "receiver_id", "sender_id"),
+        # Detaching messages from a deleted listing
+        Index("ix_messages_archive_property", "property_id"),
+    )
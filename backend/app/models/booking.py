@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+class Booking(Base):
+    __tablename__ = "bookings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Half-open range [start_date, end_date): end_date is the check-out day
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    property = relationship("Property", back_populates="bookings")
+    user = relationship("User")
+
+    __table_args__ = (
+        # Overlap probes are "property_id = ? AND start_date < ? AND end_date > ?",
+        # so every lookup is a range scan bounded to a single property.
+        Index("ix_bookings_property_start_end", "property_id", "start_date", "end_date"),
+    )
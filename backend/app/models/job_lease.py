@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float
+from app.database import Base
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    # One row per scheduled job; whoever holds an unexpired lease runs it
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+
+    # Metrics from the most recent run, across all workers
+    run_count = Column(Integer, default=0)
+    failure_count = Column(Integer, default=0)
+    last_started_at = Column(DateTime, nullable=True)
+    last_duration_ms = Column(Float, nullable=True)
+    last_result = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
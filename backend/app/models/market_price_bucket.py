@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, Float
+from app.database import Base
+
+# bedrooms value for listings that don't say
+UNKNOWN_BEDROOMS = -1
+
+class MarketPriceBucket(Base):
+    __tablename__ = "market_price_buckets"
+
+    # One price sketch bucket (app/utils/price_sketch.py) of one market
+    # segment. A segment's buckets together are its sketch, and the buckets
+    # of several segments sum into the sketch of their union.
+    city_key = Column(String(100), primary_key=True)  # lowercased city
+    property_type = Column(String(20), primary_key=True)
+    bedrooms = Column(SmallInteger, primary_key=True)
+    bucket = Column(SmallInteger, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_price = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -18,3 +18,10 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], backref="received_messages")
     property = relationship("Property", backref="messages")
+
+    __table_args__ = (
+        # One direction of a conversation in id order, for cursor paging
+        Index("ix_messages_pair_id", "sender_id", "receiver_id", "id"),
+        # Unread counts and inbox filters: receiver_id = ? AND is_read = 0
+        Index("ix_messages_receiver_unread", "receiver_id", "is_read", "property_id"),
+    )
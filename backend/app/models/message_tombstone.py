@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class MessageTombstone(Base):
+    __tablename__ = "message_tombstones"
+
+    # id is the sync cursor: clients ask for tombstones with id > the last seen
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, nullable=False)
+    sender_id = Column(Integer, nullable=False)
+    receiver_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_message_tombstones_pair_id", "sender_id", "receiver_id", "id"),
+    )
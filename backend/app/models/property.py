@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Boolean, Date
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Boolean, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -36,10 +36,49 @@ class Property(Base):
     rental_end_date = Column(Date, nullable=True)
     rented_to_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
+    # Denormalized review stats for rating sorts, refreshed by a background task
+    # shortly after each review is added or removed
+    average_rating = Column(Float, nullable=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    
+    # Optimistic concurrency: every ORM UPDATE is "... WHERE version = <read>"
+    # and bumps it; also served to clients as the ETag
+    version = Column(Integer, nullable=False, default=1)
+    
+    # Best near-duplicate match found when the listing was last written (or by
+    # `python -m app.duplicates scan --flag`); not cleared if that listing goes
+    possible_duplicate_of = Column(Integer, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     owner = relationship("User", back_populates="properties", foreign_keys=[owner_id])
     rented_to = relationship("User", foreign_keys=[rented_to_user_id])
-    reviews = relationship("Review", back_populates="property", cascade="all, delete-orphan")
+    # Removed with one DELETE per table by PropertyController.delete_properties,
+    # never loaded and deleted row by row through the ORM
+    reviews = relationship("Review", back_populates="property", passive_deletes=True)
+    bookings = relationship("Booking", back_populates="property", passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # Serves the rental expiry sweep: is_rented = 1 AND rental_end_date < today
+        Index("ix_properties_rented_end", "is_rented", "rental_end_date"),
+        # Incremental refresh of per-worker in-memory indexes
+        Index("ix_properties_updated", "updated_at"),
+        # Owner dashboards page an owner's listings in id order
+        Index("ix_properties_owner", "owner_id", "id"),
+        # Listing sorts, alone and behind the equality filters on property_type
+        # and city. Each ends in id so ORDER BY <key>, id is read in index order
+        # and the page of ids is resolved from the index alone.
+        Index("ix_properties_price", "price", "id"),
+        Index("ix_properties_created", "created_at", "id"),
+        Index("ix_properties_rating", "average_rating", "id"),
+        Index("ix_properties_type_price", "property_type", "price", "id"),
+        Index("ix_properties_type_created", "property_type", "created_at", "id"),
+        Index("ix_properties_type_rating", "property_type", "average_rating", "id"),
+        Index("ix_properties_city_price", "city", "price", "id"),
+        Index("ix_properties_city_created", "city", "created_at", "id"),
+        Index("ix_properties_city_rating", "city", "average_rating", "id"),
+    )
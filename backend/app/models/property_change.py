@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class PropertyChange(Base):
+    __tablename__ = "property_changes"
+
+    # seq is the change feed cursor; it only ever increases
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    property_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # "upsert" or "delete"
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_property_changes_property_seq", "property_id", "seq"),
+    )
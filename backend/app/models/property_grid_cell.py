@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, SmallInteger, Float
+from app.database import Base
+
+class PropertyGridCell(Base):
+    __tablename__ = "property_grid_cells"
+
+    # Aggregate of the properties inside one Web Mercator cell at one level
+    level = Column(SmallInteger, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_latitude = Column(Float, nullable=False, default=0.0)
+    sum_longitude = Column(Float, nullable=False, default=0.0)
+    # Maintained incrementally as bounds: they widen on insert but are only
+    # tightened after removals by the periodic rebuild
+    min_price = Column(Float, nullable=True)
+    max_price = Column(Float, nullable=True)
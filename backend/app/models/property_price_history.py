@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class PropertyPriceHistory(Base):
+    __tablename__ = "property_price_history"
+
+    # Append-only; kept after the listing is deleted, for market history
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    property_id = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    previous_price = Column(Float, nullable=True)  # None for the listing's first price
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_price_history_property", "property_id", "id"),
+    )
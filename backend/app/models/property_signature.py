@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database import Base
+
+class PropertySignature(Base):
+    __tablename__ = "property_signatures"
+
+    # MinHash of the listing text (app/utils/minhash.py) and its geo cell
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    signature = Column(LargeBinary(512), nullable=False)
+    cell_x = Column(Integer, nullable=False)
+    cell_y = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PropertyLshBucket(Base):
+    __tablename__ = "property_lsh_buckets"
+
+    # One row per (band, property); listings sharing a bucket are candidates
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_lsh_buckets_property", "property_id"),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.database import Base
+
+class PropertyViewStats(Base):
+    __tablename__ = "property_view_stats"
+
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    last_viewed_at = Column(DateTime, nullable=True)
+
+class PropertyViewBucket(Base):
+    __tablename__ = "property_view_buckets"
+
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    granularity = Column(String(5), primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Trending sums views per property over a recent window of buckets;
+        # carrying views makes that aggregate index-only.
+        Index("ix_view_buckets_window", "granularity", "bucket_start", "property_id", "views"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -16,3 +16,9 @@ class Review(Base):
     # Relationships
     property = relationship("Property", back_populates="reviews")
     user = relationship("User", back_populates="reviews")
+
+    __table_args__ = (
+        # One review per user per property; also serves lookups by property_id
+        UniqueConstraint("property_id", "user_id", name="uq_reviews_property_user"),
+        Index("ix_reviews_user", "user_id"),
+    )
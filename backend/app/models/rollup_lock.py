@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String
+from app.database import Base
+
+class RollupLock(Base):
+    __tablename__ = "rollup_locks"
+
+    # One row per incrementally maintained rollup. Incremental updates and
+    # full rebuilds of a rollup lock its row FOR UPDATE, so a rebuild never
+    # interleaves with the deltas it replaces.
+    name = Column(String(50), primary_key=True)
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index
+from datetime import datetime
+from app.database import Base
+
+class SavedSearch(Base):
+    __tablename__ = "saved_searches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(100), nullable=False)
+
+    # The get_properties filters; None leaves that field unconstrained
+    property_type = Column(String(20), nullable=True)
+    min_price = Column(Float, nullable=True)
+    max_price = Column(Float, nullable=True)
+    city = Column(String(100), nullable=True)
+    country = Column(String(100), nullable=True)
+    # Listings within radius_km of (latitude, longitude)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    radius_km = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_saved_searches_user", "user_id", "id"),
+    )
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Plain ids: a notification outlives the search or listing it points at
+    saved_search_id = Column(Integer, nullable=False)
+    property_id = Column(Integer, nullable=False)
+    is_read = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # A listing notifies each search once, however often it is edited
+        Index("uq_notifications_search_property", "saved_search_id", "property_id", unique=True),
+        # A user's feed, newest first, and its unread count
+        Index("ix_notifications_user_id", "user_id", "id"),
+        Index("ix_notifications_user_unread", "user_id", "is_read"),
+    )
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, model_validator
+from datetime import datetime, date
+from typing import Optional
+
+class BookingCreate(BaseModel):
+    start_date: date
+    end_date: date
+
+    @model_validator(mode="after")
+    def check_dates(self):
+        if self.end_date <= self.start_date:
+            raise ValueError("end_date must be after start_date")
+        return self
+
+class BookingResponse(BaseModel):
+    id: int
+    property_id: int
+    user_id: int
+    start_date: date
+    end_date: date
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class BookedDates(BaseModel):
+    """A property's booking calendar entry; who booked is only shown to the owner and the guest"""
+    start_date: date
+    end_date: date
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class MessageCreate(BaseModel):
     receiver_id: int
@@ -31,3 +31,9 @@ class ConversationResponse(BaseModel):
     unread_count: int
     property_id: Optional[int] = None
     property_title: Optional[str] = None
+
+class ConversationSyncResponse(BaseModel):
+    messages: List[MessageResponse]
+    deleted_ids: List[int]
+    tombstone_cursor: int
+    has_more: bool
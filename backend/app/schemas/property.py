@@ -10,14 +10,22 @@ class PropertyType(str, Enum):
     STUDIO = "studio"
     SHOP = "shop"
 
+class PropertySort(str, Enum):
+    PRICE_ASC = "price_asc"
+    PRICE_DESC = "price_desc"
+    NEWEST = "newest"
+    RATING = "rating"
+    TRENDING = "trending"
+
 class PropertyBase(BaseModel):
     title: str = Field(..., min_length=3, max_length=200)
     description: Optional[str] = None
     property_type: PropertyType
     price: float = Field(..., gt=0)
     address: str = Field(..., min_length=5)
-    city: str = Field(..., min_length=1, max_length=100)
-    country: str = Field(..., min_length=1, max_length=100)
+    # Derived from latitude/longitude when a known city is nearby (app/utils/geocoder.py)
+    city: Optional[str] = Field(None, min_length=1, max_length=100)
+    country: Optional[str] = Field(None, min_length=1, max_length=100)
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     bedrooms: int = Field(default=1, ge=0)
@@ -75,13 +83,82 @@ class PropertyResponse(BaseModel):
     rental_start_date: Optional[date] = None
     rental_end_date: Optional[date] = None
     rented_to_user_id: Optional[int] = None
+    possible_duplicate_of: Optional[int] = None
+    version: int
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class PropertyBatchResponse(BaseModel):
+    properties: List[PropertyResponse]
+    missing: List[int]
+
+class PropertyChangesResponse(BaseModel):
+    changed: List[PropertyResponse]
+    deleted_ids: List[int]
+    next_token: str
+    has_more: bool
+
 class RentalStatusUpdate(BaseModel):
     is_rented: bool
     rental_start_date: Optional[date] = None
     rental_end_date: Optional[date] = None
     rented_to_user_id: Optional[int] = None
+
+class OwnerListingSummary(BaseModel):
+    id: int
+    title: str
+    property_type: str
+    price: float
+    city: str
+    country: str
+    average_rating: Optional[float] = None
+    review_count: int = 0
+    unread_inquiries: int = 0
+    view_count: int = 0
+    is_rented: bool = False
+    rental_start_date: Optional[date] = None
+    rental_end_date: Optional[date] = None
+    rented_to_user_id: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class OwnerDashboardResponse(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    listings: List[OwnerListingSummary]
+
+class PropertyCluster(BaseModel):
+    count: int
+    latitude: float
+    longitude: float
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+class PropertyClusterResponse(BaseModel):
+    level: int
+    clusters: List[PropertyCluster]
+
+class MarketStatsResponse(BaseModel):
+    city: str
+    property_type: Optional[PropertyType] = None
+    bedrooms: Optional[int] = None
+    count: int
+    average_price: Optional[float] = None
+    # Nearest-rank percentiles of asking rent (pN is the ceil(N% of count)-th
+    # lowest price), each within 1% of the exact value
+    p10: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+
+class PriceHistoryEntry(BaseModel):
+    price: float
+    previous_price: Optional[float] = None
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
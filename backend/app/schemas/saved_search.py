@@ -0,0 +1,60 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import List, Optional
+from app.schemas.property import PropertyType
+
+class SavedSearchCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    property_type: Optional[PropertyType] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    city: Optional[str] = Field(None, min_length=1, max_length=100)
+    country: Optional[str] = Field(None, min_length=1, max_length=100)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(None, gt=0, le=500)
+
+    @model_validator(mode="after")
+    def check_filters(self):
+        if self.min_price is not None and self.max_price is not None and self.max_price < self.min_price:
+            raise ValueError("max_price must not be below min_price")
+        location = (self.latitude, self.longitude, self.radius_km)
+        if any(value is not None for value in location) and any(value is None for value in location):
+            raise ValueError("latitude, longitude and radius_km must be given together")
+        return self
+
+class SavedSearchResponse(BaseModel):
+    id: int
+    name: str
+    property_type: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class NotificationResponse(BaseModel):
+    id: int
+    saved_search_id: int
+    saved_search_name: Optional[str] = None
+    property_id: int
+    property_title: Optional[str] = None
+    property_price: Optional[float] = None
+    is_read: bool
+    created_at: datetime
+
+class NotificationFeedResponse(BaseModel):
+    notifications: List[NotificationResponse]
+    unread_count: int
+    # Pass as before_id for the next (older) page; None at the end
+    next_before_id: Optional[int] = None
+
+class NotificationReadRequest(BaseModel):
+    # Omit to mark the whole feed read
+    ids: Optional[List[int]] = None
@@ -0,0 +1,45 @@
+"""Handlers for background tasks enqueued through app.utils.task_queue"""
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.controller.account_controller import AccountController
+from app.controller.property_controller import PropertyController
+from app.controller.cluster_controller import ClusterController, Point
+from app.controller.market_controller import MarketController, Listing
+from app.controller.saved_search_controller import SavedSearchController
+from app.utils.task_queue import task_queue
+
+@task_queue.task("refresh_review_stats")
+def refresh_review_stats(db: Session, property_id: int) -> None:
+    """Recompute a property's rating columns after a review was added or removed"""
+    PropertyController.refresh_review_stats(db, property_id)
+
+@task_queue.task("update_map_grid")
+def update_map_grid(db: Session, added: Optional[List[Point]] = None, removed: Optional[List[Point]] = None) -> None:
+    """Move a property's point between map cluster cells"""
+    ClusterController.apply_changes(
+        db, added=[tuple(point) for point in added or ()], removed=[tuple(point) for point in removed or ()]
+    )
+
+@task_queue.task("update_market_stats")
+def update_market_stats(db: Session, added: Optional[List[Listing]] = None, removed: Optional[List[Listing]] = None) -> None:
+    """Move a listing's price between market segment sketches"""
+    MarketController.apply_changes(
+        db, added=[tuple(listing) for listing in added or ()], removed=[tuple(listing) for listing in removed or ()]
+    )
+
+@task_queue.task("match_saved_searches")
+def match_saved_searches(db: Session, property_id: int) -> None:
+    """Push a new or changed listing to the feeds of the saved searches it matches"""
+    SavedSearchController.match_property(db, property_id)
+
+@task_queue.task("purge_account")
+def purge_account(db: Session, user_id: int, step: int = 0) -> None:
+    """Delete one batch of a closed account's data, then queue the next"""
+    if AccountController.purge_batch(db, user_id, settings.ACCOUNT_PURGE_BATCH_SIZE):
+        # Committed with this batch, so the chain survives worker restarts
+        task_queue.enqueue(
+            db, "purge_account", {"user_id": user_id, "step": step + 1},
+            idempotency_key=f"account:{user_id}:purge:{step + 1}",
+            delay=settings.ACCOUNT_PURGE_PAUSE_SECONDS
+        )
@@ -0,0 +1,244 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Type
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+
+_MISSING = object()
+
+class LocalCache:
+    """Bounded, thread-safe LRU whose entries also expire after a TTL"""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class RedisCache:
+    """Shared second level and the home of entity versions when several workers run"""
+
+    def __init__(self, url: str, ttl: float = 60.0, prefix: str = "entity:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package") from e
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.from_url(url, socket_timeout=0.05)
+
+    def version(self, key: str) -> int:
+        return int(self._client.get(f"{self.prefix}ver:{key}") or 0)
+
+    def bump(self, key: str) -> int:
+        return int(self._client.incr(f"{self.prefix}ver:{key}"))
+
+    def get(self, key: str, version: int) -> Any:
+        raw = self._client.get(f"{self.prefix}{key}:v{version}")
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, version: int, value: Any) -> None:
+        self._client.set(f"{self.prefix}{key}:v{version}", pickle.dumps(value), px=int(self.ttl * 1000))
+
+def snapshot(instance) -> Dict[str, Any]:
+    """Column values of a loaded ORM instance, free of any session"""
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
+
+def restore(db: Session, model: Type, values: Dict[str, Any]):
+    """Attach a snapshot to db as a clean persistent instance, without a query"""
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    # Relationships were never loaded, so they lazy-load on first access
+    return db.merge(instance, load=False)
+
+class EntityCache:
+    """
+    Read-through cache of ORM rows by primary key.
+
+    Entries are column snapshots stored under versioned keys. A write bumps
+    the entity's version once its transaction commits, so every worker reading
+    the version afterwards misses instead of serving the old row, and a reader
+    that loaded the row just before the write can only store it under the
+    version that is now dead. Versions live in Redis when CACHE_BACKEND=redis;
+    otherwise each worker keeps its own and other workers' copies of a changed
+    row stay readable until their TTL runs out.
+    """
+
+    def __init__(self, local: LocalCache, shared: Optional[RedisCache] = None, enabled: bool = True):
+        self.local = local
+        self.shared = shared
+        self.enabled = enabled
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+    @staticmethod
+    def key(model: Type, entity_id: Any) -> str:
+        return f"{model.__tablename__}:{entity_id}"
+
+    def fetch(self, db: Session, model: Type, entity_id: Any, loader: Callable[[], Any]):
+        """Return the entity attached to db, calling loader() on a miss"""
+        if not self.enabled:
+            return loader()
+
+        key = self.key(model, entity_id)
+        # Read the version before loading, so a write landing in between
+        # leaves this load filed under a version nobody asks for again
+        version = self._version(key)
+        if version is None:
+            return loader()
+        values = self._get(key, version)
+        if values is not _MISSING:
+            return restore(db, model, values)
+
+        self._count("misses")
+        instance = loader()
+        if instance is not None:
+            self._set(key, version, snapshot(instance))
+        return instance
+
+    def version(self, model: Type, entity_id: Any) -> Optional[int]:
+        """Current version of an entity, bumped by every committed write; None if unknown"""
+        return self._version(self.key(model, entity_id))
+
+    def lookup(self, alias: str) -> Any:
+        """Unversioned alias such as email -> id; callers re-check what it resolves to"""
+        return self.local.get(("alias", alias)) if self.enabled else None
+
+    def remember(self, alias: str, value: Any) -> None:
+        if self.enabled:
+            self.local.set(("alias", alias), value)
+
+    def forget(self, alias: str) -> None:
+        self.local.delete(("alias", alias))
+
+    def invalidate_on_commit(self, db: Session, model: Type, entity_ids: Iterable[Any]) -> None:
+        """Invalidate entities once db's transaction commits (dropped on rollback)"""
+        pending = db.info.setdefault("cache_invalidations", set())
+        pending.update(self.key(model, entity_id) for entity_id in entity_ids)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.local.delete(key)
+            self._count("invalidations")
+            if self.shared is not None:
+                try:
+                    self.shared.bump(key)
+                    continue
+                except Exception:
+                    self._count("errors")
+            with self._lock:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["shared_hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self.shared is not None else "memory",
+            **self._stats,
+            "hit_ratio": round((self._stats["hits"] + self._stats["shared_hits"]) / lookups, 4) if lookups else None,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "size": len(self.local),
+            "max_entries": self.local.max_entries,
+            "ttl_seconds": self.local.ttl,
+        }
+
+    def _version(self, key: str) -> Optional[int]:
+        """Current version of key, or None when it can't be known (Redis down)"""
+        if self.shared is not None:
+            try:
+                return self.shared.version(key)
+            except Exception:
+                self._count("errors")
+                return None
+        return self._versions.get(key, 0)
+
+    def _get(self, key: str, version: int) -> Any:
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == version:
+            self._count("hits")
+            return entry[1]
+
+        if self.shared is not None:
+            try:
+                values = self.shared.get(key, version)
+            except Exception:
+                self._count("errors")
+                values = _MISSING
+            if values is not _MISSING:
+                self._count("shared_hits")
+                self.local.set(key, (version, values))
+                return values
+        return _MISSING
+
+    def _set(self, key: str, version: int, values: Dict[str, Any]) -> None:
+        self.local.set(key, (version, values))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, version, values)
+            except Exception:
+                self._count("errors")
+
+    def _count(self, name: str) -> None:
+        # Unlocked: a lost increment under contention only skews the stats
+        self._stats[name] += 1
+
+def create_entity_cache() -> EntityCache:
+    local = LocalCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    shared = None
+    if settings.CACHE_BACKEND == "redis":
+        shared = RedisCache(settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS)
+    return EntityCache(local, shared, enabled=settings.CACHE_ENABLED)
+
+entity_cache = create_entity_cache()
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    keys = session.info.pop("cache_invalidations", None)
+    if keys:
+        entity_cache.invalidate(keys)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop("cache_invalidations", None)
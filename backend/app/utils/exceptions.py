@@ -13,3 +13,39 @@ class DatabaseException(HTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=detail
         )
+
+class VersionConflictException(HTTPException):
+    def __init__(self, detail: str = "Property was modified by another request; reload it and retry"):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail
+        )
+
+class PreconditionFailedException(HTTPException):
+    def __init__(self, detail: str = "Property has changed since it was read (If-Match failed)"):
+        super().__init__(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=detail
+        )
+
+class BookingConflictException(HTTPException):
+    def __init__(self, detail: str = "Property is already booked for the requested dates"):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail
+        )
+
+class LocationRequiredException(HTTPException):
+    def __init__(self, detail: str = "No known city near these coordinates; provide city and country"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+class SimilarityIndexUnavailableException(HTTPException):
+    def __init__(self, detail: str = "Similar listings are not available yet; retry shortly"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "10"}
+        )
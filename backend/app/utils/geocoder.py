@@ -0,0 +1,176 @@
+import csv
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+from app.config import settings
+
+EARTH_RADIUS_KM = 6371.0
+
+# magic, version, number of places, byte length of the names block
+_HEADER = struct.Struct("<4sIII")
+_MAGIC = b"GZTR"
+_FORMAT_VERSION = 1
+
+# (city, country, distance in km) of the place nearest a point
+Place = Tuple[str, str, float]
+
+def _unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lng)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+def compile_gazetteer(csv_path: str, out_path: str) -> int:
+    """
+    Compile a city,country,latitude,longitude CSV into the packed file the
+    geocoder maps: unit vectors laid out as an implicit KD-tree (each range's
+    median is its root, split on axis depth % 3), then for each point the
+    offset of its "city\\tcountry" in a UTF-8 names block.
+    """
+    places = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            city, country = row["city"].strip(), row["country"].strip()
+            if city and country:
+                places.append((_unit_vector(float(row["latitude"]), float(row["longitude"])), city, country))
+
+    ordered = [None] * len(places)
+    stack = [(0, len(places), 0, places)]
+    while stack:
+        lo, hi, depth, items = stack.pop()
+        if not items:
+            continue
+        items = sorted(items, key=lambda place: place[0][depth % 3])
+        mid = len(items) // 2
+        ordered[lo + mid] = items[mid]
+        stack.append((lo, lo + mid, depth + 1, items[:mid]))
+        stack.append((lo + mid + 1, hi, depth + 1, items[mid + 1:]))
+
+    names = bytearray()
+    offsets = []
+    for _, city, country in ordered:
+        offsets.append(len(names))
+        names += f"{city}\t{country}".encode("utf-8")
+    offsets.append(len(names))
+
+    directory = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(ordered), len(names)))
+            out.write(struct.pack(f"<{3 * len(ordered)}f", *(c for point, _, _ in ordered for c in point)))
+            out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            out.write(names)
+        os.chmod(tmp_path, 0o644)
+        # Readers map either the old file or the new one, never half of it
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(ordered)
+
+class ReverseGeocoder:
+    """
+    Nearest-city lookups against a bundled gazetteer, without any network call.
+
+    The CSV is compiled once into a packed file next to it (rebuilt when the
+    CSV is newer) and memory-mapped, so loading costs no parsing and every
+    worker process shares the same pages. Points are unit vectors on the
+    sphere, so the KD-tree's straight-line (chord) distance orders places the
+    same way great-circle distance does.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.packed_path = os.path.splitext(csv_path)[0] + ".bin"
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._coords = None
+        self._offsets = None
+        self._names = None
+        self.size = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+
+    def load(self) -> int:
+        """Map the packed gazetteer, compiling it first if missing or stale"""
+        with self._lock:
+            if self._mmap is not None:
+                return self.size
+            if (not os.path.exists(self.packed_path)
+                    or os.path.getmtime(self.packed_path) < os.path.getmtime(self.csv_path)):
+                compile_gazetteer(self.csv_path, self.packed_path)
+            with open(self.packed_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, names_length = _HEADER.unpack_from(mapped, 0)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                mapped.close()
+                raise ValueError(f"{self.packed_path} is not a compiled gazetteer; rebuild it")
+
+            view = memoryview(mapped)
+            start = _HEADER.size
+            self._coords = view[start:start + 12 * count].cast("f")
+            start += 12 * count
+            self._offsets = view[start:start + 4 * (count + 1)].cast("I")
+            start += 4 * (count + 1)
+            self._names = view[start:start + names_length]
+            self.size = count
+            self._mmap = mapped
+            return count
+
+    def nearest(self, lat: float, lng: float) -> Optional[Place]:
+        """The gazetteer place closest to a point, with its distance"""
+        if self._mmap is None:
+            self.load()
+        if not self.size:
+            return None
+
+        coords = self._coords
+        query = _unit_vector(lat, lng)
+        best_index, best = -1, math.inf
+        # (lo, hi, depth, squared distance to the plane that bounds the range)
+        stack: List[Tuple[int, int, int, float]] = [(0, self.size, 0, 0.0)]
+        while stack:
+            lo, hi, depth, bound = stack.pop()
+            if lo >= hi or bound >= best:
+                continue
+            mid = (lo + hi) // 2
+            base = 3 * mid
+            dx = coords[base] - query[0]
+            dy = coords[base + 1] - query[1]
+            dz = coords[base + 2] - query[2]
+            distance = dx * dx + dy * dy + dz * dz
+            if distance < best:
+                best_index, best = mid, distance
+
+            axis = depth % 3
+            diff = query[axis] - coords[base + axis]
+            # The near side is pushed last so it is searched first; the far
+            # side is skipped once a place closer than its plane has been found
+            if diff > 0:
+                stack.append((lo, mid, depth + 1, diff * diff))
+                stack.append((mid + 1, hi, depth + 1, 0.0))
+            else:
+                stack.append((mid + 1, hi, depth + 1, diff * diff))
+                stack.append((lo, mid, depth + 1, 0.0))
+
+        city, country = bytes(
+            self._names[self._offsets[best_index]:self._offsets[best_index + 1]]
+        ).decode("utf-8").split("\t")
+        return (city, country, _chord_to_km(math.sqrt(best)))
+
+    def resolve(self, lat: float, lng: float, max_distance_km: float) -> Optional[Tuple[str, str]]:
+        """Canonical (city, country) for a point, or None if no place is within range"""
+        place = self.nearest(lat, lng)
+        if place is None or place[2] > max_distance_km:
+            return None
+        return place[0], place[1]
+
+geocoder = ReverseGeocoder(settings.GEOCODER_GAZETTEER)
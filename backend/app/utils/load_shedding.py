@@ -0,0 +1,276 @@
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import re
+import time
+from typing import Dict, List, Optional, Pattern, Tuple
+from app.config import settings
+from app.utils.rate_limit import EXEMPT_PATHS
+
+# (method or None for any, path pattern, route class); the first match wins,
+# anything unmatched is "read" for GET/HEAD and "write" otherwise
+ROUTE_CLASSES: List[Tuple[Optional[str], Pattern, str]] = [
+    ("POST", re.compile(r"^/api/auth/(signup|login|login/form)/?$"), "auth"),
+    (None, re.compile(r"^/api/messages(/|$)"), "messaging"),
+    (None, re.compile(r"^/api/notifications(/|$)"), "messaging"),
+    ("GET", re.compile(r"^/api/properties/?$"), "search"),
+    ("GET", re.compile(r"^/api/properties/(clusters|market-stats)/?$"), "search"),
+    ("GET", re.compile(r"^/api/properties/\d+/similar/?$"), "search"),
+]
+
+# route class -> (priority, lower is served first; share of
+# LOAD_SHED_MAX_CONCURRENCY it may occupy). Listing search and bcrypt logins
+# are capped so a burst of them can't take every slot from cheap reads.
+CLASSES: Dict[str, Tuple[int, float]] = {
+    "read": (0, 1.0),
+    "messaging": (0, 1.0),
+    "write": (1, 0.75),
+    "search": (2, 0.5),
+    "auth": (2, 0.25),
+}
+
+REQUEST_START_HEADER = b"x-request-start"
+TIMEOUT_HEADER = b"x-request-timeout"
+
+def route_class(method: str, path: str) -> str:
+    for rule_method, pattern, name in ROUTE_CLASSES:
+        if (rule_method is None or method == rule_method) and pattern.match(path):
+            return name
+    return "read" if method in ("GET", "HEAD") else "write"
+
+def parse_request_start(value: str) -> Optional[float]:
+    """Epoch seconds from an X-Request-Start header ("t=<s|ms|us>" or a bare number)"""
+    value = value.strip()
+    if value.startswith("t="):
+        value = value[2:]
+    try:
+        stamp = float(value)
+    except ValueError:
+        return None
+    # Proxies disagree on the unit; tell them apart by magnitude
+    if stamp > 1e14:
+        return stamp / 1e6
+    if stamp > 1e11:
+        return stamp / 1e3
+    return stamp
+
+class Shed(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Concurrency limits per route class in front of the app, with a priority
+    queue for requests waiting on a slot.
+
+    A request is admitted only while it can still be useful. With an
+    X-Request-Timeout (milliseconds the client will wait) it must be able to
+    finish in what is left of it after queueing upstream (X-Request-Start,
+    stamped by the proxy) given the class's recent service time; without
+    one it may wait at most LOAD_SHED_MAX_QUEUE_MS in all. One that can't is
+    answered 503 straight away instead of doing work nobody will read.
+
+    Freed slots go to the highest-priority waiter whose class is under its
+    share, so cheap reads and messaging overtake listing search and logins
+    when the worker is saturated.
+
+    Everything runs on the event loop, so there is no locking.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_ms: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue_ms / 1000.0
+        self.in_flight = 0
+        self._limits = {
+            name: max(1, int(max_concurrency * share)) for name, (_, share) in CLASSES.items()
+        }
+        self._running: Dict[str, int] = {name: 0 for name in CLASSES}
+        # EWMA of seconds from admission to response, per class
+        self._service: Dict[str, float] = {name: 0.0 for name in CLASSES}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"admitted": 0, "queued": 0, "shed_deadline": 0, "shed_timeout": 0, "upstream_wait_ms": 0.0}
+            for name in CLASSES
+        }
+
+    async def acquire(self, name: str, deadline: Optional[float], waited: float) -> None:
+        """
+        Take a slot for a request of class name, or raise Shed. deadline is
+        the seconds the client will still wait for the response (None if it
+        didn't say); waited is how long it already queued upstream.
+        """
+        stats = self._stats[name]
+        if deadline is not None:
+            wait_budget = deadline - self._service[name]
+            if wait_budget <= 0:
+                stats["shed_deadline"] += 1
+                raise Shed("deadline", self._retry_after(name))
+        else:
+            wait_budget = self.max_queue - waited
+            if wait_budget <= 0:
+                # Queued so long in front of this worker the client has likely gone
+                stats["shed_timeout"] += 1
+                raise Shed("timeout", self._retry_after(name))
+
+        if self._has_room(name) and not self._waiters:
+            self._admit(name)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (CLASSES[name][0], next(self._seq), name, waiter)
+        heapq.heappush(self._waiters, entry)
+        stats["queued"] += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), min(wait_budget, self.max_queue))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted in the same tick the wait ran out; keep the slot
+                return
+            waiter.cancel()
+            self._remove(entry)
+            stats["shed_deadline" if deadline is not None else "shed_timeout"] += 1
+            raise Shed("deadline" if deadline is not None else "timeout", self._retry_after(name))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(name, None)
+            else:
+                waiter.cancel()
+                self._remove(entry)
+            raise
+
+    def release(self, name: str, elapsed: Optional[float]) -> None:
+        """Free a slot; elapsed is the request's service time when it completed"""
+        self.in_flight -= 1
+        self._running[name] -= 1
+        if elapsed is not None:
+            self._service[name] += 0.2 * (elapsed - self._service[name])
+        self._dispatch()
+
+    def record_upstream_wait(self, name: str, waited: float) -> None:
+        stats = self._stats[name]
+        stats["upstream_wait_ms"] += 0.2 * (waited * 1000.0 - stats["upstream_wait_ms"])
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "classes": {
+                name: {
+                    "priority": CLASSES[name][0],
+                    "limit": self._limits[name],
+                    "in_flight": self._running[name],
+                    "waiting": sum(1 for entry in self._waiters if entry[2] == name),
+                    "service_ms": round(self._service[name] * 1000.0, 2),
+                    **{key: round(value, 2) for key, value in self._stats[name].items()},
+                }
+                for name in CLASSES
+            },
+        }
+
+    def _has_room(self, name: str) -> bool:
+        return self.in_flight < self.max_concurrency and self._running[name] < self._limits[name]
+
+    def _admit(self, name: str) -> None:
+        self.in_flight += 1
+        self._running[name] += 1
+        self._stats[name]["admitted"] += 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, best priority first, skipping classes at their share"""
+        if self.in_flight >= self.max_concurrency or not self._waiters:
+            return
+        skipped = []
+        while self._waiters and self.in_flight < self.max_concurrency:
+            entry = heapq.heappop(self._waiters)
+            name, waiter = entry[2], entry[3]
+            if waiter.done():
+                continue
+            if self._running[name] >= self._limits[name]:
+                skipped.append(entry)
+                continue
+            self._admit(name)
+            waiter.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def _remove(self, entry) -> None:
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+
+    def _retry_after(self, name: str) -> float:
+        """Rough time until a slot of this class frees up for a new request"""
+        waiting = sum(1 for entry in self._waiters if entry[2] == name)
+        return (waiting + 1) * max(self._service[name], 0.05) / self._limits[name]
+
+class LoadSheddingMiddleware:
+    """
+    Rejects requests with 503 and Retry-After when they can't be served in
+    time (see AdmissionController). Plain ASGI so a shed request costs no
+    more than reading its headers.
+    """
+
+    def __init__(self, app, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        name = route_class(scope["method"], scope["path"])
+        headers = dict(scope["headers"])
+        deadline = None
+        timeout = headers.get(TIMEOUT_HEADER)
+        if timeout is not None:
+            try:
+                deadline = max(0.0, float(timeout) / 1000.0)
+            except ValueError:
+                pass
+        waited = 0.0
+        start = headers.get(REQUEST_START_HEADER)
+        if start is not None:
+            started_at = parse_request_start(start.decode("latin-1"))
+            if started_at is not None:
+                waited = max(0.0, time.time() - started_at)
+                self.controller.record_upstream_wait(name, waited)
+        if deadline is not None:
+            deadline -= waited
+
+        try:
+            await self.controller.acquire(name, deadline, waited)
+        except Shed as shed:
+            return await self._reject(send, shed)
+
+        admitted = time.perf_counter()
+        completed = False
+        try:
+            await self.app(scope, receive, send)
+            completed = True
+        finally:
+            self.controller.release(name, time.perf_counter() - admitted if completed else None)
+
+    @staticmethod
+    async def _reject(send, shed: Shed) -> None:
+        body = json.dumps({"detail": "Server is overloaded; retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(shed.retry_after))).encode()),
+                (b"x-load-shed", shed.reason.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+admission_controller = AdmissionController(settings.LOAD_SHED_MAX_CONCURRENCY, settings.LOAD_SHED_MAX_QUEUE_MS)
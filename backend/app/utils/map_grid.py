@@ -0,0 +1,41 @@
+import math
+from typing import List, Tuple
+
+# Deepest precomputed level; a level-L grid splits the world into 2^L x 2^L
+# Web Mercator cells, the same cells as slippy-map tiles at zoom L.
+MAX_LEVEL = 18
+LEVELS = range(0, MAX_LEVEL + 1)
+MAX_LATITUDE = 85.05112878
+
+def _clamp_latitude(latitude: float) -> float:
+    return max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+
+def cell_for(latitude: float, longitude: float, level: int = MAX_LEVEL) -> Tuple[int, int]:
+    """Web Mercator cell (x, y) containing a point at the given level"""
+    n = 1 << level
+    lat = math.radians(_clamp_latitude(latitude))
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def cells_at_all_levels(latitude: float, longitude: float) -> List[Tuple[int, int, int]]:
+    """(level, x, y) for every precomputed level, derived from the deepest cell"""
+    x, y = cell_for(latitude, longitude, MAX_LEVEL)
+    return [(level, x >> (MAX_LEVEL - level), y >> (MAX_LEVEL - level)) for level in LEVELS]
+
+def cell_ranges(
+    min_lat: float, min_lng: float, max_lat: float, max_lng: float, level: int
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Inclusive (x0, x1, y0, y1) cell ranges covering a bounding box. A box
+    crossing the antimeridian (min_lng > max_lng) yields two ranges.
+    """
+    n = 1 << level
+    x0, y0 = cell_for(max_lat, min_lng, level)
+    x1, y1 = cell_for(min_lat, max_lng, level)
+    if min_lng <= max_lng:
+        return [(x0, x1, y0, y1)]
+    return [(x0, n - 1, y0, y1), (0, x1, y0, y1)]
+
+def cell_count(ranges: List[Tuple[int, int, int, int]]) -> int:
+    return sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, x1, y0, y1 in ranges)
@@ -0,0 +1,102 @@
+import hashlib
+import math
+import re
+import unicodedata
+import zlib
+from typing import Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Reposts keep (almost) the same coordinates; neighbouring cells are probed
+# too so a pin nudged across a cell edge still meets its original
+CELL_DEGREES = 0.01
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures are stored, so every process must use the same permutations
+_rng = np.random.RandomState(20240517)
+_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+def shingles(*texts: Optional[str]) -> Set[str]:
+    """Character shingles of the normalized texts, robust to small edits"""
+    result: Set[str] = set()
+    for text in texts:
+        text = normalize(text)
+        if len(text) <= SHINGLE_SIZE:
+            if text:
+                result.add(text)
+            continue
+        result.update(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    return result
+
+def signature(features: Iterable[str]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a set of shingles"""
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint64
+    )
+    if not len(hashes):
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    # Universal hashing; uint64 products wrap, which keeps them well mixed
+    permuted = ((np.outer(hashes, _A) + _B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+def listing_signature(title: str, description: Optional[str], address: Optional[str]) -> np.ndarray:
+    return signature(shingles(title, description, address))
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+def geo_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return (int(math.floor(latitude / CELL_DEGREES)), int(math.floor(longitude / CELL_DEGREES)))
+
+def band_keys(sig: np.ndarray, cell: Tuple[int, int]) -> List[int]:
+    """One signed 64-bit LSH bucket per band, scoped to a geo cell"""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{band}:{cell[0]}:{cell[1]}:".encode())
+        digest.update(sig[band * ROWS:(band + 1) * ROWS].tobytes())
+        keys.append(int.from_bytes(digest.digest(), "big", signed=True))
+    return keys
+
+def band_hashes(sig: np.ndarray) -> np.ndarray:
+    """
+    A 64-bit hash of each band regardless of cell, for the batch scan to
+    sort on; equal bands always collide, and the rare unequal collision is
+    weeded out by the similarity check
+    """
+    bands = sig.reshape(BANDS, ROWS).astype(np.uint64)
+    hashed = np.full(BANDS, 0xCBF29CE484222325, dtype=np.uint64)
+    for column in range(ROWS):
+        # FNV-style mixing; uint64 array arithmetic wraps
+        hashed = (hashed ^ bands[:, column]) * np.uint64(0x100000001B3)
+    return hashed
+
+def probe_keys(sig: np.ndarray, cell: Tuple[int, int]) -> List[int]:
+    """Buckets to look up for a query: every band in the cell and its 8 neighbours"""
+    cx, cy = cell
+    keys = []
+    for x in (cx - 1, cx, cx + 1):
+        for y in (cy - 1, cy, cy + 1):
+            keys.extend(band_keys(sig, (x, y)))
+    return keys
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+def from_bytes(raw: bytes) -> np.ndarray:
+    return np.frombuffer(raw, dtype="<u4").astype(np.uint32)
@@ -0,0 +1,49 @@
+"""
+Mergeable quantile sketch for prices, after DDSketch (Masson et al., 2019).
+
+A price p falls in bucket ceil(log_gamma(p)), and every bucket's midpoint is
+within RELATIVE_ACCURACY of all the prices in it, so any quantile read back
+from bucket counts is within 1% of the true one. Unlike t-digest the sketch
+is just counts: two sketches merge by adding counts and a value leaves one by
+subtracting, so rollups can live in the database as plain counter rows.
+"""
+import math
+from typing import Iterable, List, Optional, Tuple
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# Prices below this share the lowest bucket
+MIN_PRICE = 1.0
+
+def bucket_of(price: float) -> int:
+    return int(math.ceil(math.log(max(price, MIN_PRICE)) / _LOG_GAMMA))
+
+def bucket_value(bucket: int) -> float:
+    """Representative price of a bucket, equidistant in relative terms from its bounds"""
+    return 2.0 * GAMMA ** bucket / (GAMMA + 1.0)
+
+def quantiles(buckets: Iterable[Tuple[int, int]], qs: Iterable[float]) -> List[Optional[float]]:
+    """
+    Estimate each quantile in qs from (bucket, count) pairs sorted by bucket,
+    by nearest rank: the ceil(q * n)-th smallest price, so p90 of 5 prices is
+    the 5th
+    """
+    buckets = [(bucket, count) for bucket, count in buckets if count > 0]
+    total = sum(count for _, count in buckets)
+    if not total:
+        return [None for _ in qs]
+
+    results = []
+    for q in qs:
+        # 0-based index of the nearest-rank sample; the epsilon stops float
+        # error (0.07 * 100 == 7.000000000000001) pushing it one rank up
+        rank = max(0, math.ceil(q * total - 1e-9) - 1)
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen > rank:
+                results.append(bucket_value(bucket))
+                break
+    return results
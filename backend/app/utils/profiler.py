@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from app.config import settings
+
+# Sampled stacks are tuples of frame labels, outermost first
+Stack = Tuple[str, ...]
+
+# Stand-in stack for ticks where the request's task wasn't running on the
+# event loop: awaiting I/O, waiting on the threadpool, or queued behind
+# other requests. It keeps a profile's total equal to its wall time.
+OFF_LOOP: Stack = ("<not on event loop>",)
+
+MAX_DEPTH = 128
+_ROOTS = [os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))] + [
+    path for path in sys.path if path.endswith("site-packages")
+]
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+
+def _label(code) -> str:
+    filename = code.co_filename
+    for root in _ROOTS:
+        if filename.startswith(root):
+            filename = os.path.relpath(filename, root)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def _stack(frame) -> Stack:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+class Profile:
+    """Stack samples of one request"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str, interval_ms: float):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.interval_ms = interval_ms
+        self.started_at = datetime.utcnow()
+        self.duration_ms: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.reason: Optional[str] = None
+        self.samples: Counter = Counter()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms or 0.0, 2),
+            "reason": self.reason,
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as read by flamegraph.pl"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common())
+
+    def speedscope(self) -> dict:
+        """Speedscope file format (https://www.speedscope.app)"""
+        frames: List[dict] = []
+        index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indices = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                indices.append(index[label])
+            samples.append(indices)
+            weights.append(count * self.interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path} ({self.reason})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "exporter": "rentonline-profiler",
+        }
+
+class Sampler:
+    """
+    Background thread sampling the event loop's stack for in-flight requests.
+
+    Each tick reads the loop thread's current frame once and credits it to
+    whichever request owns the running task; every other in-flight request
+    gets an OFF_LOOP sample. Tasks are tied to requests by a task factory
+    that copies the request's profile onto any task it spawns (e.g. the
+    child tasks of BaseHTTPMiddleware). Code running in threadpool threads
+    shows up as OFF_LOOP.
+    """
+
+    def __init__(self, interval_ms: float = 5.0):
+        self.interval = interval_ms / 1000.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task_profiles: "weakref.WeakKeyDictionary[asyncio.Task, Profile]" = weakref.WeakKeyDictionary()
+        self._active: Dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Install the task factory and start sampling (first request on a loop)"""
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        previous = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            profile = context.get(_current_profile) if context is not None else _current_profile.get()
+            if profile is not None:
+                self._task_profiles[task] = profile
+            return task
+
+        loop.set_task_factory(task_factory)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def begin(self, profile: Profile, task: asyncio.Task) -> None:
+        self._task_profiles[task] = profile
+        with self._lock:
+            self._active[profile.id] = profile
+        self._wake.set()
+
+    def end(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+            if not self._active:
+                self._wake.clear()
+
+    def _run(self) -> None:
+        while True:
+            # Sleep until a request is in flight, so an idle worker costs nothing
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+
+            task = asyncio.current_task(self._loop)
+            running = self._task_profiles.get(task) if task is not None else None
+            stack = None
+            if running is not None:
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = _stack(frame) if frame is not None else None
+            for profile in active:
+                profile.samples[stack if profile is running and stack else OFF_LOOP] += 1
+
+class ProfileStore:
+    """Ring buffer of the most recent kept profiles"""
+
+    def __init__(self, size: int = 100):
+        self._profiles: Deque[Profile] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+profile_store = ProfileStore(settings.PROFILING_BUFFER_SIZE)
+
+class ProfilingMiddleware:
+    """
+    Profile every request while it runs, then keep the profile if the
+    request was picked by PROFILING_SAMPLE_RATE or took longer than
+    PROFILING_SLOW_MS. Plain ASGI rather than BaseHTTPMiddleware so it adds
+    no task of its own. Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app, sampler: Optional[Sampler] = None, store: ProfileStore = profile_store):
+        self.app = app
+        self.sampler = sampler or Sampler(settings.PROFILING_INTERVAL_MS)
+        self.store = store
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_ms = settings.PROFILING_SLOW_MS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        self.sampler.attach(asyncio.get_running_loop())
+        profile = Profile(scope["method"], scope["path"], self.sampler.interval * 1000.0)
+        token = _current_profile.set(profile)
+        self.sampler.begin(profile, asyncio.current_task())
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.end(profile)
+            _current_profile.reset(token)
+            profile.duration_ms = (time.perf_counter() - started) * 1000.0
+            if profile.duration_ms >= self.slow_ms:
+                profile.reason = "slow"
+            elif random.random() < self.sample_rate:
+                profile.reason = "sampled"
+            if profile.reason and profile.samples:
+                self.store.add(profile)
@@ -0,0 +1,198 @@
+import math
+import re
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Pattern, Tuple
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from app.config import settings
+from app.utils.auth import AuthUtils
+
+# (method, path pattern, cost). bcrypt routes burn ~250ms of CPU each, so
+# they drain a bucket far faster than reads; the first match wins.
+ROUTE_COSTS: List[Tuple[str, Pattern, float]] = [
+    ("POST", re.compile(r"^/api/auth/(signup|login|login/form)/?$"), 25),
+    ("POST", re.compile(r"^/api/messages/?$"), 5),
+    ("GET", re.compile(r"^/api/properties/?$"), 2),
+]
+READ_COST = 1
+WRITE_COST = 3
+EXEMPT_PATHS = {"/", "/health", "/docs", "/openapi.json", "/redoc"}
+
+def route_cost(method: str, path: str) -> float:
+    """Token cost of a request"""
+    for rule_method, pattern, cost in ROUTE_COSTS:
+        if method == rule_method and pattern.match(path):
+            return cost
+    return READ_COST if method in ("GET", "HEAD", "OPTIONS") else WRITE_COST
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets"""
+
+    @abstractmethod
+    async def consume(self, key: str, cost: float, rate: float, capacity: float) -> Tuple[bool, float]:
+        """Take cost tokens from key's bucket; returns (allowed, seconds until it would be)"""
+
+    @abstractmethod
+    async def refund(self, key: str, cost: float, capacity: float) -> None:
+        """Give back tokens taken for a request that was rejected by another bucket"""
+
+class InMemoryBackend(RateLimitBackend):
+    """Per-process buckets; each worker enforces limits independently"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, key, cost, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens, updated = capacity, now
+            else:
+                tokens, updated = bucket
+                tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            self._buckets[key] = [tokens, now]
+            # Idle buckets are full anyway, so evicting the oldest loses nothing
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    async def refund(self, key, cost, capacity):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(capacity, bucket[0] + cost)
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by all workers, refilled and consumed atomically in Redis"""
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+    return {allowed, tostring(retry_after)}
+    """
+
+    REFUND_SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+    if tokens then
+        redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[2]), tokens + tonumber(ARGV[1])))
+    end
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package") from e
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._refund_script = self._client.register_script(self.REFUND_SCRIPT)
+
+    async def consume(self, key, cost, rate, capacity):
+        allowed, retry_after = await self._script(
+            keys=[self.prefix + key], args=[rate, capacity, cost, time.time()]
+        )
+        return bool(allowed), float(retry_after)
+
+    async def refund(self, key, cost, capacity):
+        await self._refund_script(keys=[self.prefix + key], args=[cost, capacity])
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    return InMemoryBackend()
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Token-bucket rate limiting keyed by client IP, and also by user for
+    authenticated requests. Every client refills at RATE_LIMIT_RATE tokens
+    per second up to RATE_LIMIT_BURST; each request costs route_cost tokens.
+    An IP's bucket is RATE_LIMIT_IP_MULTIPLIER times larger so several users
+    behind one NAT are not throttled as one, while a single IP still can't
+    farm accounts to multiply its budget.
+    """
+
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None):
+        super().__init__(app)
+        self.backend = backend or create_backend()
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if path in EXEMPT_PATHS or request.method == "OPTIONS":
+            return await call_next(request)
+
+        cost = route_cost(request.method, path)
+        rate, capacity = settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST
+        multiplier = settings.RATE_LIMIT_IP_MULTIPLIER
+
+        # The shared IP bucket goes first, and is refunded if the user's own
+        # bucket then refuses, so neither side pays for a rejected request
+        user = self._user_key(request)
+        ip_key = f"ip:{self._client_ip(request)}"
+        ip_rate, ip_capacity = (rate * multiplier, capacity * multiplier) if user else (rate, capacity)
+        allowed, retry_after = await self.backend.consume(ip_key, cost, ip_rate, ip_capacity)
+        if not allowed:
+            return self._limited(retry_after)
+
+        if user is not None:
+            allowed, retry_after = await self.backend.consume(f"user:{user}", cost, rate, capacity)
+            if not allowed:
+                await self.backend.refund(ip_key, cost, ip_capacity)
+                return self._limited(retry_after)
+
+        return await call_next(request)
+
+    @staticmethod
+    def _client_ip(request: Request) -> str:
+        if settings.RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    @staticmethod
+    def _user_key(request: Request) -> Optional[str]:
+        authorization = request.headers.get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            return None
+        # Signature check only; an invalid token falls back to the IP bucket
+        return AuthUtils.decode_access_token(authorization[7:])
+
+    @staticmethod
+    def _limited(retry_after: float) -> JSONResponse:
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
@@ -0,0 +1,230 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.job_lease import JobLease
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A periodic job registered with the scheduler"""
+
+    def __init__(self, name: str, func: Callable[[Session], Optional[int]], interval: float, singleton: bool):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.singleton = singleton
+        # Spread the first run so workers started together don't collide
+        self.next_run = time.monotonic() + random.uniform(0, min(interval, 30) * 0.2)
+        self.metrics = {
+            "runs": 0,
+            "failures": 0,
+            "skipped": 0,
+            "last_run_at": None,
+            "last_duration_ms": None,
+            "last_result": None,
+            "last_error": None,
+        }
+
+class Scheduler:
+    """
+    In-process periodic job scheduler.
+
+    Each worker runs its own scheduler thread. Jobs registered as singleton
+    only run in the worker currently holding the job's lease row in
+    `job_leases`, so a multi-worker deployment runs them once per interval.
+    """
+
+    def __init__(self):
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs: List[Job] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[Session], Optional[int]],
+        interval: float,
+        singleton: bool = True
+    ) -> Job:
+        """Register a job; func receives a session and may return a row count"""
+        job = Job(name, func, interval, singleton)
+        self._jobs.append(job)
+        return job
+
+    def job(self, name: str, interval: float, singleton: bool = True):
+        """Decorator form of add_job"""
+        def decorator(func):
+            self.add_job(name, func, interval, singleton)
+            return func
+        return decorator
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-job metrics observed by this worker"""
+        return {job.name: dict(job.metrics, interval=job.interval) for job in self._jobs}
+
+    def run_pending(self):
+        """Run every job that is due; returns seconds until the next one"""
+        now = time.monotonic()
+        for job in self._jobs:
+            if job.next_run <= now:
+                self.run_job(job)
+                job.next_run = time.monotonic() + job.interval
+        if not self._jobs:
+            return 1.0
+        return max(0.0, min(job.next_run for job in self._jobs) - time.monotonic())
+
+    def run_job(self, job: Job):
+        db = SessionLocal()
+        try:
+            if job.singleton and not self._acquire_lease(db, job):
+                job.metrics["skipped"] += 1
+                return
+
+            started_at = datetime.utcnow()
+            start = time.perf_counter()
+            error = None
+            result = None
+            done = threading.Event()
+            keeper = None
+            if job.singleton:
+                keeper = threading.Thread(
+                    target=self._hold_lease, args=(job, done), name=f"lease-{job.name}", daemon=True
+                )
+                keeper.start()
+            try:
+                result = job.func(db)
+            except Exception as e:
+                db.rollback()
+                error = repr(e)
+                logger.exception("Scheduled job %s failed", job.name)
+            finally:
+                done.set()
+                if keeper:
+                    keeper.join()
+            duration_ms = (time.perf_counter() - start) * 1000
+
+            metrics = job.metrics
+            metrics["runs"] += 1
+            metrics["last_run_at"] = started_at
+            metrics["last_duration_ms"] = duration_ms
+            metrics["last_result"] = result
+            metrics["last_error"] = error
+            if error:
+                metrics["failures"] += 1
+
+            if job.singleton:
+                self._record_run(db, job, started_at, duration_ms, result, error)
+        finally:
+            db.close()
+
+    def _acquire_lease(self, db: Session, job: Job) -> bool:
+        """Take or renew the job's lease; False if another worker holds it"""
+        now = datetime.utcnow()
+        # Leases last slightly less than one interval, so the job moves to
+        # another worker within an interval of its holder dying. A run that
+        # takes longer is covered by _hold_lease renewing it meanwhile.
+        lease_until = self._lease_until(job, now)
+        acquired = db.query(JobLease).filter(
+            JobLease.name == job.name,
+            or_(
+                JobLease.lease_until.is_(None),
+                JobLease.lease_until < now,
+                JobLease.owner == self.owner_id
+            )
+        ).update(
+            {JobLease.owner: self.owner_id, JobLease.lease_until: lease_until},
+            synchronize_session=False
+        )
+        if acquired:
+            db.commit()
+            return True
+
+        if db.query(JobLease.name).filter(JobLease.name == job.name).first():
+            db.rollback()
+            return False
+
+        db.add(JobLease(name=job.name, owner=self.owner_id, lease_until=lease_until))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker created the row first and owns the lease
+            db.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def _lease_until(job: Job, now: datetime) -> datetime:
+        return now + timedelta(seconds=job.interval * 0.9)
+
+    def _hold_lease(self, job: Job, done: threading.Event):
+        """Renew the job's lease until done is set, so a long run isn't started again elsewhere"""
+        while not done.wait(job.interval * 0.3):
+            db = SessionLocal()
+            try:
+                renewed = db.query(JobLease).filter(
+                    JobLease.name == job.name,
+                    JobLease.owner == self.owner_id
+                ).update(
+                    {JobLease.lease_until: self._lease_until(job, datetime.utcnow())},
+                    synchronize_session=False
+                )
+                db.commit()
+                if not renewed:
+                    logger.warning("Lost the lease on job %s while it was running", job.name)
+            except Exception:
+                db.rollback()
+                logger.exception("Could not renew the lease on job %s", job.name)
+            finally:
+                db.close()
+
+    def _record_run(self, db: Session, job: Job, started_at, duration_ms, result, error):
+        # Also restart the lease from the end of the run, which may have
+        # outlasted the one taken at its start
+        db.query(JobLease).filter(
+            JobLease.name == job.name,
+            JobLease.owner == self.owner_id
+        ).update({
+            JobLease.lease_until: self._lease_until(job, datetime.utcnow()),
+            JobLease.run_count: JobLease.run_count + 1,
+            JobLease.failure_count: JobLease.failure_count + (1 if error else 0),
+            JobLease.last_started_at: started_at,
+            JobLease.last_duration_ms: duration_ms,
+            JobLease.last_result: result,
+            JobLease.last_error: error,
+        }, synchronize_session=False)
+        db.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.run_pending()
+            except Exception:
+                logger.exception("Scheduler loop error")
+                delay = 1.0
+            self._stop.wait(min(max(delay, 0.05), 5.0))
+
+scheduler = Scheduler()
@@ -0,0 +1,168 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# (id, user_id, property_type value, min_price, max_price, city key, country key,
+#  latitude, longitude, radius_km); None means the search doesn't constrain it
+Search = Tuple[int, int, Optional[str], Optional[float], Optional[float], Optional[str], Optional[str],
+               Optional[float], Optional[float], Optional[float]]
+
+# (property_type value, price, city key, country key, latitude, longitude) of a listing
+Listing = Tuple[str, float, str, str, float, float]
+
+EARTH_RADIUS_KM = 6371.0
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class IntervalTree:
+    """
+    Static centered interval tree answering "which intervals contain x" in
+    O(log n + k). Each node keeps the intervals spanning its centre sorted by
+    low end and by high end, so a query only reads the ones that match.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, int]]):
+        self._root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(
+            point for lo, hi, _ in intervals for point in (lo, hi) if math.isfinite(point)
+        )
+        center = endpoints[len(endpoints) // 2] if endpoints else 0.0
+        left, right, spanning = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                spanning.append(interval)
+        by_lo = sorted(spanning, key=lambda interval: interval[0])
+        by_hi = sorted(spanning, key=lambda interval: -interval[1])
+        return (center, by_lo, by_hi, self._build(left), self._build(right))
+
+    def stab(self, x: float) -> List[int]:
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_lo, by_hi, left, right = node
+            if x < center:
+                for lo, _, item in by_lo:
+                    if lo > x:
+                        break
+                    found.append(item)
+                node = left
+            elif x > center:
+                for _, hi, item in by_hi:
+                    if hi < x:
+                        break
+                    found.append(item)
+                node = right
+            else:
+                found.extend(item for _, _, item in by_lo)
+                break
+        return found
+
+class SavedSearchIndex:
+    """
+    Percolator over saved searches: given a listing, find every search it
+    satisfies without evaluating each one.
+
+    Searches are partitioned by their equality predicates, property type and
+    city, with None as a wildcard, so a listing probes only the four
+    partitions (type, city), (type, *), (*, city) and (*, *). Each partition
+    holds its searches' price ranges in an interval tree, rebuilt lazily
+    after the partition changes, so finding the searches whose range contains
+    the listing's price is logarithmic. Only those are checked against the
+    remaining predicates (country substring, distance from a point).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._searches: Dict[int, Search] = {}
+        self._partitions: Dict[Tuple[Optional[str], Optional[str]], Set[int]] = defaultdict(set)
+        self._trees: Dict[Tuple[Optional[str], Optional[str]], IntervalTree] = {}
+        self.max_id = 0
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+    def build(self, searches: Iterable[Search]) -> None:
+        with self._lock:
+            self._searches.clear()
+            self._partitions.clear()
+            self._trees.clear()
+            self.max_id = 0
+            for search in searches:
+                self.add(search)
+            self.built = True
+
+    def add(self, search: Search) -> None:
+        with self._lock:
+            if search[0] in self._searches:
+                self.remove(search[0])
+            self._searches[search[0]] = search
+            partition = (search[2], search[5])
+            self._partitions[partition].add(search[0])
+            self._trees.pop(partition, None)
+            self.max_id = max(self.max_id, search[0])
+
+    def remove(self, search_id: int) -> None:
+        with self._lock:
+            search = self._searches.pop(search_id, None)
+            if search is None:
+                return
+            partition = (search[2], search[5])
+            self._partitions[partition].discard(search_id)
+            if not self._partitions[partition]:
+                del self._partitions[partition]
+            self._trees.pop(partition, None)
+
+    def match(self, listing: Listing) -> List[Search]:
+        """Every indexed search the listing satisfies"""
+        property_type, price, city_key, country_key, latitude, longitude = listing
+        matches = []
+        with self._lock:
+            for partition in ((property_type, city_key), (property_type, None), (None, city_key), (None, None)):
+                if partition not in self._partitions:
+                    continue
+                for search_id in self._tree(partition).stab(price):
+                    search = self._searches[search_id]
+                    if self._residual_match(search, country_key, latitude, longitude):
+                        matches.append(search)
+        return matches
+
+    def _tree(self, partition) -> IntervalTree:
+        tree = self._trees.get(partition)
+        if tree is None:
+            tree = IntervalTree(
+                (
+                    -math.inf if search[3] is None else search[3],
+                    math.inf if search[4] is None else search[4],
+                    search[0]
+                )
+                for search in (self._searches[i] for i in self._partitions[partition])
+            )
+            self._trees[partition] = tree
+        return tree
+
+    @staticmethod
+    def _residual_match(search: Search, country_key: str, latitude: float, longitude: float) -> bool:
+        country, lat, lng, radius_km = search[6], search[7], search[8], search[9]
+        if country is not None and country not in country_key:
+            return False
+        if radius_km is not None and distance_km(lat, lng, latitude, longitude) > radius_km:
+            return False
+        return True
+
+saved_search_index = SavedSearchIndex()
@@ -0,0 +1,207 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+PROPERTY_TYPES = ["apartment", "house", "villa", "studio", "shop"]
+
+# (id, price, bedrooms, bathrooms, area, property_type value, latitude, longitude)
+Record = Tuple[int, float, int, int, Optional[float], str, float, float]
+
+# Column layout of the feature matrix
+LOG_PRICE, BEDROOMS, BATHROOMS, LOG_AREA = 0, 1, 2, 3
+TYPE_START = 4
+NORTH_KM = TYPE_START + len(PROPERTY_TYPES)
+EAST_KM = NORTH_KM + 1
+N_FEATURES = EAST_KM + 1
+
+KM_PER_DEGREE = 111.32
+
+class SimilarityIndex:
+    """
+    In-memory nearest-neighbour index over property features.
+
+    Rows of a float32 matrix hold one property each: log price, bedrooms,
+    bathrooms and log area (z-scored against the catalogue at build time),
+    a one-hot property type, and position in km. Queries are pre-filtered to
+    a square of grid cells around the subject so only nearby rows are scored,
+    widening the square until enough candidates are found.
+    """
+
+    def __init__(
+        self,
+        cell_degrees: float = 0.1,
+        geo_scale_km: float = 10.0,
+        weights: Optional[Dict[int, float]] = None,
+        max_rings: int = 8
+    ):
+        self.cell_degrees = cell_degrees
+        self.geo_scale_km = geo_scale_km
+        self.max_rings = max_rings
+        self.weights = np.ones(N_FEATURES, dtype=np.float32)
+        self.weights[LOG_PRICE] = 2.0
+        self.weights[BATHROOMS] = 0.5
+        self.weights[TYPE_START:NORTH_KM] = 1.5
+        for column, weight in (weights or {}).items():
+            self.weights[column] = weight
+
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._cell_of_row: Dict[int, Tuple[int, int]] = {}
+        self._cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._free: List[int] = []
+        self._mean = np.zeros(LOG_AREA + 1, dtype=np.float32)
+        self._std = np.ones(LOG_AREA + 1, dtype=np.float32)
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def build(self, records: Iterable[Record]) -> None:
+        """Replace the index contents with records, recomputing normalization"""
+        records = list(records)
+        raw = np.array([self._raw_numeric(r) for r in records], dtype=np.float64).reshape(-1, LOG_AREA + 1)
+        if len(records):
+            # Missing areas are NaN; they take the mean, i.e. 0 after scaling
+            mean = np.nanmean(raw, axis=0)
+            std = np.nanstd(raw, axis=0)
+            mean = np.where(np.isnan(mean), 0.0, mean)
+            std = np.where(np.isnan(std) | (std < 1e-6), 1.0, std)
+        else:
+            mean = np.zeros(LOG_AREA + 1)
+            std = np.ones(LOG_AREA + 1)
+
+        with self._lock:
+            self._mean = mean.astype(np.float32)
+            self._std = std.astype(np.float32)
+            capacity = max(1024, len(records) * 5 // 4)
+            self._matrix = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+            self._ids = np.full(capacity, -1, dtype=np.int64)
+            self._size = 0
+            self._row_of = {}
+            self._cell_of_row = {}
+            self._cells = defaultdict(set)
+            self._free = []
+            for record in records:
+                self._insert(record)
+            self.built = True
+
+    def upsert(self, record: Record) -> None:
+        """Add or refresh one property"""
+        with self._lock:
+            if record[0] in self._row_of:
+                self._delete(record[0])
+            self._insert(record)
+
+    def remove(self, property_id: int) -> None:
+        """Drop one property if present"""
+        with self._lock:
+            if property_id in self._row_of:
+                self._delete(property_id)
+
+    def query(self, property_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """Return up to k (property_id, distance) pairs most similar to property_id"""
+        with self._lock:
+            row = self._row_of.get(property_id)
+            if row is None:
+                return []
+            target = self._matrix[row].copy()
+            cx, cy = self._cell_of_row[row]
+
+            # Widen the square of cells until there are enough candidates. It
+            # starts 3x3 so neighbours just across a cell edge are never missed.
+            candidates: List[int] = []
+            for ring in range(1, self.max_rings + 1):
+                candidates = []
+                for x in range(cx - ring, cx + ring + 1):
+                    for y in range(cy - ring, cy + ring + 1):
+                        cell = self._cells.get((x, y))
+                        if cell:
+                            candidates.extend(cell)
+                if len(candidates) > k * 4:
+                    break
+
+            rows = np.fromiter((r for r in candidates if r != row), dtype=np.int64)
+            if not len(rows):
+                return []
+            diff = self._matrix[rows] - target
+            ids = self._ids[rows]
+
+        distances = np.sqrt((diff * diff) @ self.weights)
+        if len(distances) > k:
+            top = np.argpartition(distances, k)[:k]
+        else:
+            top = np.arange(len(distances))
+        top = top[np.lexsort((ids[top], distances[top]))]
+        return [(int(ids[i]), float(distances[i])) for i in top]
+
+    def _raw_numeric(self, record: Record) -> List[float]:
+        _, price, bedrooms, bathrooms, area, _, _, _ = record
+        return [
+            math.log1p(max(price or 0.0, 0.0)),
+            float(bedrooms or 0),
+            float(bathrooms or 0),
+            math.log1p(area) if area else float("nan"),
+        ]
+
+    def _features(self, record: Record) -> np.ndarray:
+        vector = np.zeros(N_FEATURES, dtype=np.float32)
+        numeric = np.array(self._raw_numeric(record), dtype=np.float32)
+        numeric = (numeric - self._mean) / self._std
+        vector[:LOG_AREA + 1] = np.nan_to_num(numeric, nan=0.0)
+        property_type = record[5]
+        if property_type in PROPERTY_TYPES:
+            vector[TYPE_START + PROPERTY_TYPES.index(property_type)] = 1.0
+        latitude, longitude = record[6], record[7]
+        vector[NORTH_KM] = latitude * KM_PER_DEGREE / self.geo_scale_km
+        vector[EAST_KM] = longitude * KM_PER_DEGREE * math.cos(math.radians(latitude)) / self.geo_scale_km
+        return vector
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (int(math.floor(latitude / self.cell_degrees)), int(math.floor(longitude / self.cell_degrees)))
+
+    def _insert(self, record: Record) -> None:
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self._size == len(self._matrix):
+                self._grow()
+            row = self._size
+            self._size += 1
+        self._matrix[row] = self._features(record)
+        self._ids[row] = record[0]
+        cell = self._cell(record[6], record[7])
+        self._row_of[record[0]] = row
+        self._cell_of_row[row] = cell
+        self._cells[cell].add(row)
+
+    def _delete(self, property_id: int) -> None:
+        row = self._row_of.pop(property_id)
+        cell = self._cell_of_row.pop(row)
+        self._cells[cell].discard(row)
+        if not self._cells[cell]:
+            del self._cells[cell]
+        self._ids[row] = -1
+        self._free.append(row)
+
+    def _grow(self) -> None:
+        capacity = max(1024, len(self._matrix) * 2)
+        matrix = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+def to_record(prop) -> Record:
+    """Build an index record from a Property model instance"""
+    property_type = prop.property_type.value if hasattr(prop.property_type, "value") else prop.property_type
+    return (
+        prop.id, prop.price, prop.bedrooms, prop.bathrooms, prop.area,
+        property_type, prop.latitude, prop.longitude
+    )
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,67 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads in this worker: the first request
+    for a key runs the loader in the threadpool, and requests arriving while
+    it is in flight await the same result instead of repeating the queries.
+    Nothing is kept once the flight lands, so this only flattens bursts (a
+    viral listing whose cache entry was just invalidated); the entity cache
+    still serves the steady state.
+
+    Keys are (route name, *params): callers add the entity's cache version,
+    so a read starting after a write commits never joins a flight that
+    began before it, and the user id wherever the result depends on who asks.
+    A loader must open its own session, since the request that started the
+    flight may be cancelled while others still wait on it.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Only touched from the event loop, so no locking
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        )
+
+    async def run(self, key: Optional[Tuple[Hashable, ...]], loader: Callable[[], Any]) -> Any:
+        """loader()'s result, shared with concurrent calls for the same key; None key never shares"""
+        if not self.enabled or key is None:
+            return await run_in_threadpool(loader)
+
+        stats = self._stats[key[0]]
+        stats["requests"] += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            stats["executions"] += 1
+            flight = asyncio.ensure_future(run_in_threadpool(loader))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            stats["coalesced"] += 1
+        # Shielded: a caller that goes away must not cancel everyone's load
+        return await asyncio.shield(flight)
+
+    def stats(self) -> dict:
+        routes = {name: dict(counts) for name, counts in self._stats.items()}
+        for counts in routes.values():
+            counts["coalesced_ratio"] = (
+                round(counts["coalesced"] / counts["requests"], 4) if counts["requests"] else None
+            )
+        return {"enabled": self.enabled, "in_flight": len(self._flights), "routes": routes}
+
+    def reset_stats(self) -> None:
+        self._stats.clear()
+
+    def _land(self, key: Tuple[Hashable, ...], flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled() and flight.exception() is not None:
+            # Also marks the exception retrieved if every waiter had gone
+            self._stats[key[0]]["errors"] += 1
+
+single_flight = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
@@ -0,0 +1,86 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import Table, func
+from sqlalchemy.orm import Session
+
+def upsert_increment(
+    db: Session,
+    table: Table,
+    rows: List[Dict],
+    key_columns: Iterable[str],
+    increment_columns: Iterable[str],
+    replace_columns: Iterable[str] = (),
+    min_columns: Iterable[str] = (),
+    max_columns: Iterable[str] = ()
+) -> None:
+    """
+    Insert rows, or add their increment_columns onto existing rows with the
+    same key, in a single batched statement. On conflict replace_columns are
+    overwritten with the new value, and min_columns/max_columns keep the
+    lesser/greater of the old and new values.
+    """
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # SQLite's scalar min()/max() are its LEAST/GREATEST
+        least, greatest = func.min, func.max
+    else:
+        least, greatest = func.least, func.greatest
+
+    def conflict_values(new):
+        values = {col: table.c[col] + new[col] for col in increment_columns}
+        values.update({col: new[col] for col in replace_columns})
+        values.update({
+            col: func.coalesce(least(table.c[col], new[col]), new[col]) for col in min_columns
+        })
+        values.update({
+            col: func.coalesce(greatest(table.c[col], new[col]), new[col]) for col in max_columns
+        })
+        return values
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(conflict_values(stmt.inserted))
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns), set_=conflict_values(stmt.excluded)
+        )
+
+    db.execute(stmt, rows)
+
+def insert_ignore(db: Session, table: Table, rows: List[Dict], key_columns: Iterable[str]) -> None:
+    """Insert rows, silently skipping any whose key_columns already exist"""
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        # A no-op assignment rather than INSERT IGNORE, which would also
+        # swallow truncation and foreign key errors
+        column = table.c[next(iter(key_columns))]
+        stmt = insert(table).on_duplicate_key_update({column.name: column})
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).on_conflict_do_nothing(index_elements=list(key_columns))
+
+    db.execute(stmt, rows)
+
+def lock_rollup(db: Session, name: str) -> None:
+    """
+    Lock a rollup's row in rollup_locks until db's transaction ends, so
+    incremental updates and full rebuilds of that rollup run one at a time
+    """
+    from app.models.rollup_lock import RollupLock
+    insert_ignore(db, RollupLock.__table__, [{"name": name}], ["name"])
+    db.query(RollupLock.name).filter(RollupLock.name == name).with_for_update().one()
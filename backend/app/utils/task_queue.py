@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.background_task import BackgroundTask, PENDING, RUNNING, DONE, FAILED
+from app.utils.sql import insert_ignore
+
+logger = logging.getLogger(__name__)
+
+# (id, name, payload, attempts, max_attempts) of a task this worker has leased
+Claimed = Tuple[int, str, Dict[str, Any], int, int]
+
+class TaskQueue:
+    """
+    Durable background tasks kept in the `tasks` table.
+
+    enqueue() only adds a row to the caller's session, so a task exists if
+    and only if the write that produced it commits (a transactional outbox).
+    Each app process runs a few asyncio workers that lease due rows, run the
+    handler in a thread and retry failures with exponential backoff. A
+    handler's writes commit together with the row being marked done, and
+    only while this worker still holds the lease, so a task's effects apply
+    once even when a worker dies mid-run and the task is picked up again.
+    """
+
+    def __init__(self):
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Callable[..., None]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = False
+        self.metrics = {"succeeded": 0, "retried": 0, "failed": 0, "lost_leases": 0, "last_error": None}
+
+    def task(self, name: str):
+        """Register a handler; it receives a session plus the payload and must not commit"""
+        def decorator(func):
+            self._handlers[name] = func
+            return func
+        return decorator
+
+    def enqueue(
+        self,
+        db: Session,
+        name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        delay: float = 0.0,
+        max_attempts: Optional[int] = None
+    ) -> None:
+        """Add a task to db's transaction (caller commits); a known idempotency_key is skipped"""
+        now = datetime.utcnow()
+        row = {
+            "name": name,
+            "payload": json.dumps(payload or {}),
+            "idempotency_key": idempotency_key,
+            "status": PENDING,
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.TASK_MAX_ATTEMPTS,
+            "run_after": now + timedelta(seconds=delay),
+            "created_at": now,
+        }
+        if idempotency_key is None:
+            db.execute(BackgroundTask.__table__.insert(), [row])
+        else:
+            insert_ignore(db, BackgroundTask.__table__, [row], ["idempotency_key"])
+        db.info["tasks_enqueued"] = True
+
+    def notify(self) -> None:
+        """Wake this process's idle workers (called after a commit that enqueued)"""
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                # The loop already closed during shutdown
+                pass
+
+    async def start(self, concurrency: int) -> None:
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._running = True
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"task-worker-{i}") for i in range(concurrency)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let in-flight tasks finish; anything cut off is retried once its lease expires"""
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        await asyncio.wait(self._workers, timeout=timeout)
+        self._workers = []
+        self._loop = None
+
+    def stats(self, db: Session) -> dict:
+        """Queue depth by status across all workers, plus this worker's counters"""
+        counts = dict(
+            db.query(BackgroundTask.status, func.count(BackgroundTask.id)).group_by(BackgroundTask.status).all()
+        )
+        oldest = db.query(func.min(BackgroundTask.run_after)).filter(
+            BackgroundTask.status == PENDING,
+            BackgroundTask.run_after <= datetime.utcnow()
+        ).scalar()
+        return {
+            "worker": self.owner_id,
+            "workers": len(self._workers),
+            "handlers": sorted(self._handlers),
+            "queued": {status: counts.get(status, 0) for status in (PENDING, RUNNING, DONE, FAILED)},
+            "oldest_due_at": oldest,
+            "local": dict(self.metrics),
+        }
+
+    def retry(self, db: Session, task_id: int) -> bool:
+        """Give a failed task a fresh set of attempts; False unless it had failed"""
+        retried = db.query(BackgroundTask).filter(
+            BackgroundTask.id == task_id,
+            BackgroundTask.status == FAILED
+        ).update({
+            BackgroundTask.status: PENDING,
+            BackgroundTask.attempts: 0,
+            BackgroundTask.run_after: datetime.utcnow(),
+            BackgroundTask.finished_at: None,
+        }, synchronize_session=False)
+        db.info["tasks_enqueued"] = True
+        db.commit()
+        return bool(retried)
+
+    def prune(self, db: Session, retention_hours: float, batch_size: int = 1000) -> int:
+        """Delete done tasks older than the retention, freeing their idempotency keys"""
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+        deleted = 0
+        while True:
+            ids = [row.id for row in db.query(BackgroundTask.id).filter(
+                BackgroundTask.status == DONE,
+                BackgroundTask.finished_at < cutoff
+            ).limit(batch_size)]
+            if not ids:
+                return deleted
+            db.query(BackgroundTask).filter(BackgroundTask.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """Run due tasks in the calling thread until none are left; for scripts"""
+        ran = 0
+        while limit is None or ran < limit:
+            claimed = self._claim()
+            if claimed is None:
+                return ran
+            self._execute(claimed)
+            ran += 1
+        return ran
+
+    async def _work(self) -> None:
+        while self._running:
+            # Cleared before claiming so a notify() arriving meanwhile isn't lost
+            self._wake.clear()
+            try:
+                claimed = await asyncio.to_thread(self._claim)
+            except Exception:
+                logger.exception("Task queue claim failed")
+                claimed = None
+
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.TASK_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.to_thread(self._execute, claimed)
+
+    def _claim(self) -> Optional[Claimed]:
+        """Lease the next due task, or None when nothing is due"""
+        db = SessionLocal()
+        try:
+            while True:
+                now = datetime.utcnow()
+                row = db.query(BackgroundTask).filter(
+                    or_(
+                        and_(BackgroundTask.status == PENDING, BackgroundTask.run_after <= now),
+                        # A worker died (or hung) holding it
+                        and_(BackgroundTask.status == RUNNING, BackgroundTask.locked_until < now)
+                    )
+                ).order_by(BackgroundTask.run_after, BackgroundTask.id).with_for_update(skip_locked=True).first()
+                if row is None:
+                    db.rollback()
+                    return None
+
+                claimed = (row.id, row.name, json.loads(row.payload), row.attempts + 1, row.max_attempts)
+                if row.status == RUNNING and row.attempts >= row.max_attempts:
+                    values = {
+                        BackgroundTask.status: FAILED,
+                        BackgroundTask.locked_until: None,
+                        BackgroundTask.finished_at: now,
+                        BackgroundTask.last_error: "Lease expired on the final attempt",
+                    }
+                else:
+                    values = {
+                        BackgroundTask.status: RUNNING,
+                        BackgroundTask.attempts: row.attempts + 1,
+                        BackgroundTask.locked_by: self.owner_id,
+                        BackgroundTask.locked_until: now + timedelta(seconds=settings.TASK_LEASE_SECONDS),
+                    }
+                # Compare-and-swap on attempts, so two workers can't both take
+                # the row on databases without SKIP LOCKED
+                taken = db.query(BackgroundTask).filter(
+                    BackgroundTask.id == row.id,
+                    BackgroundTask.attempts == row.attempts
+                ).update(values, synchronize_session=False)
+                db.commit()
+                if taken and values[BackgroundTask.status] == RUNNING:
+                    return claimed
+                db.expire_all()
+        finally:
+            db.close()
+
+    def supersede(self, db: Session, name: str, batch_size: int = 1000) -> int:
+        """
+        Mark name's unfinished tasks done without running them (caller
+        commits), for a rebuild whose snapshot already reflects their writes.
+        Call it before the rebuild reads anything, so under repeatable read
+        the tasks it sees are exactly those whose writes the snapshot holds.
+        A superseded task that is mid-run loses its lease and rolls back.
+        """
+        task_ids = [row.id for row in db.query(BackgroundTask.id).filter(
+            BackgroundTask.name == name,
+            BackgroundTask.status.in_((PENDING, RUNNING))
+        )]
+        now = datetime.utcnow()
+        for start in range(0, len(task_ids), batch_size):
+            db.query(BackgroundTask).filter(
+                BackgroundTask.id.in_(task_ids[start:start + batch_size]),
+                BackgroundTask.status.in_((PENDING, RUNNING))
+            ).update({
+                BackgroundTask.status: DONE,
+                BackgroundTask.locked_until: None,
+                BackgroundTask.finished_at: now,
+            }, synchronize_session=False)
+        return len(task_ids)
+
+    def _execute(self, claimed: Claimed) -> None:
+        task_id, name, payload, attempts, max_attempts = claimed
+        db = SessionLocal()
+        try:
+            try:
+                handler = self._handlers.get(name)
+                if handler is None:
+                    raise LookupError(f"No handler registered for task {name!r}")
+                handler(db, **payload)
+                finished = self._leased(db, task_id, attempts).update({
+                    BackgroundTask.status: DONE,
+                    BackgroundTask.locked_until: None,
+                    BackgroundTask.finished_at: datetime.utcnow(),
+                    BackgroundTask.last_error: None,
+                }, synchronize_session=False)
+                if not finished:
+                    # The lease ran out and another worker took the task over;
+                    # its run is the one that counts
+                    db.rollback()
+                    self.metrics["lost_leases"] += 1
+                    return
+                db.commit()
+                self.metrics["succeeded"] += 1
+            except Exception as e:
+                db.rollback()
+                logger.exception("Task %s (%s) failed on attempt %d", task_id, name, attempts)
+                self._record_failure(db, task_id, attempts, max_attempts, repr(e))
+        finally:
+            db.close()
+
+    def _record_failure(self, db: Session, task_id: int, attempts: int, max_attempts: int, error: str) -> None:
+        now = datetime.utcnow()
+        if attempts >= max_attempts:
+            values = {BackgroundTask.status: FAILED, BackgroundTask.finished_at: now}
+            self.metrics["failed"] += 1
+        else:
+            values = {BackgroundTask.status: PENDING, BackgroundTask.run_after: now + self._backoff(attempts)}
+            self.metrics["retried"] += 1
+        values.update({BackgroundTask.locked_until: None, BackgroundTask.last_error: error})
+        self.metrics["last_error"] = error
+        self._leased(db, task_id, attempts).update(values, synchronize_session=False)
+        db.commit()
+
+    def _leased(self, db: Session, task_id: int, attempts: int):
+        """The task's row, only while this worker's lease on this attempt still stands"""
+        return db.query(BackgroundTask).filter(
+            BackgroundTask.id == task_id,
+            BackgroundTask.status == RUNNING,
+            BackgroundTask.locked_by == self.owner_id,
+            BackgroundTask.attempts == attempts
+        )
+
+    @staticmethod
+    def _backoff(attempts: int) -> timedelta:
+        """Exponential backoff with jitter, so failing tasks don't retry in lockstep"""
+        delay = min(settings.TASK_BACKOFF_MAX_SECONDS, settings.TASK_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+task_queue = TaskQueue()
+
+@event.listens_for(Session, "after_commit")
+def _notify_workers(session: Session) -> None:
+    if session.info.pop("tasks_enqueued", False):
+        task_queue.notify()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enqueued(session: Session) -> None:
+    session.info.pop("tasks_enqueued", None)
@@ -0,0 +1,173 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlencode
+from app.config import settings
+from app.utils.auth import AuthUtils
+
+logger = logging.getLogger(__name__)
+
+# Query parameters never written to a capture
+SENSITIVE_PARAMS = {"token", "access_token", "password", "email", "code"}
+MAX_PARAM_LENGTH = 100
+
+def user_hash(email: str) -> str:
+    """Stable pseudonym for a user: keyed, so captures can't be matched back to emails"""
+    return hmac.new(settings.SECRET_KEY.encode(), email.lower().encode(), hashlib.sha256).hexdigest()[:16]
+
+def sanitize_query(query_string: bytes) -> str:
+    params = [
+        (key, value[:MAX_PARAM_LENGTH])
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+        if key.lower() not in SENSITIVE_PARAMS
+    ]
+    return urlencode(params)
+
+class TrafficRecorder:
+    """
+    Append-only JSON-lines capture of request metadata, one short-keyed
+    object per request:
+
+        t  start time (epoch seconds)     m  method
+        r  route template                 p  path as requested
+        q  sanitized query string         u  hashed user, or null
+        s  status code                    d  duration in ms
+        b  request body size in bytes
+
+    Request and response bodies, headers and raw user ids are never kept.
+    Records are buffered and appended by a background thread, every
+    flush_every records or flush_interval seconds, so a slow disk never
+    stalls the event loop; capture stops once the file reaches max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int, flush_every: int = 200, flush_interval: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        # Serializes the writer thread with flushes at shutdown
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._full = False
+        self.recorded = 0
+        self.dropped = 0
+
+    def record(self, entry: dict) -> None:
+        if self._full:
+            return
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            if len(self._buffer) >= self.flush_every * 50:
+                # The writer has fallen far behind; shed records, not memory
+                self.dropped += 1
+                return
+            self._buffer.append(line)
+            self.recorded += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+                self._writer.start()
+            if len(self._buffer) >= self.flush_every:
+                self._wake.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if lines:
+                self._write(lines)
+
+    def _run(self) -> None:
+        while not self._full:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _write(self, lines: List[str]) -> None:
+        data = ("\n".join(lines) + "\n").encode()
+        try:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size + len(data) > self.max_bytes:
+                self._full = True
+                logger.warning("Traffic capture %s reached its size limit; capture stopped", self.path)
+                return
+            # One write call on an O_APPEND file, so workers sharing the
+            # file never interleave partial lines
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError:
+            logger.exception("Writing traffic capture %s failed", self.path)
+
+traffic_recorder = TrafficRecorder(
+    settings.TRAFFIC_CAPTURE_PATH, int(settings.TRAFFIC_CAPTURE_MAX_MB * 1024 * 1024)
+)
+
+class TrafficCaptureMiddleware:
+    """
+    Records a sample (TRAFFIC_CAPTURE_SAMPLE_RATE) of requests for
+    benchmarks/replay.py. Only installed when TRAFFIC_CAPTURE_ENABLED is set.
+    Plain ASGI so the route template FastAPI matched can be read off the
+    scope afterwards.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder = traffic_recorder):
+        self.app = app
+        self.recorder = recorder
+        self.sample_rate = settings.TRAFFIC_CAPTURE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+
+        started_at = time.time()
+        started = time.perf_counter()
+        status_code = [500]
+        body_size = [0]
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                body_size[0] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.recorder.record({
+                "t": round(started_at, 3),
+                "m": scope["method"],
+                "r": getattr(route, "path", None),
+                "p": scope["path"],
+                "q": sanitize_query(scope.get("query_string", b"")),
+                "u": self._user(scope),
+                "s": status_code[0],
+                "d": round((time.perf_counter() - started) * 1000.0, 2),
+                "b": body_size[0],
+            })
+
+    @staticmethod
+    def _user(scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                value = value.decode("latin-1")
+                if value.lower().startswith("bearer "):
+                    email = AuthUtils.decode_access_token(value[7:])
+                    return user_hash(email) if email else None
+        return None
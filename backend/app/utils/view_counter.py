@@ -0,0 +1,47 @@
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+class ViewCounter:
+    """
+    Per-worker buffer of property views.
+
+    Views are counted in memory across a fixed number of lock-striped shards
+    so request threads rarely contend, and are drained periodically by
+    ViewController.flush_views into one batched upsert per table.
+    """
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Tuple[threading.Lock, Counter]] = [
+            (threading.Lock(), Counter()) for _ in range(shards)
+        ]
+
+    def record(self, property_id: int, count: int = 1) -> None:
+        """Count views of a property in the current hour"""
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        lock, counts = self._shards[property_id % len(self._shards)]
+        with lock:
+            counts[(property_id, hour)] += count
+
+    def drain(self) -> Dict[Tuple[int, datetime], int]:
+        """Take everything buffered so far, leaving the shards empty"""
+        drained: Counter = Counter()
+        for lock, counts in self._shards:
+            with lock:
+                drained.update(counts)
+                counts.clear()
+        return dict(drained)
+
+    def restore(self, pending: Dict[Tuple[int, datetime], int]) -> None:
+        """Put drained counts back after a failed flush so they are retried"""
+        for (property_id, hour), count in pending.items():
+            lock, counts = self._shards[property_id % len(self._shards)]
+            with lock:
+                counts[(property_id, hour)] += count
+
+    def pending(self) -> int:
+        """Number of buffered views not yet flushed"""
+        return sum(sum(counts.values()) for _, counts in self._shards)
+
+view_counter = ViewCounter()
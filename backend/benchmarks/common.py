@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmarks that drive the app in-process"""
+from typing import Iterable, Tuple
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    query_string: str = "",
+    headers: Iterable[Tuple[bytes, bytes]] = ()
+) -> int:
+    """Send one bodiless request straight to an ASGI app; returns the status code"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query_string.encode(),
+        "headers": [(b"host", b"bench"), *headers], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
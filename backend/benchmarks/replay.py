@@ -0,0 +1,340 @@
+"""
+Replay captured traffic (TRAFFIC_CAPTURE_ENABLED) and report latency per route.
+
+Requests are sent on the capture's own timeline, scaled by --speed (2 runs
+it twice as fast; 0 sends back to back, at most --concurrency at a time).
+By default the app is driven in-process against DATABASE_URL, which should
+be a local, migrated database; --seed-listings fills it with deterministic
+synthetic listings so captured ids resolve. With --url the requests go over
+HTTP to a running server instead.
+
+Captures hold no bodies, so only GET and HEAD requests are replayed. Each
+hashed user in the capture gets a local stand-in account, so authenticated
+routes see the same spread of callers.
+
+    python -m benchmarks.replay traffic.jsonl --seed-listings 5000
+    python -m benchmarks.replay traffic.jsonl --speed 4 --json replay.json
+    python -m benchmarks.replay traffic.jsonl --url http://localhost:8000 --speed 0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from benchmarks.common import asgi_request, percentile
+
+REPLAYED_METHODS = ("GET", "HEAD")
+REPLAY_PASSWORD = "replay-password"
+
+CITIES = [
+    ("Paris", "France", 48.8566, 2.3522), ("London", "United Kingdom", 51.5074, -0.1278),
+    ("New York", "United States", 40.7128, -74.0060), ("Berlin", "Germany", 52.5200, 13.4050),
+    ("Rome", "Italy", 41.9028, 12.4964), ("Madrid", "Spain", 40.4168, -3.7038),
+    ("Cairo", "Egypt", 30.0444, 31.2357), ("Algiers", "Algeria", 36.7538, 3.0588),
+    ("Casablanca", "Morocco", 33.5731, -7.5898), ("Dubai", "United Arab Emirates", 25.2048, 55.2708),
+    ("Tokyo", "Japan", 35.6762, 139.6503), ("Sydney", "Australia", -33.8688, 151.2093),
+]
+PROPERTY_TYPES = ["APARTMENT", "APARTMENT", "HOUSE", "STUDIO", "VILLA", "SHOP"]
+# Seeded listings are dated in the year before this, not before today
+SEED_EPOCH = datetime(2024, 1, 1)
+
+def load_capture(path: str):
+    """Captured requests in start order, and how many were skipped as writes"""
+    events, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry["m"] in REPLAYED_METHODS:
+                events.append(entry)
+            else:
+                skipped += 1
+    events.sort(key=lambda entry: entry["t"])
+    return events, skipped
+
+def replay_email(user: str) -> str:
+    return f"replay-{user}@replay.example.com"
+
+def seed_listings(count: int, seed: int) -> int:
+    """Top the database up to count listings owned by a replay account; returns how many were added"""
+    from app.controller.cluster_controller import ClusterController
+    from app.controller.duplicate_controller import DuplicateController
+    from app.controller.market_controller import MarketController
+    from app.database import SessionLocal
+    from app.models import User
+    from app.models.property import Property, PropertyType
+    from app.utils.auth import AuthUtils
+
+    db = SessionLocal()
+    try:
+        existing = db.query(Property.id).count()
+        if existing >= count:
+            return 0
+        owner = db.query(User).filter(User.email == replay_email("owner")).first()
+        if owner is None:
+            owner = User(
+                email=replay_email("owner"), username="replay-owner",
+                hashed_password=AuthUtils.get_password_hash(REPLAY_PASSWORD)
+            )
+            db.add(owner)
+            db.flush()
+
+        # Seeded and dated from a fixed epoch, so the same --seed-listings and
+        # --seed always produce the same catalogue on a fresh database
+        rng = random.Random(seed)
+        rows = []
+        for n in range(existing, count):
+            city, country, lat, lng = rng.choice(CITIES)
+            bedrooms = rng.choice([0, 1, 1, 2, 2, 2, 3, 3, 4, 5])
+            created = SEED_EPOCH - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            rows.append({
+                "title": f"Replay listing {n + 1}",
+                "description": "Synthetic listing for traffic replay",
+                "property_type": PropertyType[rng.choice(PROPERTY_TYPES)],
+                "price": round(rng.lognormvariate(7 + 0.3 * bedrooms, 0.35), 2),
+                "address": f"{rng.randrange(1, 200)} Replay Street",
+                "city": city,
+                "country": country,
+                "latitude": lat + rng.gauss(0, 0.05),
+                "longitude": lng + rng.gauss(0, 0.05),
+                "bedrooms": bedrooms,
+                "bathrooms": max(1, bedrooms - rng.choice([0, 1])),
+                "area": round(25 + bedrooms * 30 * rng.uniform(0.7, 1.4), 1),
+                "images": "[]",
+                "owner_id": owner.id,
+                "is_rented": False,
+                "review_count": 0,
+                "version": 1,
+                "created_at": created,
+                "updated_at": created,
+            })
+            if len(rows) == 1000:
+                db.execute(Property.__table__.insert(), rows)
+                rows = []
+        if rows:
+            db.execute(Property.__table__.insert(), rows)
+        db.commit()
+
+        # Raw inserts skip the tasks that maintain the derived tables, so
+        # rebuild them or the map, market and duplicate reads see nothing
+        ClusterController.rebuild(db)
+        MarketController.rebuild(db)
+        DuplicateController.reindex(db)
+        return count - existing
+    finally:
+        db.close()
+
+def local_tokens(users) -> dict:
+    """hashed user -> bearer token for a stand-in account in the local database"""
+    from app.database import SessionLocal
+    from app.models import User
+    from app.utils.auth import AuthUtils
+
+    db = SessionLocal()
+    try:
+        hashed_password = None
+        for user in users:
+            email = replay_email(user)
+            if db.query(User.id).filter(User.email == email).first() is None:
+                # bcrypt is slow; every stand-in shares one hash
+                hashed_password = hashed_password or AuthUtils.get_password_hash(REPLAY_PASSWORD)
+                db.add(User(email=email, username=f"replay-{user}", hashed_password=hashed_password))
+        db.commit()
+    finally:
+        db.close()
+    return {user: AuthUtils.create_access_token(data={"sub": replay_email(user)}) for user in users}
+
+def remote_tokens(base_url: str, users) -> dict:
+    """hashed user -> bearer token, signing stand-ins up on the server (or logging them in)"""
+    tokens = {}
+    for user in users:
+        email = replay_email(user)
+        for path, body in (
+            ("/api/auth/signup", {"email": email, "username": f"replay-{user}", "password": REPLAY_PASSWORD}),
+            ("/api/auth/login", {"email": email, "password": REPLAY_PASSWORD}),
+        ):
+            request = urllib.request.Request(
+                base_url + path, data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    tokens[user] = json.loads(response.read())["access_token"]
+                break
+            except urllib.error.HTTPError:
+                continue
+        else:
+            print(f"could not sign in a stand-in for user {user}; their requests go unauthenticated")
+    return tokens
+
+def in_process_sender():
+    from app.controller.similarity_controller import SimilarityController
+    from app.database import SessionLocal
+    from app.main import app
+
+    # The app's lifespan never runs in-process, and it would only build the
+    # similarity index in the background anyway: build it now so /similar
+    # replays as it was served rather than as 503s
+    db = SessionLocal()
+    try:
+        SimilarityController.rebuild(db)
+    finally:
+        db.close()
+
+    async def send(method, path, query, headers):
+        return await asgi_request(
+            app, method, path, query,
+            [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        )
+    return send
+
+def http_sender(base_url: str, concurrency: int):
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def call(method, path, query, headers):
+        url = base_url + path + (f"?{query}" if query else "")
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers, method=method), timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+        except (urllib.error.URLError, OSError):
+            return 0
+
+    async def send(method, path, query, headers):
+        return await asyncio.get_running_loop().run_in_executor(pool, call, method, path, query, headers)
+    return send
+
+async def replay(events, send, tokens: dict, speed: float, concurrency: int):
+    """(event, status, ms, lag ms) per request; lag is how late it started against the scaled schedule"""
+    gate = asyncio.Semaphore(concurrency)
+    results = []
+    loop = asyncio.get_running_loop()
+    await send(events[0]["m"], events[0]["p"], events[0].get("q", ""), {})  # warm the pool and imports
+    first = events[0]["t"]
+    start = loop.time()
+
+    async def one(event, due):
+        async with gate:
+            lag = max(0.0, loop.time() - due) * 1000.0 if speed > 0 else 0.0
+            headers = {"Authorization": f"Bearer {tokens[event['u']]}"} if event.get("u") in tokens else {}
+            began = time.perf_counter()
+            status = await send(event["m"], event["p"], event.get("q", ""), headers)
+            results.append((event, status, (time.perf_counter() - began) * 1000.0, lag))
+
+    tasks = []
+    for event in events:
+        due = start + (event["t"] - first) / speed if speed > 0 else start
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(event, due)))
+    await asyncio.gather(*tasks)
+    return results, loop.time() - start
+
+def summarize(results) -> dict:
+    routes = defaultdict(list)
+    for result in results:
+        event = result[0]
+        routes[f"{event['m']} {event.get('r') or event['p']}"].append(result)
+
+    def summary(rows):
+        latencies = [ms for _, _, ms, _ in rows]
+        captured = [event["d"] for event, _, _, _ in rows if event.get("d") is not None]
+        statuses = defaultdict(int)
+        for _, status, _, _ in rows:
+            statuses[str(status)] += 1
+        return {
+            "requests": len(rows),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p90_ms": round(percentile(latencies, 90), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+            "captured_p50_ms": round(percentile(captured, 50), 2) if captured else None,
+            "errors": sum(1 for _, status, _, _ in rows if status == 0 or status >= 500),
+            "max_lag_ms": round(max(lag for _, _, _, lag in rows), 2),
+            "statuses": dict(sorted(statuses.items())),
+        }
+
+    return {
+        "overall": summary(results),
+        "routes": {
+            name: summary(rows)
+            for name, rows in sorted(routes.items(), key=lambda item: -len(item[1]))
+        },
+    }
+
+def print_report(report: dict) -> None:
+    print(f"{'route':<52} {'n':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'capt p50':>9} {'5xx':>5}  statuses")
+    rows = list(report["routes"].items()) + [("all", report["overall"])]
+    for name, row in rows:
+        captured = f"{row['captured_p50_ms']:9.2f}" if row["captured_p50_ms"] is not None else f"{'-':>9}"
+        statuses = " ".join(f"{status}:{count}" for status, count in row["statuses"].items())
+        print(
+            f"{name[:52]:<52} {row['requests']:>6} {row['p50_ms']:8.2f} {row['p90_ms']:8.2f} "
+            f"{row['p99_ms']:8.2f} {row['max_ms']:8.2f} {captured} {row['errors']:>5}  {statuses}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("capture", help="capture file written by TrafficCaptureMiddleware")
+    parser.add_argument("--url", help="replay over HTTP against this server instead of in-process")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale; 0 sends as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=64, help="most requests in flight at once")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--seed-listings", type=int, default=0, help="top the local database up to N listings")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    if args.speed < 0:
+        parser.error("--speed must be 0 or more")
+
+    if not args.url:
+        # Set before the app is imported: don't capture the replay itself, and
+        # don't rate-limit traffic that came from many clients as if it were one
+        os.environ["TRAFFIC_CAPTURE_ENABLED"] = "false"
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    events, skipped = load_capture(args.capture)
+    if args.limit:
+        events = events[:args.limit]
+    if not events:
+        parser.error("the capture has no GET or HEAD requests to replay")
+
+    if args.seed_listings:
+        if args.url:
+            parser.error("--seed-listings seeds the local database; it can't be combined with --url")
+        print(f"seeded {seed_listings(args.seed_listings, args.seed)} listings")
+
+    users = sorted({event["u"] for event in events if event.get("u")})
+    tokens = remote_tokens(args.url.rstrip("/"), users) if args.url else local_tokens(users)
+    send = http_sender(args.url.rstrip("/"), args.concurrency) if args.url else in_process_sender()
+
+    span = events[-1]["t"] - events[0]["t"]
+    print(
+        f"replaying {len(events)} requests ({skipped} writes skipped) from {len(users)} users, "
+        f"captured over {span:.1f}s, at {'full speed' if args.speed == 0 else f'{args.speed:g}x'} "
+        f"{'against ' + args.url if args.url else 'in-process'}"
+    )
+    results, elapsed = asyncio.run(replay(events, send, tokens, args.speed, args.concurrency))
+    report = summarize(results)
+    report["elapsed_s"] = round(elapsed, 3)
+    report["requests_per_s"] = round(len(results) / elapsed, 1) if elapsed else None
+    print_report(report)
+    print(f"{len(results)} requests in {elapsed:.2f}s ({report['requests_per_s']} req/s)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark a thundering herd on GET /api/properties/{id}, with and without
+single-flight coalescing.
+
+Each wave invalidates the listing's cache entry, as a write to a viral
+listing would, then fires --concurrency simultaneous requests at the app
+in-process and counts the SQL statements they cause. Reads only: point
+DATABASE_URL at a migrated database holding at least one listing.
+
+    python -m benchmarks.thundering_herd --concurrency 200 --waves 20
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import event
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.property import Property
+from app.utils.cache import entity_cache
+from app.utils.single_flight import single_flight
+from benchmarks.common import asgi_request, percentile
+
+async def herd(path: str, concurrency: int):
+    async def timed():
+        start = time.perf_counter()
+        code = await asgi_request(app, "GET", path)
+        return code, (time.perf_counter() - start) * 1000
+    return await asyncio.gather(*(timed() for _ in range(concurrency)))
+
+async def run(property_id: int, concurrency: int, waves: int, coalesce: bool) -> None:
+    single_flight.enabled = coalesce
+    single_flight.reset_stats()
+    path = f"/api/properties/{property_id}"
+    await asgi_request(app, "GET", path)  # warm the pool and imports
+
+    statements = [0]
+    def count(*_):
+        statements[0] += 1
+    event.listen(engine, "before_cursor_execute", count)
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    try:
+        for _ in range(waves):
+            entity_cache.invalidate([entity_cache.key(Property, property_id)])
+            for code, ms in await herd(path, concurrency):
+                latencies.append(ms)
+                errors += code != 200
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    elapsed = time.perf_counter() - started
+
+    requests = concurrency * waves
+    coalesced = single_flight.stats()["routes"].get("GET /api/properties/{id}", {}).get("coalesced", 0)
+    print(
+        f"{'single-flight' if coalesce else 'no coalescing':<14} "
+        f"{statements[0] / waves:8.1f} statements/wave  "
+        f"{statements[0] / requests:6.2f}/request  "
+        f"p50 {percentile(latencies, 50):7.2f}ms  p99 {percentile(latencies, 99):7.2f}ms  "
+        f"{requests / elapsed:8.0f} req/s  coalesced {coalesced}/{requests}  errors {errors}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--property-id", type=int, help="listing to read (default: the first one)")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--waves", type=int, default=20)
+    args = parser.parse_args()
+
+    property_id = args.property_id
+    if property_id is None:
+        db = SessionLocal()
+        try:
+            row = db.query(Property.id).order_by(Property.id).first()
+        finally:
+            db.close()
+        if row is None:
+            parser.error("the database has no listings to read")
+        property_id = row.id
+
+    print(f"listing {property_id}: {args.waves} waves of {args.concurrency} concurrent reads")
+    for coalesce in (False, True):
+        asyncio.run(run(property_id, args.concurrency, args.waves, coalesce))
+
+if __name__ == "__main__":
+    main()
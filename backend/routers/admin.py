@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.config import settings
+from app.models.job_lease import JobLease
+from app.schemas import User
+from app.utils.cache import entity_cache
+from app.utils.load_shedding import admission_controller
+from app.utils.profiler import profile_store
+from app.utils.scheduler import scheduler
+from app.utils.single_flight import single_flight
+from app.utils.task_queue import task_queue
+from routers.auth import get_current_user
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Allow only users listed in ADMIN_EMAILS"""
+    if current_user.email.lower() not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+@router.get("/jobs")
+def get_job_metrics(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Scheduled job metrics for this worker and the cluster-wide lease table"""
+    leases = db.query(JobLease).order_by(JobLease.name).all()
+    return {
+        "worker": scheduler.owner_id,
+        "local": scheduler.stats(),
+        "cluster": [
+            {
+                "name": lease.name,
+                "owner": lease.owner,
+                "lease_until": lease.lease_until,
+                "run_count": lease.run_count,
+                "failure_count": lease.failure_count,
+                "last_started_at": lease.last_started_at,
+                "last_duration_ms": lease.last_duration_ms,
+                "last_result": lease.last_result,
+                "last_error": lease.last_error,
+            }
+            for lease in leases
+        ]
+    }
+
+@router.get("/tasks")
+def get_task_stats(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Background task queue depth and this worker's task counters"""
+    return task_queue.stats(db)
+
+@router.post("/tasks/{task_id}/retry")
+def retry_task(
+    task_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Re-run a task that exhausted its attempts"""
+    if not task_queue.retry(db, task_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No failed task with that id"
+        )
+    return {"id": task_id, "status": "pending"}
+
+@router.get("/cache")
+def get_cache_stats(admin: User = Depends(get_admin_user)):
+    """Entity cache statistics for this worker"""
+    return entity_cache.stats()
+
+@router.get("/single-flight")
+async def get_single_flight_stats(admin: User = Depends(get_admin_user)):
+    """Reads coalesced into in-flight loads by this worker, per route"""
+    return single_flight.stats()
+
+@router.get("/load-shedding")
+async def get_load_shedding_stats(admin: User = Depends(get_admin_user)):
+    """Concurrency, queueing and shed counts per route class for this worker"""
+    return admission_controller.stats()
+
+@router.get("/profiles")
+def list_profiles(admin: User = Depends(get_admin_user)):
+    """Recent request profiles kept by this worker, newest first"""
+    return {
+        "enabled": settings.PROFILING_ENABLED,
+        "profiles": [profile.summary() for profile in profile_store.list()]
+    }
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$"),
+    admin: User = Depends(get_admin_user)
+):
+    """One profile as a speedscope document or collapsed stacks (for flamegraph.pl)"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.speedscope()
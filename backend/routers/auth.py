@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.schemas import User, UserCreate, UserLogin, UserResponse, Token
 from app.controller import AuthController
+from app.controller.account_controller import AccountController
 from app.database import get_db
 from app.utils.auth import AuthUtils
 from datetime import timedelta
@@ -23,7 +24,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     if email is None:
         raise credentials_exception
     
-    user = AuthController.get_user_by_email(db, email=email)
+    user = AuthController.get_active_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
     
@@ -118,6 +119,16 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
+@router.delete("/me", status_code=status.HTTP_202_ACCEPTED)
+def delete_current_user(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Close the current account; its data is purged in the background"""
+    if not AccountController.delete_account(db, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return {"detail": "Account deletion scheduled"}
+
 @router.get("/verify-token")
 async def verify_token(current_user: User = Depends(get_current_user)):
     """Verify if token is valid"""
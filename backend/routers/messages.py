@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.schemas.message import MessageCreate, MessageResponse, ConversationResponse
+from app.schemas.message import MessageCreate, MessageResponse, ConversationResponse, ConversationSyncResponse
 from app.controller.message_controller import MessageController
 from app.controller.auth_controller import AuthController
 from app.utils.auth import AuthUtils
@@ -17,12 +17,41 @@ def get_current_user_id(token: str = Depends(oauth2_scheme), db: Session = Depen
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = AuthController.get_user_by_email(db, email=email)
+    user = AuthController.get_active_user_by_email(db, email=email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     return user.id
 
+def _message_responses(db: Session, messages, user_id: int, other_user_id: int) -> List[MessageResponse]:
+    """Build message responses for a two-party conversation, resolving names once"""
+    names = {}
+    for uid in (user_id, other_user_id):
+        user = AuthController.get_user_by_id(db, uid)
+        names[uid] = user.full_name if user else None
+    
+    return [
+        MessageResponse(
+            id=msg.id,
+            sender_id=msg.sender_id,
+            receiver_id=msg.receiver_id,
+            property_id=msg.property_id,
+            content=msg.content,
+            is_read=msg.is_read,
+            created_at=msg.created_at,
+            sender_name=names.get(msg.sender_id),
+            receiver_name=names.get(msg.receiver_id)
+        )
+        for msg in messages
+    ]
+
+def _as_read(responses: List[MessageResponse], other_user_id: int) -> List[MessageResponse]:
+    """Reflect mark_as_read on responses built before it ran"""
+    for response in responses:
+        if response.sender_id == other_user_id:
+            response.is_read = True
+    return responses
+
 @router.post("/", response_model=MessageResponse)
 async def send_message(
     message: MessageCreate,
@@ -74,27 +103,51 @@ async def get_conversation(
         db, current_user_id, other_user_id, property_id
     )
     
-    # Mark messages as read
+    # Built first: the commit in mark_as_read would expire every loaded message
+    responses = _message_responses(db, messages, current_user_id, other_user_id)
     MessageController.mark_as_read(db, current_user_id, other_user_id)
+    return _as_read(responses, other_user_id)
+
+@router.get("/conversation/{other_user_id}/sync", response_model=ConversationSyncResponse)
+async def sync_conversation(
+    other_user_id: int,
+    since_id: Optional[int] = Query(None, ge=0),
+    before_id: Optional[int] = Query(None, ge=1),
+    tombstone_since: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    property_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Incrementally sync a conversation. Pass the highest message id held as
+    since_id to fetch newer messages, or the lowest as before_id to page
+    back. Deletions after tombstone_since are returned as deleted_ids.
+    """
+    if since_id is not None and before_id is not None:
+        raise HTTPException(status_code=400, detail="Use either since_id or before_id, not both")
     
-    result = []
-    for msg in messages:
-        sender = AuthController.get_user_by_id(db, msg.sender_id)
-        receiver = AuthController.get_user_by_id(db, msg.receiver_id)
-        
-        result.append(MessageResponse(
-            id=msg.id,
-            sender_id=msg.sender_id,
-            receiver_id=msg.receiver_id,
-            property_id=msg.property_id,
-            content=msg.content,
-            is_read=msg.is_read,
-            created_at=msg.created_at,
-            sender_name=sender.full_name if sender else None,
-            receiver_name=receiver.full_name if receiver else None
-        ))
+    messages, has_more = MessageController.get_conversation_page(
+        db, current_user_id, other_user_id, since_id, before_id, limit, property_id
+    )
+    tombstones = MessageController.get_tombstones(db, current_user_id, other_user_id, tombstone_since)
     
-    return result
+    # Built first: the commit in mark_as_read would expire every loaded message
+    responses = _message_responses(db, messages, current_user_id, other_user_id)
+    if before_id is None:
+        # Only what this page delivered: not messages past a short page or
+        # about other listings
+        MessageController.mark_as_read(
+            db, current_user_id, other_user_id, [message.id for message in responses]
+        )
+        responses = _as_read(responses, other_user_id)
+    
+    return ConversationSyncResponse(
+        messages=responses,
+        deleted_ids=[tombstone.message_id for tombstone in tombstones],
+        tombstone_cursor=tombstones[-1].id if tombstones else tombstone_since,
+        has_more=has_more
+    )
 
 @router.get("/unread-count")
 async def get_unread_count(
@@ -1,18 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from app.database import get_db
-from app.schemas.property import PropertyCreate, PropertyUpdate, PropertyResponse, RentalStatusUpdate
+from app.database import get_db, SessionLocal
+from app.models.property import Property
+from app.schemas.property import (
+    PropertyCreate, PropertyUpdate, PropertyResponse, RentalStatusUpdate, PropertySort,
+    OwnerDashboardResponse, OwnerListingSummary, PropertyCluster, PropertyClusterResponse,
+    PropertyBatchResponse, PropertyChangesResponse, PropertyType, MarketStatsResponse, PriceHistoryEntry
+)
 from app.schemas.review import ReviewCreate, ReviewResponse
+from app.schemas.booking import BookingCreate, BookingResponse, BookedDates
 from app.controller.property_controller import PropertyController
 from app.controller.review_controller import ReviewController
+from app.controller.booking_controller import BookingController
+from app.controller.message_controller import MessageController
+from app.controller.view_controller import ViewController
+from app.controller.similarity_controller import SimilarityController
+from app.controller.cluster_controller import ClusterController
+from app.controller.market_controller import MarketController
+from app.controller.change_feed_controller import ChangeFeedController, DELETE
 from app.controller.auth_controller import AuthController
 from app.utils.auth import AuthUtils
+from app.utils.view_counter import view_counter
+from app.utils.cache import entity_cache
+from app.utils.single_flight import single_flight
+from app.utils.exceptions import PreconditionFailedException
 from fastapi.security import OAuth2PasswordBearer
+from datetime import date, timedelta
 import json
 
 router = APIRouter(prefix="/api/properties", tags=["Properties"])
+BATCH_MAX_IDS = 200
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login/form")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login/form", auto_error=False)
+
+def _property_response(prop) -> PropertyResponse:
+    """Build a PropertyResponse using the denormalized review stats"""
+    return PropertyResponse(
+        id=prop.id,
+        title=prop.title,
+        description=prop.description,
+        property_type=prop.property_type.value,
+        price=prop.price,
+        address=prop.address,
+        city=prop.city,
+        country=prop.country,
+        latitude=prop.latitude,
+        longitude=prop.longitude,
+        bedrooms=prop.bedrooms,
+        bathrooms=prop.bathrooms,
+        area=prop.area,
+        images=json.loads(prop.images) if prop.images else [],
+        owner_id=prop.owner_id,
+        owner_username=prop.owner.username if prop.owner else None,
+        created_at=prop.created_at,
+        average_rating=prop.average_rating,
+        review_count=prop.review_count or 0,
+        is_rented=prop.is_rented or False,
+        rental_start_date=prop.rental_start_date,
+        rental_end_date=prop.rental_end_date,
+        rented_to_user_id=prop.rented_to_user_id,
+        possible_duplicate_of=prop.possible_duplicate_of,
+        version=prop.version
+    )
+
+def _etag(prop) -> str:
+    return f'"{prop.version}"'
+
+def _if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """Version a client's If-Match header requires, or None when absent or a wildcard"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.split(",")[0].strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        # Not an ETag this API issued, so it can't match the current one
+        raise PreconditionFailedException()
 
 async def get_current_user_id(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> int:
     """Get current authenticated user ID"""
@@ -22,7 +88,7 @@ async def get_current_user_id(token: str = Depends(oauth2_scheme), db: Session =
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
-    user = AuthController.get_user_by_email(db, email=email)
+    user = AuthController.get_active_user_by_email(db, email=email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +96,17 @@ async def get_current_user_id(token: str = Depends(oauth2_scheme), db: Session =
         )
     return user.id
 
+async def get_optional_user_id(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Optional[int]:
+    """Authenticated user ID, or None for anonymous callers and invalid tokens"""
+    email = AuthUtils.decode_access_token(token) if token else None
+    if email is None:
+        return None
+    user = AuthController.get_active_user_by_email(db, email=email)
+    return user.id if user else None
+
 @router.post("/", response_model=PropertyResponse, status_code=status.HTTP_201_CREATED)
 async def create_property(
     property_data: PropertyCreate,
@@ -62,8 +139,12 @@ async def create_property(
             owner_username=property.owner.username if property.owner else None,
             created_at=property.created_at,
             average_rating=None,
-            review_count=0
+            review_count=0,
+            possible_duplicate_of=property.possible_duplicate_of,
+            version=property.version
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -79,123 +160,244 @@ async def get_properties(
     max_price: Optional[float] = None,
     city: Optional[str] = None,
     country: Optional[str] = None,
+    available_from: Optional[date] = None,
+    available_to: Optional[date] = None,
+    sort: Optional[PropertySort] = None,
     db: Session = Depends(get_db)
 ):
     """Get all properties with optional filters"""
+    if available_from and not available_to:
+        available_to = available_from + timedelta(days=1)
+    if available_to and not available_from:
+        available_from = date.today()
+    if available_from and available_to <= available_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="available_to must be after available_from"
+        )
+    
     properties = PropertyController.get_properties(
-        db, skip, limit, property_type, min_price, max_price, city, country
+        db, skip, limit, property_type, min_price, max_price, city, country,
+        available_from, available_to, sort
     )
     
-    result = []
-    for prop in properties:
-        stats = PropertyController.get_property_stats(db, prop.id)
-        images = json.loads(prop.images) if prop.images else []
-        
-        result.append(PropertyResponse(
+    return [_property_response(prop) for prop in properties]
+
+@router.get("/changes", response_model=PropertyChangesResponse)
+async def get_property_changes(
+    since: str = Query("0", description="next_token from the previous call; 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get properties created, updated or deleted since a change feed token"""
+    try:
+        cursor = int(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid change token"
+        )
+    
+    ops, next_cursor, has_more = ChangeFeedController.get_changes(db, cursor, limit)
+    upserted = [property_id for property_id, op in ops.items() if op != DELETE]
+    by_id = {prop.id: prop for prop in PropertyController.get_properties_by_ids(db, upserted)}
+    
+    return PropertyChangesResponse(
+        changed=[_property_response(by_id[i]) for i in upserted if i in by_id],
+        # A property updated and then deleted past this page is reported deleted
+        deleted_ids=[i for i, op in ops.items() if op == DELETE or i not in by_id],
+        next_token=str(next_cursor),
+        has_more=has_more
+    )
+
+@router.get("/batch", response_model=PropertyBatchResponse)
+async def get_properties_batch(
+    ids: str = Query(..., description="Comma-separated property ids"),
+    db: Session = Depends(get_db)
+):
+    """Get several properties by id, in request order, listing ids that don't exist"""
+    try:
+        requested = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if len(requested) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_IDS} ids per request"
+        )
+    
+    by_id = {prop.id: prop for prop in PropertyController.get_properties_by_ids(db, requested)}
+    return PropertyBatchResponse(
+        properties=[_property_response(by_id[i]) for i in requested if i in by_id],
+        missing=[i for i in requested if i not in by_id]
+    )
+
+@router.get("/clusters", response_model=PropertyClusterResponse)
+async def get_property_clusters(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    db: Session = Depends(get_db)
+):
+    """Get aggregated property clusters for a map viewport"""
+    if min_lat > max_lat:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_lat must not exceed max_lat"
+        )
+    
+    level, cells = ClusterController.get_clusters(db, min_lat, min_lng, max_lat, max_lng, zoom)
+    return PropertyClusterResponse(
+        level=level,
+        clusters=[
+            PropertyCluster(
+                count=cell.count,
+                latitude=cell.sum_latitude / cell.count,
+                longitude=cell.sum_longitude / cell.count,
+                min_price=cell.min_price,
+                max_price=cell.max_price
+            )
+            for cell in cells
+        ]
+    )
+
+@router.get("/market-stats", response_model=MarketStatsResponse)
+async def get_market_stats(
+    city: str = Query(..., min_length=1, max_length=100),
+    property_type: Optional[PropertyType] = None,
+    bedrooms: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Asking rent distribution for a city, optionally narrowed by type and bedrooms"""
+    stats = MarketController.get_stats(
+        db, city, property_type.value if property_type else None, bedrooms
+    )
+    return MarketStatsResponse(city=city, property_type=property_type, bedrooms=bedrooms, **stats)
+
+@router.get("/owner/dashboard", response_model=OwnerDashboardResponse)
+async def get_owner_dashboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Get the current user's listings with review, inquiry and rental metrics"""
+    total = PropertyController.count_properties_by_owner(db, current_user_id)
+    properties = PropertyController.get_properties_by_owner(db, current_user_id, skip, limit)
+    property_ids = [prop.id for prop in properties]
+    unread = MessageController.get_unread_counts_by_property(db, current_user_id, property_ids)
+    views = ViewController.get_view_counts(db, property_ids)
+    
+    listings = [
+        OwnerListingSummary(
             id=prop.id,
             title=prop.title,
-            description=prop.description,
             property_type=prop.property_type.value,
             price=prop.price,
-            address=prop.address,
             city=prop.city,
             country=prop.country,
-            latitude=prop.latitude,
-            longitude=prop.longitude,
-            bedrooms=prop.bedrooms,
-            bathrooms=prop.bathrooms,
-            area=prop.area,
-            images=images,
-            owner_id=prop.owner_id,
-            owner_username=prop.owner.username if prop.owner else None,
-            created_at=prop.created_at,
-            average_rating=stats['average_rating'],
-            review_count=stats['review_count'],
-            is_rented=prop.is_rented,
+            average_rating=prop.average_rating,
+            review_count=prop.review_count or 0,
+            unread_inquiries=unread.get(prop.id, 0),
+            view_count=views.get(prop.id, 0),
+            is_rented=prop.is_rented or False,
             rental_start_date=prop.rental_start_date,
             rental_end_date=prop.rental_end_date,
-            rented_to_user_id=prop.rented_to_user_id
-        ))
+            rented_to_user_id=prop.rented_to_user_id,
+            created_at=prop.created_at,
+            updated_at=prop.updated_at
+        )
+        for prop in properties
+    ]
     
-    return result
+    return OwnerDashboardResponse(total=total, skip=skip, limit=limit, listings=listings)
+
+def _read_property(property_id: int):
+    """(response, ETag) of a listing, or None; runs with its own session (see SingleFlight)"""
+    db = SessionLocal()
+    try:
+        property = PropertyController.get_property_by_id(db, property_id)
+        if not property:
+            return None
+        # Rating columns are kept in sync on review writes, so no aggregate here
+        return _property_response(property), _etag(property)
+    finally:
+        db.close()
 
 @router.get("/{property_id}", response_model=PropertyResponse)
-async def get_property(property_id: int, db: Session = Depends(get_db)):
-    """Get property by ID"""
-    property = PropertyController.get_property_by_id(db, property_id)
-    if not property:
+async def get_property(property_id: int, response: Response):
+    """Get property by ID; the ETag header carries its version for If-Match"""
+    # Concurrent reads of the same version share one load
+    version = entity_cache.version(Property, property_id)
+    key = None if version is None else ("GET /api/properties/{id}", property_id, version)
+    result = await single_flight.run(key, lambda: _read_property(property_id))
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
     
-    stats = PropertyController.get_property_stats(db, property.id)
-    images = json.loads(property.images) if property.images else []
+    property_response, etag = result
+    view_counter.record(property_id)
+    response.headers["ETag"] = etag
+    return property_response
+
+@router.get("/{property_id}/price-history", response_model=List[PriceHistoryEntry])
+async def get_price_history(
+    property_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Get a property's asking price changes, oldest first"""
+    if not PropertyController.property_exists(db, property_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    return MarketController.get_price_history(db, property_id, limit)
+
+@router.get("/{property_id}/similar", response_model=List[PropertyResponse])
+async def get_similar_properties(
+    property_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Get listings similar in price, size, type and location"""
+    if not PropertyController.property_exists(db, property_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
     
-    return PropertyResponse(
-        id=property.id,
-        title=property.title,
-        description=property.description,
-        property_type=property.property_type.value,
-        price=property.price,
-        address=property.address,
-        city=property.city,
-        country=property.country,
-        latitude=property.latitude,
-        longitude=property.longitude,
-        bedrooms=property.bedrooms,
-        bathrooms=property.bathrooms,
-        area=property.area,
-        images=images,
-        owner_id=property.owner_id,
-        owner_username=property.owner.username if property.owner else None,
-        created_at=property.created_at,
-        average_rating=stats['average_rating'],
-        review_count=stats['review_count'],
-        is_rented=property.is_rented or False,
-        rental_start_date=property.rental_start_date,
-        rental_end_date=property.rental_end_date,
-        rented_to_user_id=property.rented_to_user_id
-    )
+    properties = SimilarityController.get_similar_properties(db, property_id, limit)
+    return [_property_response(prop) for prop in properties]
 
 @router.put("/{property_id}", response_model=PropertyResponse)
 async def update_property(
     property_id: int,
     property_data: PropertyUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    """Update property"""
-    property = PropertyController.update_property(db, property_id, property_data, current_user_id)
+    """Update property; 412 if If-Match is stale, 409 if a concurrent write wins"""
+    property = PropertyController.update_property(
+        db, property_id, property_data, current_user_id, _if_match_version(if_match)
+    )
     if not property:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found or you don't have permission"
         )
+    response.headers["ETag"] = _etag(property)
     
-    stats = PropertyController.get_property_stats(db, property.id)
-    images = json.loads(property.images) if property.images else []
-    
-    return PropertyResponse(
-        id=property.id,
-        title=property.title,
-        description=property.description,
-        property_type=property.property_type.value,
-        price=property.price,
-        address=property.address,
-        city=property.city,
-        country=property.country,
-        latitude=property.latitude,
-        longitude=property.longitude,
-        bedrooms=property.bedrooms,
-        bathrooms=property.bathrooms,
-        area=property.area,
-        images=images,
-        owner_id=property.owner_id,
-        created_at=property.created_at,
-        average_rating=stats['average_rating'],
-        review_count=stats['review_count']
-    )
+    return _property_response(property)
 
 @router.delete("/{property_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_property(
@@ -236,6 +438,11 @@ async def create_review(
         )
     
     review = ReviewController.create_review(db, review_data, property_id, current_user_id)
+    if not review:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have already reviewed this property"
+        )
     
     return ReviewResponse(
         id=review.id,
@@ -289,11 +496,13 @@ async def delete_review(
 async def update_rental_status(
     property_id: int,
     rental_status: RentalStatusUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    """Update property rental status (owner only)"""
-    property = PropertyController.get_property_by_id(db, property_id)
+    """Update property rental status (owner only); 412/409 as for PUT"""
+    property = PropertyController.get_property_for_update(db, property_id)
     if not property:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -307,39 +516,68 @@ async def update_rental_status(
         )
     
     # Update rental status
-    property.is_rented = rental_status.is_rented
-    property.rental_start_date = rental_status.rental_start_date
-    property.rental_end_date = rental_status.rental_end_date
-    property.rented_to_user_id = rental_status.rented_to_user_id
-    
-    db.commit()
-    db.refresh(property)
+    property = PropertyController.update_rental_status(
+        db, property, rental_status, _if_match_version(if_match)
+    )
+    response.headers["ETag"] = _etag(property)
     
-    stats = PropertyController.get_property_stats(db, property.id)
-    images = json.loads(property.images) if property.images else []
+    return _property_response(property)
+
+@router.post("/{property_id}/bookings", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
+async def create_booking(
+    property_id: int,
+    booking_data: BookingCreate,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Book a property for a date range"""
+    booking = BookingController.create_booking(db, property_id, current_user_id, booking_data)
+    if not booking:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    return booking
+
+@router.get("/{property_id}/bookings", response_model=List[BookedDates])
+async def get_property_bookings(
+    property_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user_id: Optional[int] = Depends(get_optional_user_id)
+):
+    """Get the booked dates of a property; the owner also sees who booked them"""
+    property = PropertyController.get_property_by_id(db, property_id)
+    if not property:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
     
-    return PropertyResponse(
-        id=property.id,
-        title=property.title,
-        description=property.description,
-        property_type=property.property_type.value,
-        price=property.price,
-        address=property.address,
-        city=property.city,
-        country=property.country,
-        latitude=property.latitude,
-        longitude=property.longitude,
-        bedrooms=property.bedrooms,
-        bathrooms=property.bathrooms,
-        area=property.area,
-        images=images,
-        owner_id=property.owner_id,
-        owner_username=property.owner.username if property.owner else None,
-        created_at=property.created_at,
-        average_rating=stats['average_rating'],
-        review_count=stats['review_count'],
-        is_rented=property.is_rented or False,
-        rental_start_date=property.rental_start_date,
-        rental_end_date=property.rental_end_date,
-        rented_to_user_id=property.rented_to_user_id
-    )
+    bookings = BookingController.get_property_bookings(db, property_id, start_date, end_date)
+    is_owner = current_user_id is not None and current_user_id == property.owner_id
+    return [
+        BookedDates(
+            start_date=booking.start_date,
+            end_date=booking.end_date,
+            **({"id": booking.id, "user_id": booking.user_id, "created_at": booking.created_at}
+               if is_owner or booking.user_id == current_user_id else {})
+        )
+        for booking in bookings
+    ]
+
+@router.delete("/bookings/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_booking(
+    booking_id: int,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Cancel a booking"""
+    success = BookingController.delete_booking(db, booking_id, current_user_id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking not found or you don't have permission"
+        )
+    return None
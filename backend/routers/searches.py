@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database import get_db
+from app.schemas.saved_search import (
+    SavedSearchCreate, SavedSearchResponse, NotificationResponse, NotificationFeedResponse,
+    NotificationReadRequest
+)
+from app.controller.saved_search_controller import SavedSearchController, MAX_SEARCHES_PER_USER
+from routers.properties import get_current_user_id
+
+router = APIRouter(prefix="/api", tags=["Saved Searches"])
+
+@router.post("/saved-searches", response_model=SavedSearchResponse, status_code=status.HTTP_201_CREATED)
+async def create_saved_search(
+    search_data: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Save a search; new and changed listings matching it land in the notification feed"""
+    saved_search = SavedSearchController.create_search(db, current_user_id, search_data)
+    if not saved_search:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"You can keep at most {MAX_SEARCHES_PER_USER} saved searches"
+        )
+    return saved_search
+
+@router.get("/saved-searches", response_model=List[SavedSearchResponse])
+async def get_saved_searches(
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Get the current user's saved searches"""
+    return SavedSearchController.get_user_searches(db, current_user_id)
+
+@router.delete("/saved-searches/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_saved_search(
+    search_id: int,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Delete a saved search"""
+    if not SavedSearchController.delete_search(db, search_id, current_user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Saved search not found or you don't have permission"
+        )
+    return None
+
+@router.get("/notifications", response_model=NotificationFeedResponse)
+async def get_notifications(
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    unread_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Get the current user's saved search notifications, newest first"""
+    rows = SavedSearchController.get_notifications(db, current_user_id, before_id, limit, unread_only)
+    return NotificationFeedResponse(
+        notifications=[
+            NotificationResponse(
+                id=notification.id,
+                saved_search_id=notification.saved_search_id,
+                saved_search_name=search_name,
+                property_id=notification.property_id,
+                property_title=title,
+                property_price=price,
+                is_read=notification.is_read,
+                created_at=notification.created_at
+            )
+            for notification, search_name, title, price in rows
+        ],
+        unread_count=SavedSearchController.count_unread(db, current_user_id),
+        next_before_id=rows[-1][0].id if len(rows) == limit else None
+    )
+
+@router.post("/notifications/read")
+async def mark_notifications_read(
+    request: NotificationReadRequest,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """Mark notifications read (all of them when no ids are given)"""
+    updated = SavedSearchController.mark_read(db, current_user_id, request.ids)
+    return {"updated": updated}